@@ -0,0 +1,60 @@
+"""
+Cache mémoire borné à durée de vie (TTL), en processus.
+
+Les entrées expirent ttl secondes après leur écriture ; au-delà de maxsize entrées, la
+moins récemment utilisée sort. generation change à chaque invalidation : un appelant
+qui lit la source pendant une écriture concurrente peut ainsi éviter de remettre en
+cache une valeur déjà périmée (voir set(..., generation=)).
+"""
+from collections import OrderedDict
+import time
+from api import metrics
+
+
+class TTLCache:
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key):
+        """Valeur en cache, ou None si absente ou expirée."""
+        item = self._data.get(key)
+        if item is None or item[0] < time.monotonic():
+            if item is not None:
+                del self._data[key]
+            self.misses += 1
+            metrics.cache_events.inc(cache=self.name, result="miss")
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        metrics.cache_events.inc(cache=self.name, result="hit")
+        return item[1]
+
+    def set(self, key, value, generation: int | None = None):
+        """Met value en cache, sauf si une invalidation a eu lieu depuis generation."""
+        if generation is not None and generation != self.generation:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        self.generation += 1
+        self._data.pop(key, None)
+
+    def clear(self):
+        self.generation += 1
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "maxsize": self.maxsize, "ttl": self.ttl,
+                "hits": self.hits, "misses": self.misses}
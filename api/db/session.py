@@ -1,4 +1,5 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import OperationFailure
 from dotenv import load_dotenv
 import os
 
@@ -17,8 +18,22 @@ async def connect_db():
     existing_collections = await db.list_collection_names()
     if "users" not in existing_collections:
         await db.create_collection("users")
+    await ensure_indexes()
     print(f"✅ MongoDB connected : {MONGO_DB_NAME}, collections: {await db.list_collection_names()} ")
 
+async def ensure_indexes():
+    """
+    Index des requêtes de l'API (sans effet s'ils existent déjà). L'unicité d'un nom de
+    favori par utilisateur n'est pas un index : un index unique porte sur des documents
+    différents, pas sur les éléments d'un même tableau. C'est la mise à jour conditionnelle
+    de add_favorite qui la garantit.
+    """
+    try:
+        await db["users"].create_index("username", unique=True, name="username_unique")
+    except OperationFailure as e:
+        # ex. doublons déjà présents : l'API fonctionne, mais sans garantie d'unicité
+        print(f"⚠️ MongoDB index users.username not created: {e}")
+
 async def disconnect_db():
     global client
     client.close()
@@ -0,0 +1,26 @@
+from urllib.parse import urlsplit
+import os
+import time
+from api import metrics
+from api.upstream import client as http
+from api.upstream.singleflight import SingleFlight
+
+# surchargeable pour les bancs d'essai (bench/stub.py)
+EONET = os.getenv("EONET_URL", "https://eonet.gsfc.nasa.gov/api/v3/events")
+EONET_HOST = urlsplit(EONET).hostname
+LIMIT = 1000
+eonet_flight = SingleFlight("eonet")
+
+
+async def fetch_events(start: str, end: str, limit: int = LIMIT) -> list[dict]:
+    """EONET events between two UTC dates (YYYY-MM-DD); concurrent identical calls share one request."""
+    params = {"start": start, "end": end, "status": "all", "limit": limit}
+
+    async def run():
+        r = await http.get(EONET, params=params, timeout=20)
+        parsed = time.perf_counter()
+        events = r.json().get("events", [])
+        metrics.upstream_parse.observe(time.perf_counter() - parsed, host=EONET_HOST)
+        return events
+
+    return await eonet_flight.do(f"{EONET}?start={start}&end={end}&status=all&limit={limit}", run)
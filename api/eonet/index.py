@@ -0,0 +1,75 @@
+"""
+Index spatial en grille des enregistrements EONET d'une journée.
+
+Chaque enregistrement est rangé dans toutes les cases de CELL_DEG degrés que touche
+sa boîte englobante (un point : une case). Une recherche par rayon ne regarde que
+les cases couvrant le cercle, puis calcule la distance au point ou à la boîte.
+"""
+from math import asin, cos, floor, radians, sin, sqrt
+import os
+
+CELL_DEG = float(os.getenv("EONET_INDEX_CELL_DEG", "1.0"))
+EARTH_KM = 6371.0088
+KM_PER_DEG = 111.195
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = radians(lat1), radians(lat2)
+    a = sin((p2 - p1) / 2) ** 2 + cos(p1) * cos(p2) * sin(radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_KM * asin(min(1.0, sqrt(a)))
+
+
+def distance_km(lat: float, lon: float, bbox: tuple[float, float, float, float]) -> float:
+    """Distance au point le plus proche de la boîte (min_lat, min_lon, max_lat, max_lon), 0 dedans."""
+    min_lat, min_lon, max_lat, max_lon = bbox
+    return haversine_km(lat, lon, min(max(lat, min_lat), max_lat), min(max(lon, min_lon), max_lon))
+
+
+def _row(lat: float) -> int:
+    return floor((min(max(lat, -90.0), 90.0) + 90.0) / CELL_DEG)
+
+
+def _col(lon: float) -> int:
+    return floor(((lon + 180.0) % 360.0) / CELL_DEG)
+
+
+class GridIndex:
+    def __init__(self, records):
+        self.records = records
+        self.cells: dict[tuple[int, int], list[int]] = {}
+        self.cols = round(360 / CELL_DEG)
+        for i, r in enumerate(records):
+            if r.bbox is None:
+                continue
+            min_lat, min_lon, max_lat, max_lon = r.bbox
+            c0, c1 = _col(min_lon), _col(max_lon)
+            ncols = (c1 - c0) % self.cols + 1
+            for row in range(_row(min_lat), _row(max_lat) + 1):
+                for k in range(ncols):
+                    self.cells.setdefault((row, (c0 + k) % self.cols), []).append(i)
+
+    def near(self, lat: float, lon: float, radius_km: float) -> list[tuple[float, object]]:
+        """(distance_km, enregistrement) dans le rayon, du plus proche au plus lointain."""
+        dlat = radius_km / KM_PER_DEG
+        lat0, lat1 = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+        # largeur en longitude prise à la latitude la plus éloignée de l'équateur
+        widest = max(abs(lat0), abs(lat1))
+        if widest >= 89.9 or radius_km / (KM_PER_DEG * cos(radians(widest))) >= 180:
+            cols = range(self.cols)
+        else:
+            dlon = radius_km / (KM_PER_DEG * cos(radians(widest)))
+            c0, c1 = _col(lon - dlon), _col(lon + dlon)
+            cols = [(c0 + k) % self.cols for k in range((c1 - c0) % self.cols + 1)]
+
+        seen, out = set(), []
+        for row in range(_row(lat0), _row(lat1) + 1):
+            for col in cols:
+                for i in self.cells.get((row, col), ()):
+                    if i in seen:
+                        continue
+                    seen.add(i)
+                    d = distance_km(lat, lon, self.records[i].bbox)
+                    if d <= radius_km:
+                        out.append((d, self.records[i]))
+        out.sort(key=lambda x: x[0])
+        return out
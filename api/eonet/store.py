@@ -0,0 +1,291 @@
+"""
+Événements EONET en mémoire, indexés par jour UTC.
+
+Une tâche de fond recharge les EONET_WINDOW_DAYS derniers jours toutes les
+EONET_REFRESH_SECONDS secondes, en un appel (découpé seulement si EONET tronque la
+réponse). Chaque événement est analysé une seule fois en enregistrements prêts à
+servir : titre nettoyé, catégorie, position et ligne de titre déjà formatée. Un jour
+hors de la fenêtre est demandé une fois à EONET puis gardé (au plus
+EONET_MAX_BACKFILL_DAYS jours, les plus anciens demandés sortent d'abord).
+Chaque jour gardé a son index spatial (api.eonet.index), construit à ce moment-là.
+
+Les abonnés (subscribe) reçoivent après chaque rechargement les changements de la
+fenêtre, calculés une seule fois par jour modifié : enregistrements nouveaux ou
+modifiés et identifiants disparus.
+"""
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from typing import NamedTuple
+import asyncio
+import os
+import re
+from api import metrics
+from api.eonet import client
+from api.eonet.index import GridIndex
+
+REFRESH_SECONDS = int(os.getenv("EONET_REFRESH_SECONDS", "300"))
+WINDOW_DAYS = int(os.getenv("EONET_WINDOW_DAYS", "7"))
+MAX_BACKFILL_DAYS = int(os.getenv("EONET_MAX_BACKFILL_DAYS", "365"))
+# changements en attente par abonné ; au-delà, l'abonné est remis à zéro (RESYNC)
+SUBSCRIBER_QUEUE = int(os.getenv("EONET_SUBSCRIBER_QUEUE", "16"))
+
+# identifiants numériques collés aux titres EONET ("Wildfire 123456789")
+_TITLE_ID = re.compile(r"\s+\d{6,}")
+
+
+class Headline(NamedTuple):
+    id: str
+    date: str
+    category: str
+    title: str
+    lat: float | None
+    lon: float | None
+    text: str
+    bbox: tuple[float, float, float, float] | None  # (min_lat, min_lon, max_lat, max_lon)
+
+    def as_dict(self) -> dict:
+        return {"id": self.id, "date": self.date, "category": self.category, "title": self.title,
+                "lat": self.lat, "lon": self.lon, "headline": self.text}
+
+
+def bbox(geom: dict) -> tuple[float, float, float, float] | None:
+    c, t = geom.get("coordinates"), geom.get("type")
+    if not c:
+        return None
+    if t == "Point" and isinstance(c, list) and len(c) >= 2:
+        return c[1], c[0], c[1], c[0]
+    if t == "Polygon" and isinstance(c, list) and c and isinstance(c[0], list) and c[0]:
+        xs = [p[0] for p in c[0]]
+        ys = [p[1] for p in c[0]]
+        return min(ys), min(xs), max(ys), max(xs)
+    return None
+
+
+def centroid(geom: dict) -> tuple[float, float] | None:
+    """(lat, lon) d'un Point, ou moyenne des sommets du contour d'un Polygon ; None sinon."""
+    c, t = geom.get("coordinates"), geom.get("type")
+    if not c:
+        return None
+    if t == "Point" and isinstance(c, list) and len(c) >= 2:
+        return c[1], c[0]
+    if t == "Polygon" and isinstance(c, list) and c and isinstance(c[0], list) and c[0]:
+        xs = [p[0] for p in c[0]]
+        ys = [p[1] for p in c[0]]
+        return sum(ys) / len(ys), sum(xs) / len(xs)
+    return None
+
+
+def place_str(lat: float, lon: float) -> str:
+    """'43.6°N, 79.4°W'"""
+    return f"{abs(lat):.1f}°{'N' if lat>=0 else 'S'}, {abs(lon):.1f}°{'E' if lon>=0 else 'W'}"
+
+
+def parse(events: list[dict]) -> dict[str, list[Headline]]:
+    """Événements EONET -> enregistrements par jour (première géométrie de chaque jour), dans l'ordre d'EONET."""
+    days: dict[str, list[Headline]] = {}
+    for ev in events:
+        title = _TITLE_ID.sub("", ev.get("title") or "Event")
+        cat = (ev.get("categories") or [{}])[0].get("title", "Event")
+        seen = set()
+        for geom in ev.get("geometry", []):
+            day = geom.get("date", "")[:10]
+            if not day or day in seen:
+                continue
+            seen.add(day)
+            pos = centroid(geom)
+            place = place_str(*pos) if pos else "location unavailable"
+            days.setdefault(day, []).append(Headline(
+                id=ev.get("id", ""),
+                date=day,
+                category=cat,
+                title=title,
+                lat=pos[0] if pos else None,
+                lon=pos[1] if pos else None,
+                text=f"{cat} — '{title}' — {place} — {day} (UTC)",
+                bbox=bbox(geom),
+            ))
+    return days
+
+
+class Change(NamedTuple):
+    date: str
+    changed: list[Headline]  # nouveaux ou modifiés, dans l'ordre d'EONET
+    removed: list[str]  # identifiants
+
+    def as_dict(self) -> dict:
+        return {"date": self.date, "changed": [r.as_dict() for r in self.changed], "removed": self.removed}
+
+
+# placé dans la file d'un abonné trop lent à la place des changements perdus
+RESYNC = None
+
+
+def diff(day: str, old: list[Headline], new: list[Headline]) -> Change | None:
+    before = {r.id: r for r in old}
+    ids = {r.id for r in new}
+    changed = [r for r in new if before.get(r.id) != r]
+    removed = [i for i in before if i not in ids]
+    return Change(day, changed, removed) if changed or removed else None
+
+
+def utc_today() -> date:
+    """Jour UTC courant (les jours EONET sont en UTC)."""
+    return datetime.now(timezone.utc).date()
+
+
+async def _fetch_range(start: date, end: date) -> list[dict]:
+    """Événements de [start, end] ; si EONET tronque (limit atteint), la période est coupée en deux."""
+    events = await client.fetch_events(start.isoformat(), end.isoformat())
+    if len(events) < client.LIMIT or start == end:
+        return events
+    mid = start + (end - start) // 2
+    first, second = await asyncio.gather(_fetch_range(start, mid), _fetch_range(mid + timedelta(days=1), end))
+    seen = {ev.get("id") for ev in first}
+    return first + [ev for ev in second if ev.get("id") not in seen]
+
+
+class EventStore:
+    def __init__(self):
+        self.days: dict[str, list[Headline]] = {}
+        self.index: dict[str, GridIndex] = {}
+        self.window: set[str] = set()
+        self.backfilled: OrderedDict[str, None] = OrderedDict()
+        self.refreshed_at: datetime | None = None
+        self.upstream_calls = 0
+        self.refresh_errors = 0
+        self.subscribers: set[asyncio.Queue] = set()
+        self._task: asyncio.Task | None = None
+
+    async def refresh(self):
+        """Recharge la fenêtre glissante des derniers jours."""
+        today = utc_today()
+        start = today - timedelta(days=WINDOW_DAYS - 1)
+        self.upstream_calls += 1
+        parsed = parse(await _fetch_range(start, today))
+
+        window = {(start + timedelta(days=i)).isoformat() for i in range(WINDOW_DAYS)}
+        changes = []
+        for day in sorted(window):
+            records = parsed.get(day, [])
+            if self.subscribers and (change := diff(day, self.days.get(day, []), records)):
+                changes.append(change)
+            self._set(day, records)
+            self.backfilled.pop(day, None)
+        # les jours sortis de la fenêtre ne changent plus : gardés comme jours demandés
+        for day in sorted(self.window - window):
+            self._keep(day)
+        self.window = window
+        self.refreshed_at = datetime.now(timezone.utc)
+        if changes:
+            self._publish(changes)
+
+    def subscribe(self) -> asyncio.Queue:
+        """File recevant, après chaque rechargement qui change quelque chose, une liste de Change."""
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+
+    def _publish(self, changes: list[Change]):
+        for queue in self.subscribers:
+            try:
+                queue.put_nowait(changes)
+            except asyncio.QueueFull:
+                # abonné bloqué : ses changements en attente sont remplacés par une remise à zéro
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+
+    def _set(self, day: str, records: list[Headline]):
+        self.days[day] = records
+        self.index[day] = GridIndex(records)
+
+    def _keep(self, day: str):
+        self.backfilled[day] = None
+        self.backfilled.move_to_end(day)
+        while len(self.backfilled) > MAX_BACKFILL_DAYS:
+            old, _ = self.backfilled.popitem(last=False)
+            self.days.pop(old, None)
+            self.index.pop(old, None)
+
+    async def get(self, day: str) -> list[Headline]:
+        """Enregistrements du jour (YYYY-MM-DD) ; un jour inconnu est demandé à EONET une fois."""
+        if day in self.days:
+            if day in self.backfilled:
+                self.backfilled.move_to_end(day)
+            metrics.cache_events.inc(cache="eonet_days", result="hit")
+            return self.days[day]
+        metrics.cache_events.inc(cache="eonet_days", result="miss")
+
+        self.upstream_calls += 1
+        records = parse(await client.fetch_events(day, day)).get(day, [])
+        # un jour futur ou en cours hors fenêtre peut encore changer : pas gardé
+        if day < utc_today().isoformat():
+            self._set(day, records)
+            self._keep(day)
+        return records
+
+    async def _day_index(self, day: str) -> GridIndex:
+        records = await self.get(day)
+        return self.index.get(day) or GridIndex(records)
+
+    async def near(self, points: list[tuple[float, float]], radius_km: float, days: int, limit: int = 50) -> list[list[dict]]:
+        """
+        Pour chaque (lat, lon), les événements à moins de radius_km sur les `days` derniers
+        jours (aujourd'hui compris), du plus proche au plus lointain. Un événement présent
+        plusieurs jours n'apparaît qu'une fois, au jour le plus récent où il est dans le rayon.
+        """
+        today = utc_today()
+        wanted = [(today - timedelta(days=k)).isoformat() for k in range(days)]
+        indexes = await asyncio.gather(*(self._day_index(day) for day in wanted))
+
+        results = []
+        for lat, lon in points:
+            latest: dict[str, tuple[float, Headline]] = {}
+            for idx in indexes:  # du jour le plus récent au plus ancien
+                for d, r in idx.near(lat, lon, radius_km):
+                    latest.setdefault(r.id, (d, r))
+            found = sorted(latest.values(), key=lambda x: x[0])[:limit]
+            results.append([{**r.as_dict(), "distance_km": round(d, 1)} for d, r in found])
+        return results
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                # y compris un événement de forme inattendue : on garde l'état précédent et on réessaie
+                self.refresh_errors += 1
+                print(f"⚠️ EONET refresh failed: {e!r}")
+            await asyncio.sleep(REFRESH_SECONDS)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            print(f"✅ EONET store: last {WINDOW_DAYS} days, refreshed every {REFRESH_SECONDS}s")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            print("❌ EONET store stopped.")
+
+    def stats(self) -> dict:
+        return {
+            "days": len(self.days),
+            "window_days": len(self.window),
+            "backfilled_days": len(self.backfilled),
+            "refreshed_at": self.refreshed_at.isoformat() if self.refreshed_at else None,
+            "upstream_calls": self.upstream_calls,
+            "refresh_errors": self.refresh_errors,
+            "subscribers": len(self.subscribers),
+        }
+
+
+events = EventStore()
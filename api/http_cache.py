@@ -0,0 +1,164 @@
+"""
+Validateurs et durées de cache HTTP pour les routes en lecture.
+
+Les données POWER au-delà de SETTLED_DAYS et les journées EONET passées ne changent
+plus. Pour ces requêtes « historiques », l'ETag est dérivé de la requête canonique
+(chemin, paramètres triés, Accept, année en cours pour les routes qui en dépendent) :
+un If-None-Match correspondant reçoit 304 avant même d'appeler la route, donc sans
+appel amont. Les autres (période incluant les derniers jours) ont un ETag calculé sur
+le corps et une durée de cache courte.
+
+Une route peut interdire la mise en cache d'une réponse dégradée (morceaux en échec)
+avec no_store(request).
+"""
+from datetime import date, datetime, timedelta, timezone
+import hashlib
+import os
+from fastapi import Request
+from fastapi.responses import Response
+from starlette.middleware.base import BaseHTTPMiddleware
+from api import metrics
+from api.power.store import SETTLED_DAYS
+
+MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", str(30 * 86400)))
+SHORT_MAX_AGE = int(os.getenv("HTTP_CACHE_SHORT_MAX_AGE", "300"))
+# À changer quand le format des réponses change : invalide tous les ETag déjà distribués
+VERSION = os.getenv("HTTP_CACHE_VERSION", "1")
+# EONET peut encore ajouter des événements sur la veille
+EONET_SETTLED_DAYS = 2
+
+
+def _day(value: str | None, fmt: str) -> date | None:
+    try:
+        return datetime.strptime(value or "", fmt).date()
+    except ValueError:
+        return None
+
+
+def _history_end(q, default_window: int) -> date | None:
+    """Dernier jour d'historique d'une prédiction : 31 décembre dernier + window_days."""
+    try:
+        window = int(q.get("window_days", default_window))
+    except ValueError:
+        return None
+    return date(date.today().year - 1, 12, 31) + timedelta(days=max(window, 0))
+
+
+def _series(q) -> tuple[date, int] | None:
+    if q.get("stream"):
+        return None  # une année en échec n'est visible qu'une fois le flux commencé
+    end = _day(q.get("end"), "%Y%m%d")
+    return (min(end, date.today()), SETTLED_DAYS, None) if end else None
+
+
+def _headlines(q):
+    d = _day(q.get("date"), "%Y-%m-%d")
+    return (d, EONET_SETTLED_DAYS, None) if d else None
+
+
+def _prediction(default_window: int):
+    def rule(q):
+        end = _history_end(q, default_window)
+        return (end, SETTLED_DAYS, None) if end else None
+    return rule
+
+
+def _dashboard(q):
+    # jour passé : seul ce jour est servi ; jour futur : seulement la prédiction,
+    # remplacée par le jour observé quand il arrive
+    d = _day(q.get("date"), "%Y%m%d")
+    if d is None:
+        return None
+    if d <= date.today():
+        return d, SETTLED_DAYS, None
+    checked = _prediction(3)(q)
+    return (checked[0], checked[1], d) if checked else None
+
+
+# chemin -> (règle, dépend de l'année en cours) ; une règle donne (dernier jour de données
+# utilisé, délai après lequel ce jour ne change plus, jour où la réponse change d'elle-même
+# ou None) ou None si la requête n'est pas cachable
+RULES = {
+    "/merra2/power/daily": (_series, False),
+    "/weather/rainfall": (_series, False),
+    "/disasters/headlines": (_headlines, False),
+    "/algo/daily/predict": (_prediction(3), True),
+    "/algo/daily/predict_rain": (_prediction(3), True),
+    "/algo/daily/analyse": (_prediction(0), True),
+    "/algo/range/predict": (_prediction(3), True),
+    "/dashboard": (_dashboard, True),
+}
+
+
+def no_store(request: Request):
+    """La réponse en cours ne doit pas être mise en cache (données partielles)."""
+    request.state.no_store = True
+
+
+def _etag(*parts: str | bytes) -> str:
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(p if isinstance(p, bytes) else p.encode())
+        h.update(b"\0")
+    # faible : la compression (GZip/Brotli, ajoutée plus à l'extérieur) change les octets
+    # envoyés, pas la représentation ; un ETag fort devrait différer selon le codage
+    return f'W/"{h.hexdigest()[:32]}"'
+
+
+def _matches(request: Request, etag: str) -> bool:
+    # comparaison faible, celle d'If-None-Match : le préfixe W/ est ignoré des deux côtés
+    header = request.headers.get("if-none-match", "")
+    return any(tag.strip().removeprefix("W/") == etag.removeprefix("W/") for tag in header.split(","))
+
+
+class HttpCacheMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        rule = RULES.get(request.url.path) if request.method in ("GET", "HEAD") else None
+        checked = rule[0](request.query_params) if rule else None
+        if checked is None:
+            return await call_next(request)
+
+        last_day, settle_days, until = checked
+        yearly = rule[1]
+        request.state.no_store = False
+        headers = {"Vary": "Accept"}
+        # secondes avant que la réponse change d'elle-même (minuit local, comme date.today())
+        left = max(int((datetime.combine(until, datetime.min.time()) - datetime.now()).total_seconds()), 0) if until else None
+
+        if last_day <= date.today() - timedelta(days=settle_days):
+            max_age = MAX_AGE
+            if yearly:
+                # la réponse change au 1er janvier (nouvelle période de référence)
+                now = datetime.now(timezone.utc)
+                max_age = min(max_age, int((datetime(now.year + 1, 1, 1, tzinfo=timezone.utc) - now).total_seconds()))
+            if left is not None:
+                max_age = min(max_age, left)
+            # avec until : le jour venu, l'ETag déjà distribué ne correspond plus (nouvelle réponse)
+            etag = _etag(VERSION, request.url.path, str(sorted(request.query_params.multi_items())),
+                         request.headers.get("accept", ""), str(date.today().year) if yearly else "",
+                         str(until) if until else "")
+            headers.update({"ETag": etag, "Cache-Control": f"public, max-age={max_age}"})
+            if _matches(request, etag):
+                metrics.cache_events.inc(cache="http_etag", result="hit")
+                return Response(status_code=304, headers=headers)
+
+            metrics.cache_events.inc(cache="http_etag", result="miss")
+            response = await call_next(request)
+            if response.status_code == 200:
+                response.headers.update(headers if not request.state.no_store else {"Cache-Control": "no-store"})
+            return response
+
+        response = await call_next(request)
+        if response.status_code != 200:
+            return response
+        if request.state.no_store:
+            response.headers["Cache-Control"] = "no-store"
+            return response
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        max_age = SHORT_MAX_AGE if left is None else min(SHORT_MAX_AGE, left)
+        headers.update({"ETag": _etag(VERSION, body), "Cache-Control": f"public, max-age={max_age}"})
+        if _matches(request, headers["ETag"]):
+            metrics.cache_events.inc(cache="http_etag", result="hit_after_render")
+            return Response(status_code=304, headers=headers)
+        passthrough = {k: v for k, v in response.headers.items() if k.lower() != "content-length"}
+        return Response(body, status_code=200, headers={**passthrough, **headers}, media_type=response.media_type)
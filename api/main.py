@@ -9,8 +9,18 @@ from api.routes.auth.register import router as register_router
 from api.routes.merra2 import router as merra2_router
 from api.routes.algo import router as algo_router
 from api.db.session import connect_db, disconnect_db
+from api.upstream.client import connect_http, disconnect_http
+from api.eonet.store import events as eonet_events
+from api.power.prewarm import prewarmer
 from fastapi.middleware.cors import CORSMiddleware
 from api.routes.auth.favorites import router as favorite_router
+from api.routes.status import router as status_router
+from api.routes.dashboard import router as dashboard_router
+from api.routes.profiles import router as profiles_router
+from api.http_cache import HttpCacheMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse
+from api import metrics, profiling
 from dotenv import load_dotenv
 import os
 
@@ -19,10 +29,23 @@ load_dotenv()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await connect_db()
+    await connect_http()
+    metrics.start()
+    profiling.start()
+    eonet_events.start()
+    prewarmer.start()
     yield
+    await prewarmer.stop()
+    await profiling.stop()
+    await metrics.stop()
+    await eonet_events.stop()
+    await disconnect_http()
     await disconnect_db()
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=metrics.TimedJSONResponse)
+
+# ajouté avant CORS pour que les 304 passent aussi par CORSMiddleware
+app.add_middleware(HttpCacheMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -32,6 +55,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+COMPRESS_MIN_SIZE = int(os.getenv("HTTP_COMPRESS_MIN_SIZE", "1024"))
+try:
+    # Brotli si brotli-asgi est installé (gzip pour les clients qui ne le supportent pas)
+    from brotli_asgi import BrotliMiddleware
+    app.add_middleware(BrotliMiddleware, minimum_size=COMPRESS_MIN_SIZE, gzip_fallback=True)
+except ImportError:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESS_MIN_SIZE)
+
+# profilage à la demande (/algo), inactif sans PROFILE_ADMIN_TOKEN ni PROFILE_SAMPLE_RATE
+app.add_middleware(profiling.ProfilingMiddleware)
+
+# le plus à l'extérieur : mesure la requête entière et ajoute Server-Timing
+app.add_middleware(metrics.MetricsMiddleware)
+
 from .routes.gibs import router as gibs_router
 from api.routes.weather import rainfall
 
@@ -43,8 +80,15 @@ app.include_router(algo_router, prefix="/algo", tags=["Algo"])
 app.include_router(rainfall.router, prefix="/weather", tags=["Weather"])
 app.include_router(merra2_router, prefix="/merra2", tags=["MERRA-2"])
 app.include_router(favorite_router, prefix="/auth", tags=["Favorites"])
+app.include_router(status_router, prefix="/status", tags=["Status"])
+app.include_router(dashboard_router, tags=["Dashboard"])
+app.include_router(profiles_router, prefix="/profiles", tags=["Profiling"])
 
 @app.get("/")
 def root():
     return {"message": "Hello, FastAPI!"}
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
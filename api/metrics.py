@@ -0,0 +1,260 @@
+"""
+Métriques au format texte Prometheus (GET /metrics) et en-tête Server-Timing.
+
+Pas de dépendance : compteurs et histogrammes en mémoire du processus (un worker =
+une cible à scraper). Les états déjà tenus ailleurs (caches, hôtes amont, pool bcrypt,
+threads) sont lus au moment du scrape par des collecteurs.
+
+Server-Timing découpe chaque requête en :
+- upstream : temps d'horloge pendant lequel au moins un appel amont était attendu,
+- serialize : rendu de la réponse (JSON, MessagePack, Arrow),
+- compute : le reste, jusqu'à l'envoi des en-têtes,
+- total.
+"""
+from contextvars import ContextVar
+import asyncio
+import os
+import time
+import anyio.to_thread
+from fastapi.responses import JSONResponse
+
+LOOP_LAG_INTERVAL = float(os.getenv("METRICS_LOOP_LAG_INTERVAL", "0.5"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+_metrics: list = []
+_collectors: list = []
+
+
+def _labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values)
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(names, escaped)) + "}"
+
+
+def _number(v: float) -> str:
+    return repr(float(v)) if v != int(v) else str(int(v))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name, self.help, self.labelnames = name, help, labels
+        self.values: dict[tuple, float] = {}
+        _metrics.append(self)
+
+    def inc(self, value: float = 1, **labels):
+        key = tuple(labels[k] for k in self.labelnames)
+        self.values[key] = self.values.get(key, 0) + value
+
+    def render(self) -> list[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        out += [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in self.values.items()]
+        return out
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames, self.buckets = name, help, labels, buckets
+        # étiquettes -> [compte par seau (non cumulé), somme, nombre]
+        self.values: dict[tuple, list] = {}
+        _metrics.append(self)
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels[k] for k in self.labelnames)
+        entry = self.values.get(key)
+        if entry is None:
+            entry = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                entry[0][i] += 1
+                break
+        entry[1] += value
+        entry[2] += 1
+
+    def render(self) -> list[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        for key, (counts, total, n) in self.values.items():
+            cumulative = 0
+            for bound, c in zip(self.buckets, counts):
+                cumulative += c
+                out.append(f"{self.name}_bucket{_labels(names, key + (_number(bound),))} {cumulative}")
+            out.append(f"{self.name}_bucket{_labels(names, key + ('+Inf',))} {n}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, key)} {n}")
+        return out
+
+
+def collector(fn):
+    """
+    fn() -> [(nom, type, aide, [(étiquettes dict, valeur)])], appelé à chaque scrape.
+    Utilisable en décorateur.
+    """
+    _collectors.append(fn)
+    return fn
+
+
+def render() -> str:
+    lines = []
+    for m in _metrics:
+        lines += m.render()
+    for fn in _collectors:
+        for name, kind, help, samples in fn():
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+            for labels, value in samples:
+                if value is not None:
+                    lines.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# --- métriques partagées -------------------------------------------------------------
+
+http_requests = Histogram("http_request_duration_seconds", "Requêtes HTTP par route (jusqu'au dernier octet)",
+                          ("route", "method", "status"))
+upstream_requests = Histogram("upstream_request_duration_seconds", "Appels amont par hôte (hedging compris)",
+                              ("host", "status"))
+upstream_bytes = Counter("upstream_response_bytes_total", "Octets reçus des hôtes amont", ("host",))
+upstream_parse = Histogram("upstream_json_parse_seconds", "Analyse JSON des réponses amont", ("host",),
+                           buckets=FAST_BUCKETS)
+power_fetches = Histogram("power_fetch_duration_seconds", "Appels NASA POWER par jeu de paramètres",
+                          ("params",))
+mongo_queries = Histogram("mongo_query_duration_seconds", "Requêtes MongoDB", ("op",), buckets=FAST_BUCKETS)
+cache_events = Counter("cache_requests_total", "Accès aux caches (hit, miss, stale...)", ("cache", "result"))
+loop_lag = Histogram("event_loop_lag_seconds", "Retard de la boucle d'événements sur une attente planifiée",
+                     buckets=FAST_BUCKETS)
+
+
+@collector
+def _threadpool():
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    return [
+        ("threadpool_busy_threads", "gauge", "Threads anyio occupés (routes sync, to_thread)",
+         [({}, limiter.borrowed_tokens)]),
+        ("threadpool_max_threads", "gauge", "Taille du pool de threads anyio", [({}, limiter.total_tokens)]),
+        ("threadpool_waiting_tasks", "gauge", "Tâches en attente d'un thread anyio",
+         [({}, limiter.statistics().tasks_waiting)]),
+    ]
+
+
+# --- Server-Timing ---------------------------------------------------------------------
+
+class Timing:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.upstream = 0.0
+        self.serialize = 0.0
+        self._active = 0
+        self._since = 0.0
+
+    def upstream_enter(self):
+        if self._active == 0:
+            self._since = time.perf_counter()
+        self._active += 1
+
+    def upstream_exit(self):
+        self._active -= 1
+        if self._active == 0:
+            self.upstream += time.perf_counter() - self._since
+
+    def header(self) -> str:
+        total = time.perf_counter() - self.started
+        compute = max(total - self.upstream - self.serialize, 0.0)
+        return ", ".join(f"{k};dur={v * 1000:.1f}" for k, v in
+                         (("upstream", self.upstream), ("compute", compute), ("serialize", self.serialize), ("total", total)))
+
+
+_timing: ContextVar[Timing | None] = ContextVar("timing", default=None)
+
+
+class upstream_wait:
+    """Bloc (async with) compté comme attente amont de la requête en cours."""
+
+    async def __aenter__(self):
+        self.timing = _timing.get()
+        if self.timing:
+            self.timing.upstream_enter()
+
+    async def __aexit__(self, *exc):
+        if self.timing:
+            self.timing.upstream_exit()
+
+
+class serializing:
+    """Bloc (with) compté comme sérialisation de la réponse en cours."""
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc):
+        timing = _timing.get()
+        if timing:
+            timing.serialize += time.perf_counter() - self.started
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse dont le rendu est compté dans serialize (classe de réponse par défaut de l'app)."""
+
+    def render(self, content) -> bytes:
+        with serializing():
+            return super().render(content)
+
+
+class MetricsMiddleware:
+    """Middleware ASGI : histogramme par route et en-tête Server-Timing."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        timing = Timing()
+        token = _timing.set(timing)
+        status = 500
+
+        async def send_timed(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"server-timing", timing.header().encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            _timing.reset(token)
+            route = scope.get("route")
+            http_requests.observe(time.perf_counter() - timing.started,
+                                  route=getattr(route, "path", "unmatched"), method=scope["method"], status=status)
+
+
+# --- retard de la boucle ------------------------------------------------------------------
+
+_lag_task: asyncio.Task | None = None
+
+
+async def _measure_lag():
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        loop_lag.observe(max(time.perf_counter() - started - LOOP_LAG_INTERVAL, 0.0))
+
+
+def start():
+    global _lag_task
+    if _lag_task is None:
+        _lag_task = asyncio.create_task(_measure_lag())
+
+
+async def stop():
+    global _lag_task
+    if _lag_task is not None:
+        _lag_task.cancel()
+        try:
+            await _lag_task
+        except asyncio.CancelledError:
+            pass
+        _lag_task = None
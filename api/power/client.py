@@ -0,0 +1,40 @@
+from datetime import date
+from urllib.parse import urlsplit
+import os
+import time
+from api import metrics
+from api.upstream import client as http
+
+# surchargeable pour les bancs d'essai (bench/stub.py)
+NASA_POWER_URL = os.getenv("POWER_URL", "https://power.larc.nasa.gov/api/temporal/daily/point")
+POWER_HOST = urlsplit(NASA_POWER_URL).hostname
+PARAMS = ["T2M", "T2M_MIN", "T2M_MAX", "RH2M", "U2M", "V2M", "PS", "PRECTOTCORR"]
+
+
+class PowerResponseError(ValueError):
+    """Réponse NASA POWER sans bloc properties.parameter."""
+
+
+async def fetch_daily(lat: float, lon: float, params: list[str], start: date, end: date, timeout: float = 40):
+    """
+    Appel brut à NASA POWER (daily/point). Retourne (parameter, header) où
+    parameter = { PARAM: { "YYYYMMDD": valeur } }. Lève httpx.HTTPError si l'appel échoue.
+    """
+    started = time.perf_counter()
+    resp = await http.get(NASA_POWER_URL, params={
+        "parameters": ",".join(params),
+        "start": f"{start:%Y%m%d}",
+        "end": f"{end:%Y%m%d}",
+        "latitude": lat,
+        "longitude": lon,
+        "community": "RE",
+        "format": "JSON",
+    }, timeout=timeout)
+    parsed = time.perf_counter()
+    data = resp.json()
+    metrics.upstream_parse.observe(time.perf_counter() - parsed, host=POWER_HOST)
+    metrics.power_fetches.observe(time.perf_counter() - started, params=",".join(sorted(params)))
+
+    if "properties" not in data or "parameter" not in data["properties"]:
+        raise PowerResponseError("Réponse NASA POWER inattendue")
+    return data["properties"]["parameter"], data.get("header", {})
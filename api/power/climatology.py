@@ -0,0 +1,153 @@
+"""
+Moteur de climatologie vectorisé.
+
+Les séries d'une maille sont des tableaux float64 alignés jour par jour (un par
+paramètre), accompagnés d'un index calendaire : année et créneau jour-de-l'année
+sur un calendrier de 366 jours (29 février = créneau 59). Les fenêtres
+±window_days autour du jour cible, sur toutes les années de base, sont
+sélectionnées en une fois et les statistiques de tous les paramètres sont
+calculées d'un seul passage.
+"""
+from datetime import date, timedelta
+import numpy as np
+
+# Premier créneau de chaque mois dans un calendrier bissextile
+_MONTH_START = np.array([0, 31, 60, 91, 121, 152, 182, 213, 244, 274, 305, 335])
+
+
+def slot(month: int, day: int) -> int:
+    return int(_MONTH_START[month - 1]) + day - 1
+
+
+def centers(month: int, day: int, years: range) -> list[date]:
+    """Jour cible de chaque année de base (le 29 février n'existe que les années bissextiles)."""
+    out = []
+    for y in years:
+        try:
+            out.append(date(y, month, day))
+        except ValueError:
+            continue
+    return out
+
+
+def span(month: int, day: int, years: range, window_days: int) -> tuple[date, date] | None:
+    """Période à charger pour couvrir toutes les fenêtres, None si aucun jour cible."""
+    c = centers(month, day, years)
+    if not c:
+        return None
+    return c[0] - timedelta(days=window_days), c[-1] + timedelta(days=window_days)
+
+
+def period(month: int, day: int, years: range, window_days: int) -> dict:
+    """Période de référence telle que renvoyée par les routes de prédiction."""
+    c = centers(month, day, years)
+    if not c:
+        return {"start": None, "end": None, "nb_jours": 0}
+    return {
+        "start": (c[0] - timedelta(days=window_days)).strftime("%Y-%m-%d"),
+        "end": (c[-1] + timedelta(days=window_days)).strftime("%Y-%m-%d"),
+        "nb_jours": len(c) * max(2 * window_days + 1, 0),
+    }
+
+
+def summary(params: list[str], n, mean, std, lo=None, hi=None) -> dict[str, dict]:
+    """
+    Statistiques par paramètre au format commun (moteur, fenêtres glissantes, cube des normales),
+    plus "wind" = norme du vent moyen (U2M, V2M).
+    """
+    out = {}
+    for i, p in enumerate(params):
+        k = int(n[i])
+        out[p] = {
+            "n": k,
+            "mean": float(mean[i]) if k else None,
+            "std": float(std[i]) if k > 1 else None,
+            "min": float(lo[i]) if k and lo is not None else None,
+            "max": float(hi[i]) if k and hi is not None else None,
+        }
+    u, v = out.get("U2M", {}).get("mean"), out.get("V2M", {}).get("mean")
+    out["wind"] = {"mean": (u ** 2 + v ** 2) ** 0.5 if u is not None and v is not None else None}
+    return out
+
+
+class Series:
+    def __init__(self, start: date, columns: dict[str, np.ndarray]):
+        self.start = start
+        self.columns = columns
+        n = len(next(iter(columns.values()))) if columns else 0
+        days = np.datetime64(start, "D") + np.arange(n)
+        months = days.astype("datetime64[M]")
+        self.year = months.astype("datetime64[Y]").astype(int) + 1970
+        self.slot = _MONTH_START[months.astype(int) % 12] + (days - months).astype(int)
+
+    def date(self, pos: int) -> date:
+        return self.start + timedelta(days=int(pos))
+
+    def window(self, month: int, day: int, years: range, window_days: int) -> np.ndarray:
+        """Positions des jours de référence, année par année dans l'ordre chronologique."""
+        mask = (self.slot == slot(month, day)) & (self.year >= years.start) & (self.year < years.stop)
+        c = np.flatnonzero(mask)
+        pos = (c[:, None] + np.arange(-window_days, window_days + 1)).ravel()
+        return pos[(pos >= 0) & (pos < len(self.slot))]
+
+    def stats(self, positions: np.ndarray, params: list[str] | None = None) -> dict[str, dict]:
+        """
+        n, mean, std (population), min, max par paramètre sur les positions données,
+        jours manquants (NaN) ignorés (voir summary).
+        Moyennes identiques à l'ancien calcul en Python pur (sommes séquentielles comme sum()),
+        écart-type en deux passes comme statistics.pstdev, égal aux arrondis près.
+        """
+        params = params or list(self.columns)
+        block = np.stack([self.columns[p] for p in params])[:, positions]
+        valid = ~np.isnan(block)
+        n = valid.sum(axis=1)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if block.shape[1]:
+                sums = np.add.accumulate(np.where(valid, block, 0.0), axis=1)[:, -1]
+            else:
+                sums = np.zeros(len(params))
+            mean = sums / n
+            dev = np.where(valid, block - mean[:, None], 0.0)
+            std = np.sqrt((dev * dev).sum(axis=1) / n)
+            lo = np.where(valid, block, np.inf).min(axis=1, initial=np.inf)
+            hi = np.where(valid, block, -np.inf).max(axis=1, initial=-np.inf)
+
+        return summary(params, n, mean, std, lo, hi)
+
+    def sliding_stats(self, targets: list[tuple[int, int]], years: range, window_days: int,
+                      params: list[str] | None = None) -> list[dict]:
+        """
+        Équivalent de stats(window(month, day, ...)) pour chaque (month, day) de targets,
+        par sommes préfixées le long de la série : chaque fenêtre coûte deux lectures,
+        soit O(jours × années) au lieu de O(jours × années × fenêtre). Pas de min/max ;
+        moyennes et écarts-types égaux à ceux de stats() aux arrondis près (sommes préfixées).
+        """
+        params = params or list(self.columns)
+        block = np.stack([self.columns[p] for p in params])
+        valid = ~np.isnan(block)
+        filled = np.where(valid, block, 0.0)
+        zero = np.zeros((len(params), 1))
+        S = np.concatenate([zero, filled.cumsum(axis=1)], axis=1)
+        Q = np.concatenate([zero, (filled * filled).cumsum(axis=1)], axis=1)
+        C = np.concatenate([zero, valid.cumsum(axis=1)], axis=1)
+
+        # position du jour cible de chaque année de base, par créneau (-1 si absent)
+        n = len(self.slot)
+        centers = np.full((366, max(len(years), 0)), -1)
+        in_years = np.flatnonzero((self.year >= years.start) & (self.year < years.stop))
+        centers[self.slot[in_years], self.year[in_years] - years.start] = in_years
+
+        c = centers[[slot(m, d) for m, d in targets]]                    # (cibles, années)
+        ok = c >= 0
+        lo = np.clip(c - window_days, 0, n)
+        hi = np.clip(c + window_days + 1, 0, n)
+        sums = np.where(ok, S[:, hi] - S[:, lo], 0.0).sum(axis=2)     # (params, cibles)
+        sq = np.where(ok, Q[:, hi] - Q[:, lo], 0.0).sum(axis=2)
+        counts = np.where(ok, C[:, hi] - C[:, lo], 0.0).sum(axis=2)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = sums / counts
+            std = np.sqrt(np.maximum(sq / counts - mean * mean, 0.0))
+
+        return [summary(params, counts[:, t], mean[:, t], std[:, t]) for t in range(len(targets))]
@@ -0,0 +1,165 @@
+"""
+Formats de sortie des routes.
+
+- Flux : une ligne par jour (date puis une valeur par paramètre), émise année par
+  année dès que store.iter_columns la fournit (?stream=ndjson|csv).
+- Négociation (en-tête Accept) : JSON habituel, disposition en colonnes (une date de
+  début et un tableau dense par paramètre ; inchangée pour les réponses sans série),
+  MessagePack ou Arrow IPC. msgpack et pyarrow sont dans requirements.txt mais importés
+  à la demande : une installation sans eux sert toujours le JSON et répond 406 aux
+  clients qui n'acceptent qu'eux.
+"""
+from datetime import date
+import importlib.util
+import json
+import math
+import numpy as np
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from api.metrics import serializing
+from api.power.store import day_index, date_keys
+
+STREAM_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _value(v: float, null: str) -> str:
+    return repr(v) if math.isfinite(v) else null
+
+
+def _lines(fmt: str, start: date, columns: dict) -> str:
+    params = list(columns)
+    rows = zip(date_keys(day_index(start), day_index(start) + len(columns[params[0]]) - 1),
+               *(columns[p].tolist() for p in params))
+    if fmt == "csv":
+        return "".join(",".join([k, *(_value(v, "") for v in values)]) + "\n" for k, *values in rows)
+    return "".join(
+        '{"date":"' + k + '",' + ",".join(f'"{p}":{_value(v, "null")}' for p, v in zip(params, values)) + "}\n"
+        for k, *values in rows
+    )
+
+
+async def stream_response(chunks, params: list[str], fmt: str) -> StreamingResponse:
+    """
+    Réponse en flux à partir de store.iter_columns. La première année est attendue avant
+    d'envoyer quoi que ce soit : si elle échoue, son erreur est levée et la route peut encore
+    répondre par un code d'erreur. Ensuite, les jours d'une année en échec sortent vides.
+    """
+    first = await anext(chunks, None)
+    if first is not None and first[2] is not None:
+        await chunks.aclose()
+        raise first[2]
+
+    async def body():
+        if fmt == "csv":
+            yield ("date," + ",".join(params) + "\n").encode()
+        if first is None:
+            return
+        start, columns, _ = first
+        yield _lines(fmt, start, columns).encode()
+        async for start, columns, _ in chunks:
+            yield _lines(fmt, start, columns).encode()
+
+    return StreamingResponse(body(), media_type=STREAM_FORMATS[fmt])
+
+
+JSON = "application/json"
+COLUMNAR = "application/vnd.weathermellon.columnar+json"
+MSGPACK = "application/msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+
+_ALIASES = {"application/x-msgpack": MSGPACK, "application/vnd.msgpack": MSGPACK, "*/*": JSON, "application/*": JSON}
+# format -> module optionnel qui le produit
+_OPTIONAL = {MSGPACK: "msgpack", ARROW: "pyarrow"}
+
+
+def _accepted(accept: str) -> list[str]:
+    """Types de l'en-tête Accept par préférence décroissante (q=0 exclus)."""
+    ranked = []
+    for i, part in enumerate(accept.split(",")):
+        media, *options = [x.strip() for x in part.split(";")]
+        q = 1.0
+        for o in options:
+            if o.startswith("q="):
+                try:
+                    q = float(o[2:])
+                except ValueError:
+                    q = 0.0
+        if media and q > 0:
+            ranked.append((-q, i, media.lower()))
+    return [media for _, _, media in sorted(ranked)]
+
+
+def negotiate(request: Request) -> str:
+    """
+    Format de réponse d'après l'en-tête Accept. Sans préférence connue : JSON, comme avant.
+    406 si les seuls formats connus acceptés dépendent d'un module non installé.
+    """
+    unavailable = []
+    for media in _accepted(request.headers.get("accept", "")):
+        media = _ALIASES.get(media, media)
+        if media in (JSON, COLUMNAR):
+            return media
+        if media in _OPTIONAL:
+            if importlib.util.find_spec(_OPTIONAL[media]):
+                return media
+            unavailable.append(media)
+    if unavailable:
+        raise HTTPException(406, f"Format non disponible sur ce serveur : {', '.join(unavailable)}")
+    return JSON
+
+
+def columns_json(start: date, columns: dict[str, np.ndarray]) -> dict:
+    """Disposition en colonnes d'une série : date de début et un tableau par paramètre (null = jour inconnu)."""
+    return {
+        "start": f"{start:%Y%m%d}",
+        "columns": {p: [v if v == v else None for v in col.tolist()] for p, col in columns.items()},
+    }
+
+
+def series_table(start: date, columns: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    """Colonnes de la table Arrow d'une série : date puis un float64 par paramètre."""
+    n = len(next(iter(columns.values()))) if columns else 0
+    return {"date": np.datetime64(start, "D") + np.arange(n), **columns}
+
+
+def records_columns(records: list[dict]) -> dict[str, list]:
+    """Liste d'objets -> un tableau par clé (null quand un objet n'a pas la clé)."""
+    keys = list(dict.fromkeys(k for r in records for k in r))
+    return {k: [r.get(k) for r in records] for k in keys}
+
+
+def respond(fmt: str, payload: dict, table=None, table_key: str | None = None):
+    """
+    Réponse au format négocié. payload est déjà dans la disposition voulue (colonnes pour
+    tout format autre que JSON). Une réponse sans série ni liste d'objets (une prédiction,
+    une analyse) n'a pas d'autre disposition : en COLUMNAR, c'est le JSON habituel tel quel. Pour Arrow, table (colonnes ou liste d'objets) devient la
+    table et le reste de payload va dans les métadonnées du schéma (clé "meta") ; sans
+    table, payload devient une table d'une ligne.
+    """
+    if fmt == JSON:
+        return payload
+    with serializing():
+        if fmt == COLUMNAR:
+            return JSONResponse(payload, media_type=COLUMNAR)
+        if fmt == MSGPACK:
+            import msgpack
+            return Response(msgpack.packb(payload), media_type=MSGPACK)
+        return _arrow(payload, table, table_key)
+
+
+def _arrow(payload: dict, table, table_key: str | None) -> Response:
+    import pyarrow as pa
+    if table is None:
+        t = pa.Table.from_pylist([payload])
+    elif isinstance(table, list):
+        # schéma tiré de tous les objets, pas seulement du premier
+        t = pa.table(records_columns(table))
+    else:
+        t = pa.table({k: pa.array(v, from_pandas=True) for k, v in table.items()})
+    if table is not None:
+        meta = {k: v for k, v in payload.items() if k != table_key}
+        t = t.replace_schema_metadata({"meta": json.dumps(meta)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, t.schema) as writer:
+        writer.write_table(t)
+    return Response(sink.getvalue().to_pybytes(), media_type=ARROW)
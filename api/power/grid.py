@@ -0,0 +1,65 @@
+"""
+Grille NASA POWER (MERRA-2) : 0.5° en latitude, 0.625° en longitude.
+
+Toutes les coordonnées d'une même maille renvoient exactement les mêmes séries
+journalières : on ramène chaque requête à sa maille, à un jeu de paramètres
+trié et à des dates bornées, ce qui donne une clé unique partagée par le
+stockage local, la déduplication et les caches.
+"""
+from datetime import date
+from typing import NamedTuple
+
+LAT_STEP = 0.5
+LON_STEP = 0.625
+# Premier jour disponible dans POWER daily/point
+EPOCH = date(1981, 1, 1)
+
+
+class PowerQuery(NamedTuple):
+    cell: tuple[float, float]
+    params: tuple[str, ...]
+    start: date
+    end: date
+
+    @property
+    def key(self) -> str:
+        return f"power:daily:{cell_id(self.cell)}:{','.join(self.params)}:{self.start:%Y%m%d}-{self.end:%Y%m%d}"
+
+
+def snap(lat: float, lon: float) -> tuple[float, float]:
+    """Ramène (lat, lon) au centre de la maille POWER qui le contient."""
+    lat = max(-90.0, min(90.0, lat))
+    lon = ((lon + 180.0) % 360.0) - 180.0
+    cell_lat = round(lat / LAT_STEP) * LAT_STEP
+    cell_lon = round(lon / LON_STEP) * LON_STEP
+    if cell_lon >= 180.0:
+        cell_lon -= 360.0
+    return round(cell_lat, 3), round(cell_lon, 3)
+
+
+def cell_id(cell: tuple[float, float]) -> str:
+    """Identifiant stable d'une maille, utilisable comme nom de dossier."""
+    lat, lon = cell
+    return f"{lat:+08.3f}_{lon:+09.3f}"
+
+
+def parse_cell_id(value: str) -> tuple[float, float]:
+    lat, lon = value.split("_")
+    return float(lat), float(lon)
+
+
+def cell_info(cell: tuple[float, float]) -> dict:
+    """Maille telle que renvoyée aux clients, pour qu'ils puissent la réutiliser."""
+    return {"id": cell_id(cell), "lat": cell[0], "lon": cell[1], "lat_step": LAT_STEP, "lon_step": LON_STEP}
+
+
+def normalize_params(params) -> tuple[str, ...]:
+    """Ex. "t2m, PS,T2M" -> ("PS", "T2M")."""
+    if isinstance(params, str):
+        params = params.split(",")
+    return tuple(sorted({p.strip().upper() for p in params if p.strip()}))
+
+
+def canonical(lat: float, lon: float, params, start: date, end: date) -> PowerQuery:
+    """Forme canonique d'une requête POWER journalière (maille, paramètres triés, dates bornées)."""
+    return PowerQuery(snap(lat, lon), normalize_params(params), max(start, EPOCH), min(end, date.today()))
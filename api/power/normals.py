@@ -0,0 +1,202 @@
+"""
+Cube des normales jour-de-l'année, par maille.
+
+Pour chaque paramètre, les valeurs journalières du stockage local sont rangées
+dans une grille (année, créneau jour-de-l'année sur 366 jours) et on garde les
+sommes préfixées 2D de : somme, somme des carrés, nombre de valeurs et nombre
+de jours non couverts par le stockage. N'importe quelle combinaison
+(base_years, window_days) se lit alors en quelques différences de rectangles,
+sans appel POWER. Le cube est un .npy ouvert en mémoire partagée (mmap).
+
+Usage hors ligne :
+    python -m api.power.normals                 # toutes les mailles du stockage
+    python -m api.power.normals 45.5 -73.6 --fetch
+"""
+from datetime import date
+import asyncio
+import json
+import os
+import sys
+import numpy as np
+from api import metrics
+from api.power import climatology, grid
+from api.power.grid import EPOCH
+from api.power.store import store, index_date
+
+SUM, SUMSQ, COUNT, GAPS = range(4)
+SLOTS = 366
+# Au-delà, une fenêtre pourrait traverser deux fois la fin d'année
+MAX_WINDOW_DAYS = 150
+FEB29 = climatology.slot(2, 29)
+
+# maille -> (meta, cube, version de coverage.json déjà comparée à meta["coverage"])
+_open: dict[str, tuple[dict, np.ndarray, tuple | None]] = {}
+_building: dict[str, asyncio.Task] = {}
+
+
+def build(cell) -> dict | None:
+    """(Re)construit le cube d'une maille à partir de ce que contient le stockage."""
+    cov = store.coverage(cell)
+    params = sorted(p for p in cov if cov[p])
+    if not params:
+        return None
+
+    last_year = index_date(max(r[1] for p in params for r in cov[p])).year
+    n_years = last_year - EPOCH.year + 1
+    columns = store.read(cell, params, EPOCH, date(last_year, 12, 31))
+    series = climatology.Series(EPOCH, columns)
+    rows, slots = series.year - EPOCH.year, series.slot
+
+    cube = np.zeros((4, len(params), n_years + 1, SLOTS + 1))
+    for i, p in enumerate(params):
+        covered = np.zeros(len(rows), dtype=bool)
+        for a, b in cov[p]:
+            covered[a:b + 1] = True
+        values = columns[p]
+        ok = covered & ~np.isnan(values)
+
+        g = np.zeros((4, n_years, SLOTS))
+        g[SUM, rows[ok], slots[ok]] = values[ok]
+        g[SUMSQ, rows[ok], slots[ok]] = values[ok] ** 2
+        g[COUNT, rows[ok], slots[ok]] = 1
+        g[GAPS, rows[~covered], slots[~covered]] = 1
+        cube[:, i, 1:, 1:] = g.cumsum(axis=1).cumsum(axis=2)
+
+    meta = {"params": params, "year0": EPOCH.year, "years": n_years, "coverage": cov}
+    store.write_file(cell, "normals.npy", lambda f: np.save(f, cube))
+    store.write_file(cell, "normals.json", lambda f: f.write(json.dumps(meta).encode()))
+    _open.pop(grid.cell_id(cell), None)
+    return meta
+
+
+def _load(cell) -> tuple[dict, np.ndarray, tuple | None] | None:
+    key = grid.cell_id(cell)
+    if key not in _open:
+        meta = store.load_json(cell, "normals.json")
+        if not meta:
+            return None
+        try:
+            cube = np.load(store.path(cell, "normals.npy"), mmap_mode="r")
+        except FileNotFoundError:
+            return None
+        _open[key] = (meta, cube, None)
+    return _open[key]
+
+
+def _current(cell) -> tuple[dict, np.ndarray] | None:
+    """
+    Cube de la maille s'il reflète la couverture actuelle du stockage, sinon None.
+    coverage.json n'est relu et comparé que s'il a changé depuis la dernière
+    vérification : un lookup ordinaire ne coûte qu'un stat.
+    """
+    stamp = store.stamp(cell, "coverage.json")
+    loaded = _load(cell)
+    if loaded is None:
+        return None
+    if loaded[2] is not None and loaded[2] == stamp:
+        return loaded[0], loaded[1]
+
+    cov = store.coverage(cell)
+    if loaded[0]["coverage"] != cov:
+        # peut-être reconstruit par un autre worker : on relit le disque une fois
+        _open.pop(grid.cell_id(cell), None)
+        loaded = _load(cell)
+        if loaded is None or loaded[0]["coverage"] != cov:
+            return None
+    # stamp lu avant coverage : une écriture entre les deux sera revue au prochain appel
+    _open[grid.cell_id(cell)] = (loaded[0], loaded[1], stamp)
+    return loaded[0], loaded[1]
+
+
+def stale(cell) -> bool:
+    """Vrai si le cube est absent ou ne reflète plus la couverture du stockage."""
+    return _current(cell) is None
+
+
+def _rect(cube, r0: int, r1: int, c0: int, c1: int) -> np.ndarray:
+    """Sommes (canal, paramètre) sur les années r0..r1 et créneaux c0..c1 inclus."""
+    return cube[:, :, r1 + 1, c1 + 1] - cube[:, :, r0, c1 + 1] - cube[:, :, r1 + 1, c0] + cube[:, :, r0, c0]
+
+
+def lookup(cell, params: list[str], month: int, day: int, years: range, window_days: int) -> dict | None:
+    st = _lookup(cell, params, month, day, years, window_days)
+    metrics.cache_events.inc(cache="normals_cube", result="miss" if st is None else "hit")
+    return st
+
+
+def _lookup(cell, params: list[str], month: int, day: int, years: range, window_days: int) -> dict | None:
+    """
+    Statistiques des fenêtres ±window_days comme climatology.Series.stats (sans min/max,
+    aux arrondis près : sommes préfixées),
+    ou None si le cube ne peut pas répondre exactement : cube absent ou périmé, fenêtre
+    qui touche le 29 février, années hors du cube ou jours non couverts par le stockage.
+    """
+    loaded = _current(cell)
+    if loaded is None:
+        return None
+    meta, cube = loaded
+    if not set(params) <= set(meta["params"]):
+        return None
+
+    s = climatology.slot(month, day)
+    if not 0 <= window_days <= MAX_WINDOW_DAYS or not len(years):
+        return None
+
+    r0, r1 = years.start - meta["year0"], years.stop - 1 - meta["year0"]
+    # morceaux de la fenêtre : même année, fin de l'année précédente, début de l'année suivante
+    pieces = [(r0, r1, max(s - window_days, 0), min(s + window_days, SLOTS - 1))]
+    if s - window_days < 0:
+        pieces.append((r0 - 1, r1 - 1, SLOTS + s - window_days, SLOTS - 1))
+    if s + window_days >= SLOTS:
+        pieces.append((r0 + 1, r1 + 1, 0, s + window_days - SLOTS))
+
+    total = np.zeros(cube.shape[:2])
+    for a, b, c0, c1 in pieces:
+        # les années non bissextiles n'ont pas de 29 février : la fenêtre en créneaux
+        # ne correspondrait plus à la fenêtre calendaire
+        if b >= meta["years"] or c0 <= FEB29 <= c1:
+            return None
+        a = max(a, 0)  # avant 1981 : POWER n'a pas de données
+        if a <= b:
+            total += _rect(cube, a, b, c0, c1)
+
+    idx = [meta["params"].index(p) for p in params]
+    if total[GAPS, idx].any():
+        return None
+    n = total[COUNT, idx]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total[SUM, idx] / n
+        std = np.sqrt(np.maximum(total[SUMSQ, idx] / n - mean * mean, 0.0))
+    return climatology.summary(params, n, mean, std)
+
+
+async def refresh(cell):
+    """Reconstruction en tâche de fond après de nouvelles écritures dans le stockage (une à la fois par maille)."""
+    key = grid.cell_id(cell)
+    if key in _building:
+        return
+    _building[key] = asyncio.current_task()
+    try:
+        await asyncio.to_thread(build, cell)
+    finally:
+        del _building[key]
+
+
+def _main(argv: list[str]):
+    if len(argv) >= 2 and not argv[0].startswith("-"):
+        cell = grid.snap(float(argv[0]), float(argv[1]))
+        if "--fetch" in argv:
+            from api.power.client import PARAMS
+            from api.power.store import get_columns
+            asyncio.run(get_columns(cell[0], cell[1], PARAMS, EPOCH, date(date.today().year - 1, 12, 31)))
+        cells = [cell]
+    else:
+        cells = [grid.parse_cell_id(name) for name in sorted(os.listdir(store.root))]
+
+    for cell in cells:
+        meta = build(cell)
+        print(f"{grid.cell_id(cell)}: {meta['years'] if meta else 0} années, {', '.join(meta['params']) if meta else '-'}")
+
+
+if __name__ == "__main__":
+    _main(sys.argv[1:])
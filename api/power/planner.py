@@ -0,0 +1,82 @@
+"""
+Planification des appels NASA POWER.
+
+Un ensemble de jours nécessaires pour une maille est regroupé en un minimum
+d'intervalles (jours proches ou séparés d'un an fusionnés), seuls les trous du
+stockage local sont demandés, avec un nombre borné d'appels simultanés. Les
+valeurs sont ensuite relues jour par jour dans le stockage.
+"""
+from datetime import date, timedelta
+import asyncio
+import os
+import math
+import httpx
+from api.power import client
+from api.power.grid import EPOCH
+from api.power.store import store, day_index, fill_with_retry, missing_now, MAX_CONCURRENCY
+
+# Deux jours séparés de moins de MAX_GAP_DAYS tombent dans le même intervalle
+MAX_GAP_DAYS = int(os.getenv("POWER_PLAN_MAX_GAP_DAYS", "366"))
+# Taille maximale d'un appel POWER (les intervalles plus longs sont découpés)
+MAX_SPAN_DAYS = int(os.getenv("POWER_PLAN_MAX_SPAN_DAYS", "3660"))
+
+
+def merge_dates(dates, max_gap: int = MAX_GAP_DAYS) -> list[tuple[date, date]]:
+    """Jours triés -> intervalles [début, fin] couvrant tous les jours."""
+    ranges: list[list[date]] = []
+    for d in sorted(set(dates)):
+        if ranges and (d - ranges[-1][1]).days <= max_gap:
+            ranges[-1][1] = d
+        else:
+            ranges.append([d, d])
+    return [(a, b) for a, b in ranges]
+
+
+def split_span(start: date, end: date, max_span: int = MAX_SPAN_DAYS) -> list[tuple[date, date]]:
+    chunks = []
+    while start <= end:
+        stop = min(end, start + timedelta(days=max_span - 1))
+        chunks.append((start, stop))
+        start = stop + timedelta(days=1)
+    return chunks
+
+
+def plan(cell, params: list[str], dates) -> list[tuple[date, date]]:
+    """Appels POWER à faire pour disposer de tous les jours demandés."""
+    calls = []
+    for r0, r1 in merge_dates(dates):
+        for g0, g1 in missing_now(cell, params, r0, r1):
+            calls.extend(split_span(g0, g1))
+    return calls
+
+
+async def fetch_dates(cell, params: list[str], dates, timeout: float = 30):
+    """
+    Valeurs { jour: { PARAM: valeur | None } } pour chaque jour demandé.
+    Un appel en échec n'empêche pas les autres : ses jours restent à None
+    et l'intervalle est listé dans la seconde valeur retournée.
+    """
+    today = date.today()
+    dates = sorted({d for d in dates if EPOCH <= d <= today})
+    if not dates:
+        return {}, []
+
+    sem = asyncio.Semaphore(MAX_CONCURRENCY)
+    failed = []
+
+    async def run(start, end):
+        async with sem:
+            try:
+                await fill_with_retry(cell, params, start, end, timeout)
+            except (httpx.HTTPError, client.PowerResponseError) as e:
+                failed.append((start, end, e))
+
+    await asyncio.gather(*(run(*c) for c in plan(cell, params, dates)))
+
+    lo = dates[0]
+    columns = store.read(cell, params, lo, dates[-1])
+    out = {}
+    for d in dates:
+        i = day_index(d) - day_index(lo)
+        out[d] = {p: None if math.isnan(col[i]) else float(col[i]) for p, col in columns.items()}
+    return out, failed
@@ -0,0 +1,189 @@
+"""
+Préchauffage en fond des mailles des favoris.
+
+Pendant les heures creuses (PREWARM_HOURS, UTC), une tâche parcourt les mailles
+distinctes des favoris de tous les utilisateurs, des plus partagées aux moins
+partagées. Pour chacune, elle complète dans le stockage local l'historique utilisé
+par les prédictions (PREWARM_BASE_YEARS années), puis reconstruit le cube des normales
+s'il est périmé. /algo/daily/predict et /algo/daily/predict_rain se lisent ensuite
+dans le cube pour n'importe quel jour, sans appel POWER.
+
+Les appels POWER sont comptés dans un budget (PREWARM_REQUESTS_PER_HOUR, seau à
+jetons) : une maille dont les morceaux manquants dépassent le budget restant attend
+le passage suivant. Le seau est débité des appels réellement envoyés, nouvelles
+tentatives et doublons compris, pas de cette estimation. La tâche cède aussi la place tant que des appels POWER du trafic
+réel sont en cours.
+"""
+from datetime import date, datetime, timedelta, timezone
+import asyncio
+import os
+import time
+from api.db import session
+from api.power import client, grid, normals
+from api.power.store import get_columns, power_flight, store, year_chunks
+from api.upstream import resilience
+
+ENABLED = os.getenv("PREWARM_ENABLED", "1") == "1"
+INTERVAL_SECONDS = int(os.getenv("PREWARM_INTERVAL_SECONDS", "900"))
+# heures UTC "début-fin" (fin exclue), ex. "1-6" ; "0-24" = toute la journée
+HOURS = tuple(int(h) for h in os.getenv("PREWARM_HOURS", "1-6").split("-"))
+REQUESTS_PER_HOUR = float(os.getenv("PREWARM_REQUESTS_PER_HOUR", "60"))
+BASE_YEARS = int(os.getenv("PREWARM_BASE_YEARS", "20"))
+# jours cibles vérifiés dans le cube après préchauffage (aujourd'hui compris)
+DAYS_AHEAD = int(os.getenv("PREWARM_DAYS_AHEAD", "7"))
+# fenêtre par défaut des routes de prédiction
+WINDOW_DAYS = 3
+# attente quand le trafic réel a des appels POWER en cours
+YIELD_SECONDS = 5
+
+PARAMS = client.PARAMS
+
+
+def off_peak(now: datetime) -> bool:
+    start, end = HOURS
+    return start <= now.hour < end if start <= end else now.hour >= start or now.hour < end
+
+
+def history_span(today: date) -> tuple[date, date]:
+    """Historique des prédictions : BASE_YEARS années avant l'année en cours, plus la fenêtre à chaque bout."""
+    start = date(today.year - BASE_YEARS, 1, 1) - timedelta(days=WINDOW_DAYS)
+    end = date(today.year - 1, 12, 31) + timedelta(days=WINDOW_DAYS)
+    return start, min(end, today - timedelta(days=1))
+
+
+async def favorite_cells() -> list[tuple[float, float]]:
+    """Mailles distinctes des favoris, de la plus partagée à la moins partagée."""
+    pipeline = [
+        {"$unwind": "$favorites"},
+        {"$group": {"_id": {"lat": "$favorites.lat", "lon": "$favorites.lon"}, "n": {"$sum": 1}}},
+    ]
+    counts: dict[tuple[float, float], int] = {}
+    async for row in session.db["users"].aggregate(pipeline):
+        lat, lon = row["_id"].get("lat"), row["_id"].get("lon")
+        if not isinstance(lat, (int, float)) or not isinstance(lon, (int, float)) or not -90 <= lat <= 90:
+            continue
+        cell = grid.snap(lat, lon)
+        counts[cell] = counts.get(cell, 0) + row["n"]
+    return sorted(counts, key=lambda c: -counts[c])
+
+
+class Prewarmer:
+    def __init__(self):
+        self.tokens = REQUESTS_PER_HOUR
+        self._refilled = time.monotonic()
+        self.passes = 0
+        self.cells_seen = 0
+        self.cells_warmed = 0
+        self.cells_deferred = 0
+        self.upstream_requests = 0
+        self.cube_days = 0
+        self.errors = 0
+        self.last_pass_at: datetime | None = None
+        self._done: dict[str, date] = {}  # maille -> jour du dernier préchauffage complet
+        self._task: asyncio.Task | None = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(REQUESTS_PER_HOUR, self.tokens + (now - self._refilled) * REQUESTS_PER_HOUR / 3600)
+        self._refilled = now
+
+    async def warm(self, cell, today: date) -> bool:
+        """Préchauffe une maille ; False si le budget ne suffit pas (remis au passage suivant)."""
+        start, end = history_span(today)
+        needed = sum(len(year_chunks(a, b)) for a, b in store.missing(cell, PARAMS, start, end))
+        self._refill()
+        # une maille plus grosse que tout le budget passe quand le seau est plein (dette remboursée ensuite)
+        if needed > self.tokens and self.tokens < REQUESTS_PER_HOUR:
+            return False
+        if needed:
+            power = resilience.host(client.POWER_HOST)
+            before = power.calls + power.hedges
+            try:
+                await get_columns(cell[0], cell[1], PARAMS, start, end, timeout=60)
+            finally:
+                # appels envoyés pendant le préchauffage, y compris ceux du trafic réel
+                # arrivés entre-temps : le budget reste une borne haute des appels POWER
+                sent = power.calls + power.hedges - before
+                self.tokens -= sent
+                self.upstream_requests += sent
+        if normals.stale(cell):
+            await normals.refresh(cell)
+
+        years = range(today.year - BASE_YEARS, today.year)
+        for k in range(DAYS_AHEAD):
+            d = today + timedelta(days=k)
+            if normals.lookup(cell, PARAMS, d.month, d.day, years, WINDOW_DAYS) is not None:
+                self.cube_days += 1
+        return True
+
+    async def run_pass(self):
+        today = datetime.now(timezone.utc).date()
+        self.passes += 1
+        self.last_pass_at = datetime.now(timezone.utc)
+        cells = await favorite_cells()
+        self.cells_seen = len(cells)
+        self._done = {k: d for k, d in self._done.items() if d == today}
+        for cell in cells:
+            key = grid.cell_id(cell)
+            if self._done.get(key) == today:
+                continue
+            if not off_peak(datetime.now(timezone.utc)):
+                return
+            while power_flight.stats()["inflight"]:
+                await asyncio.sleep(YIELD_SECONDS)
+            try:
+                warmed = await self.warm(cell, today)
+            except Exception as e:
+                # réseau, réponse POWER inattendue, écriture du stockage ou du cube : on passe à la suivante
+                self.errors += 1
+                print(f"⚠️ Prewarm {key} failed: {e!r}")
+                continue
+            if not warmed:
+                self.cells_deferred += 1
+                return  # budget épuisé : on reprend au prochain réveil, dans le même ordre
+            self._done[key] = today
+            self.cells_warmed += 1
+
+    async def _run(self):
+        while True:
+            if off_peak(datetime.now(timezone.utc)):
+                try:
+                    await self.run_pass()
+                except Exception as e:
+                    # une erreur ne doit pas arrêter le préchauffage pour de bon (CancelledError passe)
+                    self.errors += 1
+                    print(f"⚠️ Prewarm pass failed: {e!r}")
+            await asyncio.sleep(INTERVAL_SECONDS)
+
+    def start(self):
+        if ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._run())
+            print(f"✅ Prewarm scheduler: UTC hours {HOURS[0]}-{HOURS[1]}, {REQUESTS_PER_HOUR:g} POWER requests/h")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            print("❌ Prewarm scheduler stopped.")
+
+    def stats(self) -> dict:
+        self._refill()
+        return {
+            "enabled": ENABLED,
+            "passes": self.passes,
+            "last_pass_at": self.last_pass_at.isoformat() if self.last_pass_at else None,
+            "cells": self.cells_seen,
+            "cells_warmed": self.cells_warmed,
+            "cells_deferred": self.cells_deferred,
+            "upstream_requests": self.upstream_requests,
+            "budget_left": round(max(self.tokens, 0), 1),
+            "cube_days": self.cube_days,
+            "errors": self.errors,
+        }
+
+
+prewarmer = Prewarmer()
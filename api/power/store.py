@@ -0,0 +1,409 @@
+"""
+Stockage local des séries journalières NASA POWER.
+
+Une maille POWER = un dossier, un paramètre = un tableau float64 (.npy) indexé
+par jour depuis EPOCH (NaN = jour absent). coverage.json garde, par paramètre,
+les intervalles [i0, i1] déjà récupérés ; seuls les trous sont redemandés à POWER.
+
+Les derniers jours (moins de SETTLED_DAYS) ne sont jamais marqués comme acquis, mais
+provisional.json garde l'heure de leur dernier téléchargement : pendant
+POWER_FRESH_SECONDS ils sont servis tels quels, puis jusqu'à POWER_MAX_STALE_SECONDS
+servis tout de suite et redemandés en fond (stale-while-revalidate).
+"""
+from datetime import date
+import asyncio
+import json
+import os
+import threading
+import time
+import httpx
+import numpy as np
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+from api import metrics
+from api.power import client, grid
+from api.power.grid import EPOCH
+from api.upstream.singleflight import SingleFlight
+
+STORE_DIR = os.getenv("POWER_STORE_DIR", "data/power")
+# POWER complète encore les derniers jours pendant quelques semaines :
+# ils sont servis mais pas marqués comme acquis, donc redemandés.
+SETTLED_DAYS = int(os.getenv("POWER_SETTLED_DAYS", "60"))
+# Appels POWER simultanés pour une même requête API
+MAX_CONCURRENCY = int(os.getenv("POWER_MAX_CONCURRENCY", "4"))
+# Tentatives par morceau (erreurs réseau, 429 et 5xx seulement)
+RETRY_ATTEMPTS = int(os.getenv("POWER_RETRY_ATTEMPTS", "3"))
+# Jours provisoires : servis sans appel tant qu'ils sont frais, puis servis et rafraîchis en fond
+FRESH_SECONDS = int(os.getenv("POWER_FRESH_SECONDS", "3600"))
+MAX_STALE_SECONDS = int(os.getenv("POWER_MAX_STALE_SECONDS", str(7 * 86400)))
+
+_EPOCH_ORD = EPOCH.toordinal()
+
+_keys: list[str] = []
+_keys_lock = threading.Lock()
+
+
+def day_index(d: date) -> int:
+    return d.toordinal() - _EPOCH_ORD
+
+
+def index_date(i: int) -> date:
+    return date.fromordinal(_EPOCH_ORD + i)
+
+
+def date_keys(i0: int, i1: int) -> list[str]:
+    """Clés "YYYYMMDD" des jours i0..i1 (inclus), mises en cache une fois pour toutes."""
+    if len(_keys) <= i1:
+        with _keys_lock:
+            _keys.extend(index_date(i).strftime("%Y%m%d") for i in range(len(_keys), i1 + 1))
+    return _keys[i0:i1 + 1]
+
+
+def _merge(ranges: list[list[int]]) -> list[list[int]]:
+    out: list[list[int]] = []
+    for a, b in sorted(ranges):
+        if out and a <= out[-1][1] + 1:
+            out[-1][1] = max(out[-1][1], b)
+        else:
+            out.append([a, b])
+    return out
+
+
+def _gaps(covered: list[list[int]], i0: int, i1: int) -> list[list[int]]:
+    gaps, cur = [], i0
+    for a, b in covered:
+        if b < cur:
+            continue
+        if a > i1:
+            break
+        if a > cur:
+            gaps.append([cur, a - 1])
+        cur = b + 1
+        if cur > i1:
+            return gaps
+    if cur <= i1:
+        gaps.append([cur, i1])
+    return gaps
+
+
+class PowerStore:
+    def __init__(self, root: str = STORE_DIR):
+        self.root = root
+        self._locks: dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def path(self, cell, name: str) -> str:
+        return os.path.join(self.root, grid.cell_id(cell), name)
+
+    def _lock(self, cell) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(grid.cell_id(cell), threading.Lock())
+
+    def load_json(self, cell, name: str) -> dict:
+        try:
+            with open(self.path(cell, name)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _load(self, cell, param: str, mmap: bool = False) -> np.ndarray:
+        try:
+            return np.load(self.path(cell, f"{param}.npy"), mmap_mode="r" if mmap else None)
+        except FileNotFoundError:
+            return np.empty(0)
+
+    def write_file(self, cell, name: str, write):
+        # écriture dans un fichier temporaire puis os.replace : un lecteur
+        # concurrent voit soit l'ancien fichier soit le nouveau, jamais un fichier partiel
+        path = self.path(cell, name)
+        # pid et thread : deux workers (ou deux threads) qui écrivent la même maille ne partagent jamais de fichier temporaire
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+
+    def stamp(self, cell, name: str) -> tuple | None:
+        """Version d'un fichier sans le lire (chaque écriture le remplace : nouvel inode), None s'il n'existe pas."""
+        try:
+            st = os.stat(self.path(cell, name))
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def coverage(self, cell) -> dict[str, list[list[int]]]:
+        return self.load_json(cell, "coverage.json")
+
+    def header(self, cell) -> dict:
+        return self.load_json(cell, "header.json")
+
+    def fetched_at(self, cell, params: list[str]) -> dict[int, float]:
+        """Jour provisoire -> heure du plus ancien de ses téléchargements parmi params (tous requis)."""
+        prov = self.load_json(cell, "provisional.json")
+        out = None
+        for p in params:
+            days = {int(i): t for i, t in prov.get(p, {}).items()}
+            out = days if out is None else {i: min(t, days[i]) for i, t in out.items() if i in days}
+        return out or {}
+
+    def missing(self, cell, params: list[str], start: date, end: date) -> list[tuple[date, date]]:
+        """Intervalles de [start, end] qui manquent pour au moins un des paramètres."""
+        i0, i1 = day_index(start), day_index(end)
+        cov = self.coverage(cell)
+        gaps = []
+        for p in params:
+            gaps.extend(_gaps(cov.get(p, []), i0, i1))
+        return [(index_date(a), index_date(b)) for a, b in _merge(gaps)]
+
+    def read(self, cell, params: list[str], start: date, end: date) -> dict[str, np.ndarray]:
+        """Colonnes de start à end (inclus), NaN pour les jours inconnus."""
+        i0, i1 = day_index(start), day_index(end)
+        out = {}
+        for p in params:
+            # en lecture seule : seule la tranche demandée est chargée
+            arr = self._load(cell, p, mmap=True)
+            col = np.full(i1 - i0 + 1, np.nan)
+            lo, hi = max(i0, 0), min(len(arr), i1 + 1)
+            if hi > lo:
+                col[lo - i0:hi - i0] = arr[lo:hi]
+            out[p] = col
+        return out
+
+    def write(self, cell, parameter: dict, header: dict, start: date, end: date):
+        """Fusionne un bloc properties.parameter de POWER couvrant [start, end]."""
+        i0, i1 = day_index(start), day_index(end)
+        settled = min(i1, day_index(date.today()) - SETTLED_DAYS)
+
+        with self._lock(cell):
+            os.makedirs(os.path.dirname(self.path(cell, "x")), exist_ok=True)
+            cov = self.coverage(cell)
+            prov = self.load_json(cell, "provisional.json")
+            now = time.time()
+            for p, values in parameter.items():
+                arr = self._load(cell, p)
+                if len(arr) <= i1:
+                    arr = np.concatenate([arr, np.full(i1 + 1 - len(arr), np.nan)])
+                for k, v in values.items():
+                    i = date(int(k[:4]), int(k[4:6]), int(k[6:8])).toordinal() - _EPOCH_ORD
+                    arr[i] = np.nan if v is None else v
+                self.write_file(cell, f"{p}.npy", lambda f: np.save(f, arr))
+                if settled >= i0:
+                    cov[p] = _merge(cov.get(p, []) + [[i0, settled]])
+                days = {i: t for i, t in prov.get(p, {}).items() if now - t < MAX_STALE_SECONDS and int(i) > settled}
+                days.update({str(i): now for i in range(max(settled + 1, i0), i1 + 1)})
+                prov[p] = days
+
+            self.write_file(cell, "coverage.json", lambda f: f.write(json.dumps(cov).encode()))
+            self.write_file(cell, "provisional.json", lambda f: f.write(json.dumps(prov).encode()))
+            if header and not os.path.exists(self.path(cell, "header.json")):
+                self.write_file(cell, "header.json", lambda f: f.write(json.dumps(header).encode()))
+
+
+store = PowerStore()
+power_flight = SingleFlight("power")
+swr = {"fresh_days": 0, "stale_days": 0, "revalidations": 0, "revalidation_errors": 0}
+_revalidating: set[asyncio.Task] = set()
+
+
+def to_block(start: date, columns: dict[str, np.ndarray]) -> dict[str, dict[str, float]]:
+    """Colonnes -> format POWER { PARAM: { "YYYYMMDD": valeur } }, jours inconnus omis."""
+    i0 = day_index(start)
+    out = {}
+    for p, col in columns.items():
+        keys = date_keys(i0, i0 + len(col) - 1)
+        out[p] = {k: v for k, v in zip(keys, col.tolist()) if v == v}
+    return out
+
+
+async def fill(cell, params: list[str], start: date, end: date, timeout: float = 40):
+    """
+    Télécharge [start, end] pour la maille et l'écrit dans le stockage.
+    Les appels identiques simultanés (même clé canonique) n'en font qu'un.
+    """
+    query = grid.PowerQuery(cell, grid.normalize_params(params), start, end)
+
+    async def run():
+        parameter, header = await client.fetch_daily(cell[0], cell[1], list(query.params), start, end, timeout)
+        await asyncio.to_thread(store.write, cell, parameter, header, start, end)
+
+    await power_flight.do(query.key, run)
+
+
+def _retryable(e: BaseException) -> bool:
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code == 429 or e.response.status_code >= 500
+    return isinstance(e, httpx.TransportError)
+
+
+async def fill_with_retry(cell, params: list[str], start: date, end: date, timeout: float = 40):
+    """fill() avec nouvelles tentatives espacées sur les erreurs passagères."""
+    async for attempt in AsyncRetrying(
+        retry=retry_if_exception(_retryable),
+        stop=stop_after_attempt(RETRY_ATTEMPTS),
+        wait=wait_exponential_jitter(initial=0.5, max=5),
+        reraise=True,
+    ):
+        with attempt:
+            await fill(cell, params, start, end, timeout)
+
+
+def _runs(days: list[int]) -> list[tuple[date, date]]:
+    """Jours (indices triés) -> intervalles de jours consécutifs."""
+    return [(index_date(a), index_date(b)) for a, b in _merge([[i, i] for i in days])]
+
+
+async def _revalidate(cell, params: list[str], start: date, end: date):
+    swr["revalidations"] += 1
+    try:
+        await fill_with_retry(cell, params, start, end)
+    except (httpx.HTTPError, client.PowerResponseError):
+        swr["revalidation_errors"] += 1
+
+
+def missing_now(cell, params: list[str], start: date, end: date) -> list[tuple[date, date]]:
+    """
+    Intervalles de [start, end] à télécharger avant de répondre. Les jours provisoires
+    encore frais n'en font pas partie ; les jours provisoires périmés non plus, mais
+    ils sont redemandés en tâche de fond.
+    """
+    gaps = store.missing(cell, params, start, end)
+    if not gaps:
+        metrics.cache_events.inc(cache="power_store", result="hit")
+        return []
+    fetched = store.fetched_at(cell, params)
+    if not fetched:
+        metrics.cache_events.inc(cache="power_store", result="miss")
+        return gaps
+
+    first, now = min(fetched), time.time()
+    urgent, stale, out = [], [], []
+    for g0, g1 in gaps:
+        i0, i1 = day_index(g0), day_index(g1)
+        if i0 < first:
+            # avant le premier jour provisoire : rien à servir, tout est à télécharger
+            out.append((g0, min(g1, index_date(first - 1))))
+            i0 = first
+        for i in range(i0, i1 + 1):
+            t = fetched.get(i)
+            if t is None or now - t >= MAX_STALE_SECONDS:
+                urgent.append(i)
+            elif now - t >= FRESH_SECONDS:
+                stale.append(i)
+            else:
+                swr["fresh_days"] += 1
+
+    swr["stale_days"] += len(stale)
+    result = "miss" if out or urgent else "stale" if stale else "hit"
+    metrics.cache_events.inc(cache="power_store", result=result)
+    for a, b in _runs(stale):
+        task = asyncio.ensure_future(_revalidate(cell, params, a, b))
+        _revalidating.add(task)
+        task.add_done_callback(_revalidating.discard)
+    return sorted(out + _runs(urgent))
+
+
+def year_chunks(start: date, end: date) -> list[tuple[date, date]]:
+    """[start, end] découpé aux limites d'année civile."""
+    return [(max(start, date(y, 1, 1)), min(end, date(y, 12, 31))) for y in range(start.year, end.year + 1)]
+
+
+async def _ensure(query: grid.PowerQuery, timeout: float, partial: bool = False) -> list[tuple[date, date, Exception]]:
+    """
+    Récupère les trous du stockage sur la période, par morceaux d'un an téléchargés en
+    parallèle (au plus MAX_CONCURRENCY à la fois). Les morceaux réussis sont écrits même
+    si d'autres échouent. Lève l'erreur du premier morceau en échec, sauf si partial :
+    les morceaux en échec sont alors retournés, et l'erreur n'est levée que s'il ne reste rien à servir.
+    """
+    if query.end < query.start:
+        return []
+    params = list(query.params)
+    chunks = [c for g0, g1 in missing_now(query.cell, params, query.start, query.end) for c in year_chunks(g0, g1)]
+    sem = asyncio.Semaphore(MAX_CONCURRENCY)
+    failed = []
+
+    async def run(start, end):
+        async with sem:
+            try:
+                await fill_with_retry(query.cell, params, start, end, timeout)
+            except (httpx.HTTPError, client.PowerResponseError) as e:
+                failed.append((start, end, e))
+
+    await asyncio.gather(*(run(*c) for c in chunks))
+    failed.sort(key=lambda f: f[0])
+    lost = sum((b - a).days + 1 for a, b, _ in failed)
+    if failed and (not partial or lost == (query.end - query.start).days + 1):
+        raise failed[0][2]
+    return failed
+
+
+async def get_columns(lat: float, lon: float, params: list[str], start: date, end: date, timeout: float = 40):
+    """
+    Colonnes float64 alignées jour par jour sur [start, end] (NaN hors de
+    l'historique POWER ou pour les jours absents). Retourne (maille, colonnes).
+    """
+    query = grid.canonical(lat, lon, params, start, end)
+    await _ensure(query, timeout)
+    return query.cell, store.read(query.cell, list(query.params), start, end)
+
+
+async def get_series(lat: float, lon: float, params: list[str], start: date, end: date, timeout: float = 40,
+                     partial: bool = False):
+    """
+    Séries journalières POWER entre start et end pour la maille de (lat, lon).
+    Seuls les intervalles absents du stockage local sont demandés à POWER,
+    au centre de la maille. Retourne (début, colonnes, header) ; les colonnes couvrent
+    la période servie (bornée à [EPOCH, aujourd'hui]), NaN pour les jours inconnus.
+    Avec partial, un morceau en échec n'empêche pas de servir les autres : ses jours
+    restent NaN et sont listés dans header["missing_ranges"].
+    """
+    query = grid.canonical(lat, lon, params, start, end)
+    cell, params = query.cell, list(query.params)
+    if query.end < query.start:
+        return query.start, {p: np.empty(0) for p in params}, store.header(cell)
+    failed = await _ensure(query, timeout, partial)
+
+    header = daily_header(cell, query.start, query.end)
+    if failed:
+        header = dict(header, missing_ranges=[
+            {"start": f"{a:%Y%m%d}", "end": f"{b:%Y%m%d}", "error": str(e) or type(e).__name__} for a, b, e in failed
+        ])
+    return query.start, store.read(cell, params, query.start, query.end), header
+
+
+async def iter_columns(lat: float, lon: float, params: list[str], start: date, end: date, timeout: float = 40):
+    """
+    Colonnes de [start, end] année civile par année civile, dans l'ordre, dès que chaque
+    année est disponible : les années manquantes sont téléchargées en parallèle comme dans
+    _ensure, mais une seule année est gardée en mémoire à la fois.
+    Produit (début, colonnes, erreur) ; une année en échec a des colonnes NaN et son erreur.
+    """
+    query = grid.canonical(lat, lon, params, start, end)
+    cell, params = query.cell, list(query.params)
+    if query.end < query.start:
+        return
+    sem = asyncio.Semaphore(MAX_CONCURRENCY)
+
+    async def run(a, b):
+        try:
+            for g0, g1 in missing_now(cell, params, a, b):
+                async with sem:
+                    await fill_with_retry(cell, params, g0, g1, timeout)
+        except (httpx.HTTPError, client.PowerResponseError) as e:
+            return e
+
+    chunks = year_chunks(query.start, query.end)
+    tasks = [asyncio.ensure_future(run(a, b)) for a, b in chunks]
+    try:
+        for (a, b), task in zip(chunks, tasks):
+            error = await task
+            yield a, await asyncio.to_thread(store.read, cell, params, a, b), error
+    finally:
+        # client parti : les téléchargements restants sont abandonnés
+        for task in tasks:
+            task.cancel()
+
+
+def daily_header(cell, start: date, end: date) -> dict:
+    """En-tête POWER de la maille, avec les dates de la période servie."""
+    header = store.header(cell)
+    if header:
+        header = dict(header, start=f"{start:%Y%m%d}", end=f"{end:%Y%m%d}")
+    return header
@@ -0,0 +1,307 @@
+"""
+Profilage statistique à la demande des requêtes de calcul (/algo par défaut).
+
+Désactivé par défaut. Une requête est profilée :
+- sur demande : en-têtes X-Profile: 1 et X-Profile-Token: <PROFILE_ADMIN_TOKEN>,
+- ou par échantillonnage : une requête sur 1/PROFILE_SAMPLE_RATE.
+Sans jeton ni taux, rien n'est installé (aucun coût).
+
+Un thread échantillonne toutes les PROFILE_INTERVAL_MS la pile du thread de la boucle
+d'événements tant qu'une requête profilée est en cours :
+- si la tâche asyncio en cours appartient à la requête (la tâche de la requête ou une
+  tâche créée pendant celle-ci : gather, middleware...), la pile exécutée est comptée,
+- sinon la requête attend (amont, disque, to_thread, ou boucle occupée par une autre
+  requête) : la chaîne des await de sa dernière tâche active est comptée sous "[await]".
+Le profil couvre donc le temps d'horloge de la requête, calcul et attentes séparés.
+Le code exécuté dans les threads (to_thread) n'apparaît que comme attente.
+
+Chaque profil est gardé en mémoire (les PROFILE_KEEP derniers) et, si PROFILE_DIR est
+défini, écrit dans <PROFILE_DIR>/<id>.folded. Le format est celui des piles repliées
+("f1;f2;f3 nombre"), lu par flamegraph.pl, speedscope ou inferno. La réponse profilée
+porte X-Profile-Id ; /profiles liste les plus lents (voir api/routes/profiles.py).
+"""
+from collections import deque
+from contextvars import ContextVar
+from functools import lru_cache
+import asyncio
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from api import metrics
+
+ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PATHS = tuple(p for p in os.getenv("PROFILE_PATHS", "/algo").split(",") if p)
+INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000
+KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+DIR = os.getenv("PROFILE_DIR", "")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AWAIT = "[await]"
+
+profiles_taken = metrics.Counter("profiles_total", "Requêtes profilées", ("trigger",))
+
+
+def enabled() -> bool:
+    return bool(ADMIN_TOKEN) or SAMPLE_RATE > 0
+
+
+def valid_token(token: str | None) -> bool:
+    return bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+
+class Profile:
+    def __init__(self, method: str, path: str, query: str, trigger: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.method, self.path, self.query, self.trigger = method, path, query, trigger
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.status = None
+        self.root: asyncio.Task | None = None
+        # dernière tâche de la requête vue en exécution : sa chaîne d'await dit ce qu'elle attend
+        self.last: asyncio.Task | None = None
+        self.samples: dict[str, int] = {}
+        self.cpu = 0
+        self.waiting = 0
+
+    def add(self, stack: str, on_cpu: bool):
+        self.samples[stack] = self.samples.get(stack, 0) + 1
+        if on_cpu:
+            self.cpu += 1
+        else:
+            self.waiting += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in sorted(self.samples.items()))
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id, "method": self.method, "path": self.path, "query": self.query,
+            "trigger": self.trigger, "status": self.status,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.started_at)),
+            "duration_ms": round(self.duration * 1000, 1),
+            "samples": self.cpu + self.waiting, "cpu_samples": self.cpu, "await_samples": self.waiting,
+            "interval_ms": INTERVAL * 1000,
+        }
+
+
+_current: ContextVar[Profile | None] = ContextVar("profile", default=None)
+# tâche asyncio -> profil de la requête qui l'a créée (lu par le thread d'échantillonnage)
+_tasks: dict[asyncio.Task, Profile] = {}
+_active: set[Profile] = set()
+_lock = threading.Lock()
+_wake = threading.Event()
+_stopping = False
+_thread: threading.Thread | None = None
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_thread: int | None = None
+_previous_factory = None
+
+recent: deque[Profile] = deque(maxlen=KEEP)
+
+
+# --- piles repliées -----------------------------------------------------------------------
+
+@lru_cache(maxsize=8192)
+def _name(code) -> str:
+    path = code.co_filename
+    if path.startswith(ROOT + os.sep):
+        path = os.path.relpath(path, ROOT)
+    elif "site-packages" + os.sep in path:
+        path = path.split("site-packages" + os.sep, 1)[1]
+    else:
+        path = os.path.basename(path)
+    # ";" sépare les cadres dans le format replié
+    return f"{code.co_qualname} ({path}:{code.co_firstlineno})".replace(";", ",")
+
+
+def _is_loop_step(code) -> bool:
+    return code.co_name == "_run" and code.co_filename.endswith(os.path.join("asyncio", "events.py"))
+
+
+def _running_stack(frame) -> str:
+    """Pile du thread de la boucle, sans la mécanique asyncio/uvicorn au-dessus de la tâche."""
+    codes = []
+    while frame is not None:
+        if _is_loop_step(frame.f_code):
+            break
+        codes.append(frame.f_code)
+        frame = frame.f_back
+    return ";".join(_name(c) for c in reversed(codes))
+
+
+def _awaiting_stack(task: asyncio.Task | None) -> str:
+    """Chaîne des await d'une tâche suspendue, de sa coroutine jusqu'au point d'attente."""
+    names = [AWAIT]
+    coro = task.get_coro() if task is not None and not task.done() else None
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        names.append(_name(frame.f_code))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return ";".join(names)
+
+
+# --- échantillonnage ----------------------------------------------------------------------
+
+def _sample():
+    frame = sys._current_frames().get(_loop_thread)
+    running = asyncio.current_task(_loop)
+    owner = _tasks.get(running) if running is not None else None
+    for profile in _active:
+        if profile is owner and frame is not None:
+            profile.last = running
+            profile.add(_running_stack(frame), on_cpu=True)
+        else:
+            task = profile.last if profile.last is not None and not profile.last.done() else profile.root
+            profile.add(_awaiting_stack(task), on_cpu=False)
+
+
+def _sampler():
+    while not _stopping:
+        _wake.wait()
+        time.sleep(INTERVAL)
+        with _lock:
+            if not _active:
+                _wake.clear()
+                continue
+            try:
+                _sample()
+            except Exception as e:
+                # une pile lue pendant qu'elle change : l'échantillon est perdu, pas le profil
+                print(f"⚠️ profiling sample dropped: {e!r}")
+
+
+def _own(task: asyncio.Task, profile: Profile):
+    _tasks[task] = profile
+    task.add_done_callback(lambda t: _tasks.pop(t, None))
+
+
+def _task_factory(loop, coro, **kwargs):
+    if _previous_factory is not None:
+        task = _previous_factory(loop, coro, **kwargs)
+    else:
+        task = asyncio.Task(coro, loop=loop, **kwargs)
+    profile = _current.get()
+    if profile is not None:
+        _own(task, profile)
+        # la plus récente est en général la plus profonde (appel d'endpoint, gather...)
+        profile.last = task
+    return task
+
+
+def _trigger(scope) -> str | None:
+    if not scope["path"].startswith(PATHS):
+        return None
+    if ADMIN_TOKEN:
+        headers = dict(scope["headers"])
+        if headers.get(b"x-profile") in (b"1", b"true") and valid_token(headers.get(b"x-profile-token", b"").decode("latin-1")):
+            return "header"
+    if SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE:
+        return "sampled"
+    return None
+
+
+def _save(profile: Profile):
+    path = os.path.join(DIR, f"{profile.id}.folded")
+    try:
+        os.makedirs(DIR, exist_ok=True)
+        with open(path, "w") as f:
+            f.write(profile.folded())
+    except OSError as e:
+        print(f"⚠️ profile {profile.id} not written to {path}: {e}")
+
+
+class ProfilingMiddleware:
+    """Middleware ASGI : profile les requêtes désignées (voir le docstring du module)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or _thread is None or (trigger := _trigger(scope)) is None:
+            return await self.app(scope, receive, send)
+
+        profile = Profile(scope["method"], scope["path"], scope.get("query_string", b"").decode("latin-1"), trigger)
+        profile.root = asyncio.current_task()
+        token = _current.set(profile)
+        _tasks[profile.root] = profile
+
+        async def send_profiled(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        with _lock:
+            _active.add(profile)
+            _wake.set()
+        try:
+            await self.app(scope, receive, send_profiled)
+        finally:
+            with _lock:
+                _active.discard(profile)
+            _current.reset(token)
+            _tasks.pop(profile.root, None)
+            profile.duration = time.perf_counter() - profile.started
+            profile.root = profile.last = None
+            recent.append(profile)
+            profiles_taken.inc(trigger=trigger)
+            if DIR:
+                await asyncio.to_thread(_save, profile)
+
+
+# --- consultation -------------------------------------------------------------------------
+
+def slowest(limit: int) -> list[dict]:
+    return [p.summary() for p in sorted(recent, key=lambda p: p.duration, reverse=True)[:limit]]
+
+
+def find(profile_id: str) -> str | None:
+    """Piles repliées d'un profil récent, ou lues dans PROFILE_DIR."""
+    for p in recent:
+        if p.id == profile_id:
+            return p.folded()
+    if DIR:
+        try:
+            with open(os.path.join(DIR, f"{profile_id}.folded")) as f:
+                return f.read()
+        except FileNotFoundError:
+            pass
+    return None
+
+
+# --- cycle de vie -------------------------------------------------------------------------
+
+def start():
+    """Installe la fabrique de tâches et le thread d'échantillonnage, si le profilage est activé."""
+    global _thread, _loop, _loop_thread, _previous_factory, _stopping
+    if not enabled() or _thread is not None:
+        return
+    _loop = asyncio.get_running_loop()
+    _loop_thread = threading.get_ident()
+    _previous_factory = _loop.get_task_factory()
+    _loop.set_task_factory(_task_factory)
+    _stopping = False
+    _thread = threading.Thread(target=_sampler, name="profiler", daemon=True)
+    _thread.start()
+    print(f"✅ Profiling enabled on {','.join(PATHS)} (sample rate {SAMPLE_RATE}, "
+          f"admin token {'set' if ADMIN_TOKEN else 'unset'}, every {INTERVAL * 1000:g} ms)")
+
+
+async def stop():
+    global _thread, _stopping
+    if _thread is None:
+        return
+    _stopping = True
+    _wake.set()
+    await asyncio.to_thread(_thread.join, 1)
+    _loop.set_task_factory(_previous_factory)
+    _thread = None
+    print("❌ Profiling stopped.")
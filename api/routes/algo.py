@@ -1,42 +1,99 @@
-from fastapi import APIRouter, Query, HTTPException
-import httpx
+from fastapi import APIRouter, Query, HTTPException, Request
+from pydantic import BaseModel, Field
 import math
 import asyncio
-from datetime import datetime, timedelta
-import requests
-import statistics
+import os
+from datetime import date, datetime, timedelta
+import httpx
+from api import http_cache
+from api.power import client, climatology, export, grid, normals, planner
+from api.power.store import get_columns
 
 router = APIRouter()
 
-NASA_POWER_URL = "https://power.larc.nasa.gov/api/temporal/daily/point"
-PARAMS = "T2M,T2M_MIN,T2M_MAX,RH2M,U2M,V2M,PS,PRECTOTCORR"
-
-async def fetch_power(client: httpx.AsyncClient, lat: float, lon: float, date: str):
-    url = (
-        f"{NASA_POWER_URL}?parameters={PARAMS}"
-        f"&start={date}&end={date}"
-        f"&latitude={lat}&longitude={lon}&community=RE&format=JSON"
-    )
-    r = await client.get(url, timeout=30)
-    r.raise_for_status()
-    d = r.json()
-    if "properties" not in d or "parameter" not in d["properties"]:
-        return None
-    p = d["properties"]["parameter"]
-    def val(k): return list(p.get(k, {}).values())[0] if k in p and p[k] else None
+PARAMS = client.PARAMS
+BATCH_MAX_ITEMS = int(os.getenv("PREDICT_BATCH_MAX_ITEMS", "100"))
+_background = set()
+
+
+def refresh_normals(cell):
+    """Reconstruit en fond le cube des normales de la maille s'il ne reflète plus le stockage."""
+    if normals.stale(cell):
+        task = asyncio.create_task(normals.refresh(cell))
+        _background.add(task)
+        task.add_done_callback(_background.discard)
+
+
+async def cell_window_stats(cell, params: list[str], targets: list[tuple[int, int]], years: range, window_days: int):
+    """
+    Statistiques des fenêtres ±window_days autour de chaque (month, day) de targets, pour une maille.
+    Lues dans le cube des normales quand il peut répondre (aucun appel POWER) ; les autres
+    cibles sont calculées sur un seul chargement de l'historique couvrant toutes leurs
+    fenêtres, et le cube de la maille est alors reconstruit en fond.
+    None pour une cible sans jour cible (29 février sans année bissextile).
+    """
+    out = [normals.lookup(cell, params, m, d, years, window_days) for m, d in targets]
+    todo = [i for i, st in enumerate(out) if st is None]
+    spans = [b for b in (climatology.span(*targets[i], years, window_days) for i in todo) if b]
+    if not spans:
+        return out
+
+    start, end = min(b[0] for b in spans), max(b[1] for b in spans)
+    _, columns = await get_columns(cell[0], cell[1], params, start, end, timeout=40)
+    series = climatology.Series(start, columns)
+    for i in todo:
+        month, day = targets[i]
+        if climatology.span(month, day, years, window_days):
+            out[i] = series.stats(series.window(month, day, years, window_days))
+
+    refresh_normals(cell)
+    return out
+
+
+async def window_stats(lat: float, lon: float, params: list[str], month: int, day: int, years: range, window_days: int):
+    """Statistiques des fenêtres pour un seul point et un seul jour cible (voir cell_window_stats)."""
+    return (await cell_window_stats(grid.snap(lat, lon), params, [(month, day)], years, window_days))[0]
+
+
+def weather_prediction(cell, st, month: int, day: int, years: range, window_days: int, future_year: int) -> dict:
+    """Réponse de /daily/predict à partir des statistiques des fenêtres."""
+    if not st or not st["T2M"]["n"]:
+        raise HTTPException(404, "Pas de données disponibles pour ce point/date")
+
+    Tmean = st["T2M"]["mean"]
+    Tmin = st["T2M_MIN"]["mean"]
+    Tmax = st["T2M_MAX"]["mean"]
+    RH = st["RH2M"]["mean"]
+    P = st["PS"]["mean"]
+
+    Tmin_adj = Tmin
+    Tmax_adj = Tmax
+    if RH:
+        if RH > 70: Tmin_adj += 0.5
+        elif RH < 30: Tmin_adj -= 0.5
+    vent = st["wind"]["mean"]
+    if vent is not None and vent > 10:
+        Tmin_adj += 0.5
+
     return {
-        "T2M": val("T2M"),
-        "T2M_MIN": val("T2M_MIN"),
-        "T2M_MAX": val("T2M_MAX"),
-        "RH2M": val("RH2M"),
-        "U2M": val("U2M"),
-        "V2M": val("V2M"),
-        "PS": val("PS"),
-        "PRECTOTCORR": val("PRECTOTCORR"),
+        "cell": grid.cell_info(cell),
+        "future_year": future_year,
+        "date_predite": f"{future_year:04d}-{month:02d}-{day:02d}",
+        "periode_utilisee": climatology.period(month, day, years, window_days),
+        "T_moyenne": Tmean,
+        "Tmin_base": Tmin,
+        "Tmax_base": Tmax,
+        "Tmin_ajustee": Tmin_adj,
+        "Tmax_ajustee": Tmax_adj,
+        "T2M_std": st["T2M"]["std"],
+        "humidite_moyenne": RH,
+        "vent_moyen_m_s": vent,
+        "pression_moy_kPa": P,
     }
 
 @router.get("/daily/analyse")
 async def analyse_day(
+    request: Request,
     lat: float = Query(..., description="Latitude du point d'intérêt"),
     lon: float = Query(..., description="Longitude du point d'intérêt"),
     day: int = Query(..., ge=1, le=31, description="Jour du mois (1-31)"),
@@ -46,28 +103,28 @@ async def analyse_day(
     """
     Analyse climatique simplifiée pour un jour/mois donné sur N années en arrière
     (moyenne T°, humidité, vent, pluie, pression avec ΔP).
+    Les périodes qui n'ont pas pu être téléchargées sont listées dans missing_ranges
+    (et les années concernées dans annees_manquantes) ; la réponse n'est alors pas mise en cache.
     """
+    fmt = export.negotiate(request)
     current_year = datetime.now().year
-    dates_main = [f"{y}{month:02d}{day:02d}" for y in range(current_year - years, current_year)]
-    prev_day = (datetime(2000, month, day) - timedelta(days=1)).day
-    dates_prev = [f"{y}{month:02d}{prev_day:02d}" for y in range(current_year - years, current_year)]
+    dates_main = []
+    for y in range(current_year - years, current_year):
+        try:
+            dates_main.append(date(y, month, day))
+        except ValueError:
+            continue  # 29 février hors années bissextiles
+    dates_prev = [d - timedelta(days=1) for d in dates_main]
 
-    async with httpx.AsyncClient() as client:
-        results = await asyncio.gather(
-            *[fetch_power(client, lat, lon, d) for d in dates_main],
-            *[fetch_power(client, lat, lon, d) for d in dates_prev],
-            return_exceptions=True
-        )
-
-    main_data = results[:len(dates_main)]
-    prev_data = results[len(dates_main):]
+    # J et J-1 de chaque année : regroupés en quelques appels POWER (trous du stockage local seulement)
+    values, failed = await planner.fetch_dates(grid.snap(lat, lon), PARAMS, dates_main + dates_prev)
 
     T, Tmin, Tmax, H, V, P, R = [], [], [], [], [], [], []
     deltaP = []
 
-    for i in range(len(dates_main)):
-        cur = main_data[i] if isinstance(main_data[i], dict) else None
-        prev = prev_data[i] if isinstance(prev_data[i], dict) else None
+    for d, d_prev in zip(dates_main, dates_prev):
+        cur = values.get(d)
+        prev = values.get(d_prev)
         if not cur:
             continue
 
@@ -84,6 +141,8 @@ async def analyse_day(
             deltaP.append(cur["PS"] - prev["PS"])
 
     if not T:
+        if failed:
+            raise HTTPException(status_code=502, detail=f"Erreur lors de l'appel NASA POWER : {failed[0][2]}")
         raise HTTPException(status_code=404, detail="Aucune donnée trouvée pour ces paramètres")
 
     Tbase = sum(T) / len(T)
@@ -105,7 +164,8 @@ async def analyse_day(
     if Vmean is not None and Vmean > 10:
         Tmin_adj += 0.5
 
-    return {
+    out = {
+        "cell": grid.cell_info(grid.snap(lat, lon)),
         "historique_annees": len(T),
         "T_moyenne": round(Tbase, 2),
         "Tmin_moyenne": round(Tmin_base, 2),
@@ -119,9 +179,18 @@ async def analyse_day(
 
         "note": "Algorithme simplifié POWER (sans nuages/omega/T850/skin temp). ΔP basé sur jour-1 POWER."
     }
+    if failed:
+        # statistique calculée sur une partie des années : ne pas la figer dans les caches HTTP
+        http_cache.no_store(request)
+        out["missing_ranges"] = [
+            {"start": f"{a:%Y%m%d}", "end": f"{b:%Y%m%d}", "error": str(e) or type(e).__name__} for a, b, e in failed
+        ]
+        out["annees_manquantes"] = sorted({d.year for d in dates_main if any(a <= d <= b for a, b, _ in failed)})
+    return export.respond(fmt, out)
 
 @router.get("/daily/predict")
-def predict_weather(
+async def predict_weather(
+    request: Request,
     lat: float = Query(..., description="Latitude"),
     lon: float = Query(..., description="Longitude"),
     day: int = Query(..., ge=1, le=31),
@@ -130,102 +199,160 @@ def predict_weather(
     future_year: int = Query(...),
     window_days: int = Query(3)
 ):
+    fmt = export.negotiate(request)
     current_year = datetime.utcnow().year
-    start_year = current_year - base_years
-    start = (datetime(start_year, month, day) - timedelta(days=window_days)).strftime("%Y%m%d")
-    end = (datetime(current_year - 1, month, day) + timedelta(days=window_days)).strftime("%Y%m%d")
-
-    params = "T2M,T2M_MIN,T2M_MAX,RH2M,U2M,V2M,PS,PRECTOTCORR"
-    url = (
-        "https://power.larc.nasa.gov/api/temporal/daily/point"
-        f"?parameters={params}&start={start}&end={end}"
-        f"&latitude={lat}&longitude={lon}&community=RE&format=JSON"
-    )
-
+    years = range(current_year - base_years, current_year)
     try:
-        resp = requests.get(url, timeout=40)
-        resp.raise_for_status()
-        data = resp.json()
-    except requests.exceptions.RequestException as e:
+        st = await window_stats(lat, lon, PARAMS, month, day, years, window_days)
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=502, detail=f"Erreur NASA POWER : {e}")
-
-    if "properties" not in data or "parameter" not in data["properties"]:
+    except client.PowerResponseError:
         raise HTTPException(500, "Réponse POWER inattendue")
 
-    p = data["properties"]["parameter"]
+    return export.respond(fmt, weather_prediction(grid.snap(lat, lon), st, month, day, years, window_days, future_year))
 
-    def to_dict(key):
-        return {datetime.strptime(k, "%Y%m%d"): v for k, v in p.get(key, {}).items()}
 
-    t2m = to_dict("T2M")
-    tmin = to_dict("T2M_MIN")
-    tmax = to_dict("T2M_MAX")
-    rh = to_dict("RH2M")
-    u = to_dict("U2M")
-    v = to_dict("V2M")
-    ps = to_dict("PS")
-    precip = to_dict("PRECTOTCORR")
+def _month_day(value: str) -> tuple[int, int]:
+    """"MMDD" -> (mois, jour), 400 si invalide (le 29 février est accepté)."""
+    try:
+        d = datetime.strptime(f"2000{value}", "%Y%m%d")
+    except ValueError:
+        raise HTTPException(400, f"Format attendu MMDD : {value}")
+    return d.month, d.day
 
-    ref_dates = []
-    for year in range(current_year - base_years, current_year):
-        center = datetime(year, month, day)
-        for d in range(-window_days, window_days + 1):
-            ref_dates.append(center + timedelta(days=d))
 
-    t2m_vals = [t2m[d] for d in ref_dates if d in t2m]
-    tmin_vals = [tmin[d] for d in ref_dates if d in tmin]
-    tmax_vals = [tmax[d] for d in ref_dates if d in tmax]
-    rh_vals = [rh[d] for d in ref_dates if d in rh]
-    u_vals = [u[d] for d in ref_dates if d in u]
-    v_vals = [v[d] for d in ref_dates if d in v]
-    ps_vals = [ps[d] for d in ref_dates if d in ps]
+@router.get("/range/predict")
+async def predict_range(
+    request: Request,
+    lat: float = Query(..., description="Latitude"),
+    lon: float = Query(..., description="Longitude"),
+    start_md: str = Query(..., description="Premier jour (MMDD)"),
+    end_md: str = Query(..., description="Dernier jour inclus (MMDD), peut passer à l'année suivante"),
+    base_years: int = Query(20),
+    future_year: int = Query(...),
+    window_days: int = Query(3, ge=0),
+):
+    """
+    /daily/predict pour chaque jour de start_md à end_md (au plus un an). Les jours absents du
+    cube des normales sont calculés ensemble sur un seul chargement de l'historique, par
+    fenêtres glissantes (sommes préfixées) : le coût ne dépend plus de window_days.
+    Un jour sans données est signalé à sa place sans faire échouer la plage.
+    Hors JSON (voir api.power.export), days est servi en colonnes (un tableau par champ).
+    """
+    fmt = export.negotiate(request)
+    (sm, sd), (em, ed) = _month_day(start_md), _month_day(end_md)
+    end_year = future_year if (em, ed) >= (sm, sd) else future_year + 1
+    try:
+        first, last = date(future_year, sm, sd), date(end_year, em, ed)
+    except ValueError:
+        raise HTTPException(400, "29 février hors année bissextile")
+    days = [first + timedelta(days=i) for i in range(min((last - first).days + 1, 366))]
+
+    current_year = datetime.utcnow().year
+    years = range(current_year - base_years, current_year)
+    cell = grid.snap(lat, lon)
+    targets = [(d.month, d.day) for d in days]
+
+    stats = [normals.lookup(cell, PARAMS, m, d, years, window_days) for m, d in targets]
+    todo = [i for i, st in enumerate(stats) if st is None]
+    spans = [b for b in (climatology.span(*targets[i], years, window_days) for i in todo) if b]
+    if spans:
+        start, end = min(b[0] for b in spans), max(b[1] for b in spans)
+        try:
+            _, columns = await get_columns(cell[0], cell[1], PARAMS, start, end, timeout=40)
+        except httpx.HTTPError as e:
+            raise HTTPException(status_code=502, detail=f"Erreur NASA POWER : {e}")
+        except client.PowerResponseError:
+            raise HTTPException(500, "Réponse POWER inattendue")
+        series = climatology.Series(start, columns)
+        for i, st in zip(todo, series.sliding_stats([targets[i] for i in todo], years, window_days)):
+            stats[i] = st
+        refresh_normals(cell)
+
+    out = []
+    for d, st in zip(days, stats):
+        try:
+            day = weather_prediction(cell, st, d.month, d.day, years, window_days, d.year)
+        except HTTPException as e:
+            out.append({"date_predite": d.isoformat(), "ok": False, "status": e.status_code, "detail": e.detail})
+            continue
+        del day["cell"]
+        rain = st.get("PRECTOTCORR", {})
+        out.append({"ok": True, **day, "precip_moyenne": rain.get("mean"), "precip_std": rain.get("std")})
 
+    return export.respond(fmt, {
+        "cell": grid.cell_info(cell),
+        "future_year": future_year,
+        "start": first.isoformat(),
+        "end": days[-1].isoformat(),
+        "base_years": base_years,
+        "window_days": window_days,
+        "days": out if fmt == export.JSON else export.records_columns(out),
+    }, table=out, table_key="days")
 
-    if not t2m_vals:
-        raise HTTPException(404, "Pas de données disponibles pour ce point/date")
 
-    Tmean = sum(t2m_vals) / len(t2m_vals)
-    Tmin = sum(tmin_vals) / len(tmin_vals) if tmin_vals else None
-    Tmax = sum(tmax_vals) / len(tmax_vals) if tmax_vals else None
-    RH = sum(rh_vals) / len(rh_vals) if rh_vals else None
-    U = sum(u_vals) / len(u_vals) if u_vals else None
-    V = sum(v_vals) / len(v_vals) if v_vals else None
-    P = sum(ps_vals) / len(ps_vals) if ps_vals else None
+class PredictItem(BaseModel):
+    lat: float
+    lon: float
+    day: int = Field(..., ge=1, le=31)
+    month: int = Field(..., ge=1, le=12)
 
 
+class PredictBatch(BaseModel):
+    items: list[PredictItem] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+    base_years: int = 20
+    future_year: int
+    window_days: int = 3
 
-    Tmin_adj = Tmin
-    Tmax_adj = Tmax
-    if RH:
-        if RH > 70: Tmin_adj += 0.5
-        elif RH < 30: Tmin_adj -= 0.5
-    vent = None
-    if U is not None and V is not None:
-        vent = (U ** 2 + V ** 2) ** 0.5
-        if vent > 10: Tmin_adj += 0.5
 
-    return {
-        "future_year": future_year,
-        "date_predite": f"{future_year:04d}-{month:02d}-{day:02d}",
-        "periode_utilisee": {
-            "start": ref_dates[0].strftime("%Y-%m-%d"),
-            "end": ref_dates[-1].strftime("%Y-%m-%d"),
-            "nb_jours": len(ref_dates)
-        },
-        "T_moyenne": Tmean,
-        "Tmin_base": Tmin,
-        "Tmax_base": Tmax,
-        "Tmin_ajustee": Tmin_adj,
-        "Tmax_ajustee": Tmax_adj,
-        "T2M_std": statistics.pstdev(t2m_vals) if len(t2m_vals) > 1 else None,
-        "humidite_moyenne": RH,
-        "vent_moyen_m_s": vent,
-        "pression_moy_kPa": P,
-    }
+@router.post("/daily/predict/batch")
+async def predict_weather_batch(request: Request, batch: PredictBatch):
+    """
+    Même calcul que /daily/predict pour une liste de points. Les points sont regroupés
+    par maille POWER : l'historique de chaque maille n'est chargé qu'une fois.
+    Les résultats suivent l'ordre des items ; une erreur ne concerne que son item.
+    Hors JSON (voir api.power.export), results est servi en colonnes (un tableau par champ).
+    """
+    fmt = export.negotiate(request)
+    current_year = datetime.utcnow().year
+    years = range(current_year - batch.base_years, current_year)
+
+    by_cell: dict[tuple[float, float], list[int]] = {}
+    for i, item in enumerate(batch.items):
+        by_cell.setdefault(grid.snap(item.lat, item.lon), []).append(i)
+
+    results: list[dict] = [{} for _ in batch.items]
+    sem = asyncio.Semaphore(planner.MAX_CONCURRENCY)
+
+    async def run(cell, indexes):
+        targets = [(batch.items[i].month, batch.items[i].day) for i in indexes]
+        async with sem:
+            try:
+                stats = await cell_window_stats(cell, PARAMS, targets, years, batch.window_days)
+            except httpx.HTTPError as e:
+                for i in indexes:
+                    results[i] = {"ok": False, "status": 502, "detail": f"Erreur NASA POWER : {e}"}
+                return
+            except client.PowerResponseError:
+                for i in indexes:
+                    results[i] = {"ok": False, "status": 500, "detail": "Réponse POWER inattendue"}
+                return
+
+        for i, (month, day), st in zip(indexes, targets, stats):
+            try:
+                results[i] = {"ok": True, **weather_prediction(cell, st, month, day, years, batch.window_days, batch.future_year)}
+            except HTTPException as e:
+                results[i] = {"ok": False, "status": e.status_code, "detail": e.detail}
+
+    await asyncio.gather(*(run(cell, indexes) for cell, indexes in by_cell.items()))
+    if fmt == export.JSON:
+        return {"results": results}
+    return export.respond(fmt, {"results": export.records_columns(results)}, table=results, table_key="results")
 
 
 @router.get("/daily/predict_rain")
-def predict_rain(
+async def predict_rain(
+    request: Request,
     lat: float = Query(..., description="Latitude"),
     lon: float = Query(..., description="Longitude"),
     day: int = Query(..., ge=1, le=31),
@@ -237,67 +364,39 @@ def predict_rain(
     """
     Prédiction simplifiée des précipitations pour une date future basée sur les N dernières années NASA POWER.
     """
-    from datetime import datetime, timedelta
-    import requests, statistics
-
+    fmt = export.negotiate(request)
     current_year = datetime.utcnow().year
-    start_year = current_year - base_years
-
-    # --- Construit toutes les dates de référence autour du jour cible pour les années passées ---
-    ref_dates = []
-    for y in range(start_year, current_year):
-        center = datetime(y, month, day)
-        for d in range(-window_days, window_days + 1):
-            ref_dates.append(center + timedelta(days=d))
-
-    # --- Formatage des bornes pour appel NASA POWER ---
-    start = min(ref_dates).strftime("%Y%m%d")
-    end = max(ref_dates).strftime("%Y%m%d")
-
-    url = (
-        "https://power.larc.nasa.gov/api/temporal/daily/point"
-        f"?parameters=PRECTOTCORR&start={start}&end={end}"
-        f"&latitude={lat}&longitude={lon}&community=RE&format=JSON"
-    )
+    years = range(current_year - base_years, current_year)
 
+    # --- Statistiques sur toutes les fenêtres autour du jour cible pour les années passées ---
     try:
-        resp = requests.get(url, timeout=40)
-        resp.raise_for_status()
-        data = resp.json()
-    except requests.exceptions.RequestException as e:
+        st = await window_stats(lat, lon, ["PRECTOTCORR"], month, day, years, window_days)
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=502, detail=f"Erreur NASA POWER : {e}")
-
-    if "properties" not in data or "parameter" not in data["properties"]:
+    except client.PowerResponseError:
         raise HTTPException(500, "Réponse NASA POWER inattendue")
 
-    p = data["properties"]["parameter"]
-    precip = {datetime.strptime(k, "%Y%m%d"): v for k, v in p.get("PRECTOTCORR", {}).items()}
-
-    # --- Collecte des valeurs de précipitations sur toutes les dates de référence ---
-    values = [precip[d] for d in ref_dates if d in precip]
-
-    if not values:
+    rain = st["PRECTOTCORR"] if st else {"n": 0}
+    if not rain["n"]:
         raise HTTPException(404, "Pas de données de précipitation disponibles pour ce point/date")
 
-    rain_mean = sum(values) / len(values)
-    rain_std = statistics.pstdev(values) if len(values) > 1 else None
+    rain_mean = rain["mean"]
+    rain_std = rain["std"]
 
-    return {
+    return export.respond(fmt, {
+        "cell": grid.cell_info(grid.snap(lat, lon)),
         "future_year": future_year,
         "date_predite": f"{future_year:04d}-{month:02d}-{day:02d}",
-        "periode_utilisee": {
-            "start": min(ref_dates).strftime("%Y-%m-%d"),
-            "end": max(ref_dates).strftime("%Y-%m-%d"),
-            "nb_jours": len(ref_dates)
-        },
+        "periode_utilisee": climatology.period(month, day, years, window_days),
         "precip_moyenne": rain_mean,
         "precip_std": rain_std,
         "note": "Prédiction basée sur la moyenne historique NASA POWER (PRECTOTCORR) sur une fenêtre ±window_days"
-    }
+    })
 
 
 @router.get("/daily/predict_rain_hourly")
-def predict_rain_hourly(
+async def predict_rain_hourly(
+    request: Request,
     lat: float = Query(..., description="Latitude"),
     lon: float = Query(..., description="Longitude"),
     day: int = Query(..., ge=1, le=31),
@@ -310,50 +409,27 @@ def predict_rain_hourly(
     Prédiction simplifiée des précipitations avec répartition sur 4 plages horaires
     (night/morning/afternoon/evening).
     """
-    from datetime import datetime, timedelta
-    import requests, random, statistics
+    import random
 
+    fmt = export.negotiate(request)
     current_year = datetime.utcnow().year
-    start_year = current_year - base_years
-
-    # Générer les dates historiques autour du jour/mois
-    ref_dates = []
-    for y in range(start_year, current_year):
-        center = datetime(y, month, day)
-        for d in range(-window_days, window_days + 1):
-            ref_dates.append(center + timedelta(days=d))
-
-    start = min(ref_dates).strftime("%Y%m%d")
-    end = max(ref_dates).strftime("%Y%m%d")
-
-    url = (
-        "https://power.larc.nasa.gov/api/temporal/daily/point"
-        f"?parameters=PRECTOTCORR&start={start}&end={end}"
-        f"&latitude={lat}&longitude={lon}&community=RE&format=JSON"
-    )
+    years = range(current_year - base_years, current_year)
 
+    # Fenêtres historiques autour du jour/mois
     try:
-        resp = requests.get(url, timeout=40)
-        resp.raise_for_status()
-        data = resp.json()
-    except requests.exceptions.RequestException as e:
+        st = await window_stats(lat, lon, ["PRECTOTCORR"], month, day, years, window_days)
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=502, detail=f"Erreur NASA POWER : {e}")
-
-    if "properties" not in data or "parameter" not in data["properties"]:
+    except client.PowerResponseError:
         raise HTTPException(500, "Réponse NASA POWER inattendue")
 
-    precip = {
-        datetime.strptime(k, "%Y%m%d"): v
-        for k, v in data["properties"]["parameter"].get("PRECTOTCORR", {}).items()
-    }
-
-    values = [precip[d] for d in ref_dates if d in precip]
-    if not values:
+    rain = st["PRECTOTCORR"] if st else {"n": 0}
+    if not rain["n"]:
         raise HTTPException(404, "Pas de données de précipitation disponibles pour ce point/date")
 
     # Pluie journalière moyenne
-    rain_mean = sum(values) / len(values)
-    rain_std = statistics.pstdev(values) if len(values) > 1 else None
+    rain_mean = rain["mean"]
+    rain_std = rain["std"]
 
     # Répartition simple : 25% chacune + bruit aléatoire léger
     base_split = [0.25, 0.25, 0.25, 0.25]
@@ -369,11 +445,12 @@ def predict_rain_hourly(
         {"label": "Evening", "rain": rain_mean * split[3]},
     ]
 
-    return {
+    return export.respond(fmt, {
+        "cell": grid.cell_info(grid.snap(lat, lon)),
         "future_year": future_year,
         "date_predite": f"{future_year:04d}-{month:02d}-{day:02d}",
         "precip_moyenne": rain_mean,
         "precip_std": rain_std,
         "periods": periods,
         "note": "Répartition statistique simplifiée des précipitations journalières (NASA POWER PRECTOTCORR)."
-    }
+    }, table=periods, table_key="periods")
@@ -1,13 +1,51 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
+from api import metrics
+from api.cache import TTLCache
 from api.db import session
 from .utils import SECRET_KEY, ALGORITHM
 from bson import ObjectId
+import os
+import time
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+# champs toujours chargés ; les autres (favoris...) seulement par les routes qui les demandent.
+# hashed_password n'est jamais chargé ici.
+BASE_FIELDS = ("username", "email")
+
+# id utilisateur -> (champs chargés, document réduit à ces champs)
+users = TTLCache("users", USER_CACHE_MAX_ENTRIES, USER_CACHE_TTL)
+
+
+def invalidate_user(user_id):
+    """À appeler après toute écriture sur le document d'un utilisateur."""
+    users.invalidate(str(user_id))
+
+
+async def _load_user(user_id: str, fields: tuple[str, ...]) -> dict | None:
+    cached = users.get(user_id)
+    loaded, doc = cached if cached else (frozenset(), {})
+    missing = [f for f in fields if f not in loaded]
+    if not missing:
+        return dict(doc)
+
+    generation = users.generation
+    started = time.perf_counter()
+    found = await session.db["users"].find_one({"_id": ObjectId(user_id)}, {f: 1 for f in missing})
+    metrics.mongo_queries.observe(time.perf_counter() - started, op="users.find_one")
+    if not found:
+        users.invalidate(user_id)
+        return None
+    doc = {**doc, **found}
+    users.set(user_id, (loaded | set(missing), doc), generation=generation)
+    return dict(doc)
+
+
+def _user_id(token: str) -> str:
     credentials_error = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
     )
@@ -18,11 +56,26 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
             raise credentials_error
     except JWTError:
         raise credentials_error
-    
+
     if not ObjectId.is_valid(user_id):
         raise credentials_error
+    return user_id
 
-    user = await session.db["users"].find_one({"_id": ObjectId(user_id)})
-    if not user:
-        raise credentials_error
-    return user
+
+def current_user_with(*fields: str):
+    """
+    Dépendance renvoyant l'utilisateur du jeton avec _id, BASE_FIELDS et fields
+    (ex. current_user_with("favorites")). Servi depuis le cache tant qu'il est valide.
+    """
+    wanted = tuple(dict.fromkeys(BASE_FIELDS + fields))
+
+    async def dependency(token: str = Depends(oauth2_scheme)):
+        user = await _load_user(_user_id(token), wanted)
+        if not user:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+        return user
+
+    return dependency
+
+
+get_current_user = current_user_with()
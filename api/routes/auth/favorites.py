@@ -1,25 +1,48 @@
-from fastapi import APIRouter, Depends
-from api.routes.auth.dependencies import get_current_user
+from fastapi import APIRouter, Depends, Query
+from api.routes.auth.dependencies import current_user_with, get_current_user, invalidate_user
 from api.db import session
+from api.routes.gibs import NEAR_MAX_DAYS, NearPoint, near_points
 from bson import ObjectId
 
 router = APIRouter(tags=["Favorites"])
+with_favorites = current_user_with("favorites")
 
 @router.post("/favorites")
 async def add_favorite(favorite: dict, current_user: dict = Depends(get_current_user)):
     """
     favorite attendu: { name: str, lat: float, lon: float }
+    Ajout atomique : le filtre n'accepte l'utilisateur que s'il n'a pas déjà ce nom.
     """
-    favorites = current_user.get("favorites", [])
-    if any(f["name"] == favorite["name"] for f in favorites):
-        return {"status": "exists"}
-
-    await session.db["users"].update_one(
-        {"_id": ObjectId(current_user["_id"])},
+    result = await session.db["users"].update_one(
+        {"_id": ObjectId(current_user["_id"]), "favorites.name": {"$ne": favorite["name"]}},
         {"$push": {"favorites": favorite}}
     )
+    if not result.modified_count:
+        return {"status": "exists"}
+    invalidate_user(current_user["_id"])
     return {"status": "ok", "favorite": favorite}
 
 @router.get("/favorites")
-async def get_favorites(current_user: dict = Depends(get_current_user)):
+async def get_favorites(current_user: dict = Depends(with_favorites)):
     return current_user.get("favorites", [])
+
+@router.get("/favorites/disasters")
+async def get_favorites_disasters(
+    radius_km: float = Query(250, gt=0, le=5000),
+    days: int = Query(3, ge=1, le=NEAR_MAX_DAYS),
+    limit: int = Query(20, ge=1, le=200),
+    current_user: dict = Depends(with_favorites),
+):
+    """
+    Événements EONET proches de chaque favori (voir /disasters/near), en un appel.
+    Les favoris sans coordonnées valides sont ignorés.
+    """
+    points = []
+    for f in current_user.get("favorites", []):
+        try:
+            points.append(NearPoint(name=f.get("name"), lat=f["lat"], lon=f["lon"]))
+        except (KeyError, TypeError, ValueError):
+            continue
+    if not points:
+        return []
+    return await near_points(points, radius_km, days, limit)
@@ -7,8 +7,8 @@ router = APIRouter()
 
 @router.post("/login")
 async def login(user: schemas.UserLogin):
-    db_user = await session.db["users"].find_one({"username": user.username})
-    if not db_user or not utils.verify_password(user.password, db_user["hashed_password"]):
+    db_user = await session.db["users"].find_one({"username": user.username}, {"hashed_password": 1})
+    if not db_user or not await utils.verify_password(user.password, db_user["hashed_password"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     access_token = utils.create_access_token(
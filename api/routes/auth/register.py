@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException
+from pymongo.errors import DuplicateKeyError
 from api.db import session
 from api.routes.auth import schemas, utils
 
@@ -6,16 +7,20 @@ router = APIRouter()
 
 @router.post("/register")
 async def register(user: schemas.UserCreate):
-    existing = await session.db["users"].find_one({"username": user.username})
+    # évite un hachage bcrypt inutile ; l'index unique tranche les inscriptions simultanées
+    existing = await session.db["users"].find_one({"username": user.username}, {"_id": 1})
     if existing:
         raise HTTPException(status_code=400, detail="Username already exists")
 
-    hashed_pw = utils.hash_password(user.password)
+    hashed_pw = await utils.hash_password(user.password)
     user_doc = {
         "username": user.username,
         "email": user.email,
         "hashed_password": hashed_pw,
     }
 
-    result = await session.db["users"].insert_one(user_doc)
+    try:
+        result = await session.db["users"].insert_one(user_doc)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Username already exists")
     return {"message": "User created", "user_id": str(result.inserted_id)}
\ No newline at end of file
@@ -1,8 +1,13 @@
 from passlib.context import CryptContext
 from jose import jwt
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
+from fastapi import HTTPException
+from api import metrics
+import asyncio
 import os
+import time
 load_dotenv()
 
 secret_key = os.getenv("SECRET_KEY")
@@ -17,11 +22,63 @@ SECRET_KEY = secret_key
 ALGORITHM = algorithm
 ACCESS_TOKEN_EXPIRE_MINUTES = 1440
 
-def hash_password(password: str):
-    return pwd_context.hash(password)
+# bcrypt (~100-300 ms de CPU) tourne dans ces threads, jamais sur la boucle d'événements :
+# il relâche le GIL, une rafale de connexions ne ralentit donc que l'authentification.
+HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", "2"))
+# au-delà, les nouvelles demandes reçoivent 503 au lieu d'allonger la file
+HASH_MAX_PENDING = int(os.getenv("AUTH_HASH_MAX_PENDING", "64"))
 
-def verify_password(plain: str, hashed: str):
-    return pwd_context.verify(plain, hashed)
+_hash_pool = ThreadPoolExecutor(HASH_WORKERS, thread_name_prefix="bcrypt")
+_hash_queue = metrics.Histogram("password_hash_queue_seconds", "Attente d'un thread bcrypt")
+_hash_stats = {"calls": 0, "rejected": 0, "pending": 0,
+               "queue_seconds_total": 0.0, "queue_seconds_max": 0.0, "run_seconds_total": 0.0}
+
+
+async def _in_hash_pool(fn, *args):
+    if _hash_stats["pending"] >= HASH_MAX_PENDING:
+        _hash_stats["rejected"] += 1
+        raise HTTPException(status_code=503, detail="Authentication busy, retry shortly",
+                            headers={"Retry-After": "1"})
+
+    submitted = time.perf_counter()
+
+    def job():
+        started = time.perf_counter()
+        return fn(*args), started - submitted, time.perf_counter() - started
+
+    _hash_stats["pending"] += 1
+    try:
+        result, queued, ran = await asyncio.get_running_loop().run_in_executor(_hash_pool, job)
+    finally:
+        _hash_stats["pending"] -= 1
+    _hash_queue.observe(queued)
+    _hash_stats["calls"] += 1
+    _hash_stats["queue_seconds_total"] += queued
+    _hash_stats["queue_seconds_max"] = max(_hash_stats["queue_seconds_max"], queued)
+    _hash_stats["run_seconds_total"] += ran
+    return result
+
+
+@metrics.collector
+def _hash_metrics():
+    return [
+        ("password_hash_pending", "gauge", "Hachages bcrypt en file ou en cours", [({}, _hash_stats["pending"])]),
+        ("password_hash_rejected_total", "counter", "Hachages refusés (503), file pleine", [({}, _hash_stats["rejected"])]),
+    ]
+
+
+def hash_stats() -> dict:
+    """Appels, demandes en attente ou en cours, refus, temps passé en file et à hacher."""
+    calls = _hash_stats["calls"]
+    return {**_hash_stats, "workers": HASH_WORKERS, "max_pending": HASH_MAX_PENDING,
+            "queue_seconds_avg": _hash_stats["queue_seconds_total"] / calls if calls else 0.0}
+
+
+async def hash_password(password: str):
+    return await _in_hash_pool(pwd_context.hash, password)
+
+async def verify_password(plain: str, hashed: str):
+    return await _in_hash_pool(pwd_context.verify, plain, hashed)
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
@@ -0,0 +1,100 @@
+from fastapi import APIRouter, Query, HTTPException
+from datetime import date, datetime, timedelta
+import asyncio
+import httpx
+from api.power import client, climatology, grid, normals, planner
+from api.power.store import get_columns, to_block, daily_header
+from api.routes.algo import PARAMS, refresh_normals, weather_prediction
+from api.routes.merra2 import daily_response
+from api.routes.weather.rainfall import rainfall_response
+
+router = APIRouter()
+
+
+def _loads(ranges: list[tuple[date, date]]) -> list[tuple[date, date]]:
+    """Périodes à charger : celles séparées de moins de planner.MAX_GAP_DAYS sont fusionnées."""
+    out: list[list[date]] = []
+    for a, b in sorted(ranges):
+        if out and (a - out[-1][1]).days <= planner.MAX_GAP_DAYS:
+            out[-1][1] = max(out[-1][1], b)
+        else:
+            out.append([a, b])
+    return [(a, b) for a, b in out]
+
+
+@router.get("/dashboard")
+async def dashboard(
+    lat: float = Query(..., description="Latitude"),
+    lon: float = Query(..., description="Longitude"),
+    target: str = Query(..., alias="date", regex=r"^\d{8}$", description="Jour affiché (YYYYMMDD)"),
+    base_years: int = Query(10),
+    window_days: int = Query(3),
+):
+    """
+    Tout ce qu'affiche le tableau de bord pour un point et un jour, en un seul appel :
+    - "daily" : réponse de /merra2/power/daily pour ce jour (vide si le jour est futur),
+    - "prediction" : réponse de /algo/daily/predict pour ce jour, seulement si le jour est
+      futur (null sinon : le tableau de bord affiche alors le jour observé),
+    - "rainfall" : réponse de /weather/rainfall pour ce jour.
+    Un jour passé ne coûte qu'une lecture du stockage local (une requête POWER d'un jour au
+    plus) ; pour un jour futur, l'historique vient du cube des normales ou d'un seul
+    chargement. Une prédiction ou une pluie indisponible vaut null au lieu de faire
+    échouer la réponse.
+    """
+    try:
+        d = datetime.strptime(target, "%Y%m%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Date invalide (format YYYYMMDD)")
+
+    cell = grid.snap(lat, lon)
+    current_year = datetime.utcnow().year
+    years = range(current_year - base_years, current_year)
+
+    observed = d <= date.today()
+    # l'historique de la prédiction n'est chargé que pour un jour futur
+    st = None if observed else normals.lookup(cell, PARAMS, d.month, d.day, years, window_days)
+    history = climatology.span(d.month, d.day, years, window_days) if not observed and st is None else None
+    ranges = [(d, d)] if observed else []
+    if history:
+        ranges.append(history)
+
+    loads = _loads(ranges)
+    try:
+        loaded = await asyncio.gather(*(get_columns(lat, lon, PARAMS, a, b, timeout=30) for a, b in loads))
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=502, detail=f"Erreur NASA POWER : {e}")
+    except client.PowerResponseError:
+        raise HTTPException(500, "Réponse NASA POWER inattendue")
+
+    series = [climatology.Series(a, columns) for (a, _), (_, columns) in zip(loads, loaded)]
+
+    def covering(start: date, end: date) -> climatology.Series:
+        return next(s for s in series if s.start <= start and end < s.start + timedelta(days=len(s.year)))
+
+    parameters = {p: {} for p in PARAMS}
+    if observed:
+        s = covering(d, d)
+        i = (d - s.start).days
+        parameters = to_block(d, {p: col[i:i + 1] for p, col in s.columns.items()})
+
+    if history:
+        s = covering(*history)
+        st = s.stats(s.window(d.month, d.day, years, window_days))
+        refresh_normals(cell)
+    prediction = None
+    if not observed:
+        try:
+            prediction = weather_prediction(cell, st, d.month, d.day, years, window_days, d.year)
+        except HTTPException:
+            pass
+
+    try:
+        rainfall = rainfall_response(lat, lon, target, target, parameters)
+    except HTTPException:
+        rainfall = None
+
+    return {
+        "daily": daily_response(cell, parameters, daily_header(cell, d, d)),
+        "prediction": prediction,
+        "rainfall": rainfall,
+    }
@@ -1,60 +1,145 @@
 from fastapi import APIRouter, Query, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from datetime import datetime
-import requests
+import asyncio
+import json
+import os
+import httpx
+from api.eonet.store import RESYNC, utc_today, events
 
 router = APIRouter()
-EONET = "https://eonet.gsfc.nasa.gov/api/v3/events"
-
-def place_str(geom: dict) -> str | None:
-    """Return '43.6°N, 79.4°W' from Point or Polygon; None if not available."""
-    c, t = geom.get("coordinates"), geom.get("type")
-    if not c: 
-        return None
-    if t == "Point" and isinstance(c, list) and len(c) >= 2:
-        lon, lat = c[0], c[1]
-    elif t == "Polygon" and isinstance(c, list) and c and isinstance(c[0], list) and c[0]:
-        xs = [p[0] for p in c[0]]
-        ys = [p[1] for p in c[0]]
-        lon, lat = sum(xs)/len(xs), sum(ys)/len(ys)
-    else:
-        return None
-    return f"{abs(lat):.1f}°{'N' if lat>=0 else 'S'}, {abs(lon):.1f}°{'E' if lon>=0 else 'W'}"
+NEAR_MAX_DAYS = int(os.getenv("EONET_NEAR_MAX_DAYS", "30"))
+NEAR_MAX_POINTS = int(os.getenv("EONET_NEAR_MAX_POINTS", "100"))
+# commentaire SSE envoyé sans changement pour garder la connexion ouverte derrière les proxys
+KEEPALIVE_SECONDS = float(os.getenv("EONET_STREAM_KEEPALIVE_SECONDS", "15"))
+# attente du flux terminée sans changement
+_KEEPALIVE = object()
 
 @router.get("/disasters/headlines")
-def disasters_headlines(
+async def disasters_headlines(
     date: str = Query(..., description="UTC date: YYYY-MM-DD"),
     limit: int = Query(50, ge=1, le=200, description="Max number of events"),
 ):
+    """Served from the in-memory EONET store; a day outside it is fetched once."""
     try:
-        datetime.strptime(date, "%Y-%m-%d")
+        day = datetime.strptime(date, "%Y-%m-%d").date().isoformat()
     except ValueError:
         raise HTTPException(400, "date must be YYYY-MM-DD")
 
     try:
-        r = requests.get(EONET, params={"start": date, "end": date, "status": "all", "limit": 1000}, timeout=20)
-        r.raise_for_status()
-    except requests.RequestException as e:
+        records = await events.get(day)
+    except httpx.HTTPError as e:
         raise HTTPException(502, f"EONET error: {e}")
 
-    events = r.json().get("events", [])
-    headlines = []
-
-    for ev in events:
-        title = ev.get("title") or "Event"
-        import re
-        title = re.sub(r'\s+\d{6,}', '', title)
-        
-        cat = (ev.get("categories") or [{}])[0].get("title", "Event")
-        geom = next((g for g in ev.get("geometry", []) if g.get("date", "").startswith(date)), None)
-        if not geom:
-            continue
-        place = place_str(geom) or "location unavailable"
-        headlines.append(f"{cat} — '{title}' — {place} — {date} (UTC)")
-
-        if len(headlines) >= limit:
-            break
+    headlines = [r.text for r in records[:limit]]
 
     if not headlines:
         headlines = [f"No notable activity detected for {date} (UTC)"]
 
     return {"date": date, "headlines": headlines, "source": "NASA EONET"}
+
+
+def _sse(event: str, data: dict) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode()
+
+
+@router.get("/disasters/stream")
+async def disasters_stream(
+    date: str | None = Query(None, description="UTC date: YYYY-MM-DD; omitted = follow the current UTC day"),
+    limit: int = Query(50, ge=1, le=200, description="Max number of events in the snapshot"),
+):
+    """
+    Server-Sent Events ticker. On connect: a "snapshot" event with the day's records
+    (as /disasters/headlines, but as objects with ids). Then, after each background EONET
+    refresh that changes the day: a "diff" event {date, changed, removed}; changed records
+    replace those with the same id. Without date, a new snapshot is sent when the UTC day
+    changes. A client that falls too far behind gets a fresh snapshot instead of the diffs.
+    """
+    follow = date is None
+    try:
+        day = utc_today().isoformat() if follow else datetime.strptime(date, "%Y-%m-%d").date().isoformat()
+    except ValueError:
+        raise HTTPException(400, "date must be YYYY-MM-DD")
+
+    # abonné avant la lecture du jour : aucun changement ne peut tomber entre les deux
+    queue = events.subscribe()
+
+    async def snapshot(day: str) -> bytes:
+        try:
+            records = await events.get(day)
+        except httpx.HTTPError as e:
+            return _sse("error", {"date": day, "detail": f"EONET error: {e}"})
+        return _sse("snapshot", {"date": day, "events": [r.as_dict() for r in records[:limit]]})
+
+    async def body():
+        nonlocal day
+        try:
+            yield b"retry: 10000\n\n" + await snapshot(day)
+            # à la déconnexion, StreamingResponse annule ce générateur : le finally désabonne
+            while True:
+                try:
+                    changes = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    changes = _KEEPALIVE
+                # changement de jour vérifié à chaque réveil : sans rechargement EONET, seul le keepalive réveille le flux
+                if follow and utc_today().isoformat() != day:
+                    day = utc_today().isoformat()
+                    yield await snapshot(day)
+                elif changes is _KEEPALIVE:
+                    yield b": keepalive\n\n"
+                elif changes is RESYNC:
+                    yield await snapshot(day)
+                else:
+                    for change in changes:
+                        if change.date == day:
+                            yield _sse("diff", change.as_dict())
+        finally:
+            events.unsubscribe(queue)
+
+    return StreamingResponse(body(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.get("/disasters/near")
+async def disasters_near(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(250, gt=0, le=5000),
+    days: int = Query(3, ge=1, le=NEAR_MAX_DAYS, description="Last N UTC days, today included"),
+    limit: int = Query(50, ge=1, le=200),
+):
+    """Events within radius_km of a point, nearest first, from the in-memory EONET spatial index."""
+    try:
+        [found] = await events.near([(lat, lon)], radius_km, days, limit)
+    except httpx.HTTPError as e:
+        raise HTTPException(502, f"EONET error: {e}")
+    return {"lat": lat, "lon": lon, "radius_km": radius_km, "days": days, "events": found, "source": "NASA EONET"}
+
+
+class NearPoint(BaseModel):
+    lat: float = Field(..., ge=-90, le=90)
+    lon: float = Field(..., ge=-180, le=180)
+    name: str | None = None
+
+
+class NearBatch(BaseModel):
+    points: list[NearPoint] = Field(..., min_length=1, max_length=NEAR_MAX_POINTS)
+    radius_km: float = Field(250, gt=0, le=5000)
+    days: int = Field(3, ge=1, le=NEAR_MAX_DAYS)
+    limit: int = Field(50, ge=1, le=200)
+
+
+async def near_points(points: list[NearPoint], radius_km: float, days: int, limit: int) -> list[dict]:
+    try:
+        found = await events.near([(p.lat, p.lon) for p in points], radius_km, days, limit)
+    except httpx.HTTPError as e:
+        raise HTTPException(502, f"EONET error: {e}")
+    return [{**p.model_dump(), "events": f} for p, f in zip(points, found)]
+
+
+@router.post("/disasters/near/batch")
+async def disasters_near_batch(batch: NearBatch):
+    """/disasters/near for several points (e.g. saved favourites) in one call; results follow the input order."""
+    results = await near_points(batch.points, batch.radius_km, batch.days, batch.limit)
+    return {"radius_km": batch.radius_km, "days": batch.days, "results": results, "source": "NASA EONET"}
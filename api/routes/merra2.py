@@ -1,36 +1,60 @@
-from fastapi import APIRouter, Query, HTTPException
-import requests
+from fastapi import APIRouter, Query, HTTPException, Request
+from datetime import datetime
+import httpx
+from api import http_cache
+from api.power import client, export, grid
+from api.power.store import get_series, iter_columns, to_block
 
 router = APIRouter()
 @router.get("/power/daily")
-def get_power_daily(
+async def get_power_daily(
+    request: Request,
     lat: float = Query(..., description="Latitude du point d'intérêt"),
     lon: float = Query(..., description="Longitude du point d'intérêt"),
     start: str = Query(..., regex=r"^\d{8}$", description="Date début au format YYYYMMDD"),
     end: str = Query(..., regex=r"^\d{8}$", description="Date fin au format YYYYMMDD"),
+    stream: str | None = Query(None, regex=r"^(ndjson|csv)$", description="Réponse en flux, une ligne par jour"),
 ):
     """
     Récupère les données journalières NASA POWER (T2M, T2M_MIN, T2M_MAX, RH2M, U2M, V2M, PS, PRECTOTCORR)
     pour un point (lat, lon) entre start et end.
+    Les longues périodes sont téléchargées par années en parallèle ; les années en échec
+    sont listées dans metadata.missing_ranges au lieu de faire échouer la réponse.
+    Avec stream=ndjson|csv, les lignes (date, puis une valeur par paramètre) sont envoyées
+    année par année dès qu'elles sont disponibles ; les jours d'une année en échec sortent vides.
+    Selon l'en-tête Accept (voir api.power.export), parameters peut aussi être servi en
+    colonnes { start, columns: { PARAM: [valeurs] } }, en MessagePack ou en Arrow IPC.
     """
-    params = "T2M,T2M_MIN,T2M_MAX,RH2M,U2M,V2M,PS,PRECTOTCORR"
-    url = (
-        "https://power.larc.nasa.gov/api/temporal/daily/point"
-        f"?parameters={params}&start={start}&end={end}"
-        f"&latitude={lat}&longitude={lon}&community=RE&format=JSON"
-    )
+    fmt = export.negotiate(request)
+    try:
+        d0 = datetime.strptime(start, "%Y%m%d").date()
+        d1 = datetime.strptime(end, "%Y%m%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates invalides (format YYYYMMDD)")
 
     try:
-        resp = requests.get(url, timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
-    except requests.exceptions.RequestException as e:
+        if stream:
+            chunks = iter_columns(lat, lon, client.PARAMS, d0, d1, timeout=30)
+            return await export.stream_response(chunks, list(grid.normalize_params(client.PARAMS)), stream)
+        first, columns, header = await get_series(lat, lon, client.PARAMS, d0, d1, timeout=30, partial=True)
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=502, detail=f"Erreur lors de l'appel NASA POWER : {str(e)}")
-    
-    if "properties" not in data or "parameter" not in data["properties"]:
+    except client.PowerResponseError:
         raise HTTPException(status_code=500, detail="Réponse NASA POWER inattendue")
 
+    if header.get("missing_ranges"):
+        http_cache.no_store(request)
+    cell = grid.snap(lat, lon)
+    if fmt == export.JSON:
+        return daily_response(cell, to_block(first, columns), header)
+    return export.respond(fmt, daily_response(cell, export.columns_json(first, columns), header),
+                          table=export.series_table(first, columns), table_key="parameters")
+
+
+def daily_response(cell, parameters: dict, header: dict) -> dict:
+    """Réponse de /power/daily (aussi servie par /dashboard)."""
     return {
-        "parameters": data["properties"]["parameter"],
-        "metadata": data.get("header", {})
+        "cell": grid.cell_info(cell),
+        "parameters": parameters,
+        "metadata": header
     }
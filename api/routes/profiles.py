@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Query
+from fastapi.responses import PlainTextResponse
+from api import profiling
+
+router = APIRouter()
+
+
+def require_admin(x_profile_token: str | None = Header(None)):
+    """Les profils révèlent le code et les paramètres des requêtes : réservés au jeton admin."""
+    if not profiling.ADMIN_TOKEN:
+        raise HTTPException(404, "Profiling index disabled (PROFILE_ADMIN_TOKEN unset)")
+    if not profiling.valid_token(x_profile_token):
+        raise HTTPException(403, "Invalid profiling token")
+
+
+@router.get("", dependencies=[Depends(require_admin)])
+async def list_profiles(limit: int = Query(20, ge=1, le=profiling.KEEP, description="Max number of profiles")):
+    """Most recent profiled requests (last PROFILE_KEEP), slowest first."""
+    return {"enabled": profiling.enabled(), "interval_ms": profiling.INTERVAL * 1000,
+            "profiles": profiling.slowest(limit)}
+
+
+@router.get("/{profile_id}", dependencies=[Depends(require_admin)], response_class=PlainTextResponse)
+async def get_profile(profile_id: str = Path(..., regex=r"^[0-9a-f]{12}$")):
+    """Folded stacks ("f1;f2;f3 count"), for flamegraph.pl, speedscope or inferno."""
+    folded = profiling.find(profile_id)
+    if folded is None:
+        raise HTTPException(404, "Unknown profile")
+    return PlainTextResponse(folded)
@@ -0,0 +1,19 @@
+from fastapi import APIRouter
+from api.upstream import resilience, singleflight
+from api.power.store import swr
+from api.eonet.store import events
+from api.power.prewarm import prewarmer
+from api.routes.auth.utils import hash_stats
+
+router = APIRouter()
+
+@router.get("/upstream")
+async def upstream_status():
+    """
+    Upstream call counters (calls sent, concurrent callers coalesced), per-host health
+    (circuit state, errors, hedges, latency percentiles), POWER stale-while-revalidate
+    counters, EONET store state, favourites prewarm, password hashing pool.
+    """
+    return {"singleflight": singleflight.stats(), "hosts": resilience.stats(), "power_swr": swr,
+            "eonet": events.stats(), "prewarm": prewarmer.stats(),
+            "password_hashing": hash_stats()}
@@ -1,33 +1,62 @@
-from fastapi import APIRouter, Query, HTTPException
-import requests
+from fastapi import APIRouter, Query, HTTPException, Request
+from datetime import datetime
+import httpx
+from api import http_cache
+from api.power import client, export, grid
+from api.power.store import get_series, iter_columns, to_block
 
 router = APIRouter()
 
 @router.get("/rainfall")
-def get_rainfall(
+async def get_rainfall(
+    request: Request,
     lat: float = Query(..., description="Latitude du point"),
     lon: float = Query(..., description="Longitude du point"),
     start: str = Query(..., regex=r"^\d{8}$", description="Date début YYYYMMDD"),
     end: str = Query(..., regex=r"^\d{8}$", description="Date fin YYYYMMDD"),
+    stream: str | None = Query(None, regex=r"^(ndjson|csv)$", description="Réponse en flux, une ligne par jour"),
 ):
     """
     Récupère la pluie quotidienne NASA POWER pour un point entre start et end.
+    Les années qui n'ont pas pu être téléchargées sont listées dans missing_ranges.
+    Avec stream=ndjson|csv, les lignes (date, puis une valeur par paramètre) sont envoyées
+    année par année dès qu'elles sont disponibles ; les jours d'une année en échec sortent vides.
+    Selon l'en-tête Accept (voir api.power.export), data peut aussi être servi en colonnes,
+    en MessagePack ou en Arrow IPC.
     """
-    url = (
-        "https://power.larc.nasa.gov/api/temporal/daily/point"
-        f"?parameters=PRECTOTCORR&start={start}&end={end}"
-        f"&latitude={lat}&longitude={lon}&community=RE&format=JSON"
-    )
+    fmt = export.negotiate(request)
+    try:
+        d0 = datetime.strptime(start, "%Y%m%d").date()
+        d1 = datetime.strptime(end, "%Y%m%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates invalides (format YYYYMMDD)")
 
     try:
-        resp = requests.get(url, timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
-    except requests.exceptions.RequestException as e:
+        if stream:
+            chunks = iter_columns(lat, lon, ["PRECTOTCORR"], d0, d1, timeout=30)
+            return await export.stream_response(chunks, list(grid.normalize_params(["PRECTOTCORR"])), stream)
+        first, columns, header = await get_series(lat, lon, ["PRECTOTCORR"], d0, d1, timeout=30, partial=True)
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=502, detail=f"Erreur lors de l'appel NASA POWER : {str(e)}")
+    except client.PowerResponseError:
+        first, columns, header = d0, {}, {}
+
+    if fmt == export.JSON:
+        out = rainfall_response(lat, lon, start, end, to_block(first, columns))
+    else:
+        # colonne entièrement vide : même 500 qu'en JSON
+        out = rainfall_response(lat, lon, start, end, {
+            p: export.columns_json(first, {p: col}) for p, col in columns.items() if (col == col).any()
+        })
+    if header.get("missing_ranges"):
+        out["missing_ranges"] = header["missing_ranges"]
+        http_cache.no_store(request)
+    return export.respond(fmt, out, table=export.series_table(first, columns), table_key="data")
+
 
-    parameters = data.get("properties", {}).get("parameter", {})
-    if not parameters or "PRECTOTCORR" not in parameters:
+def rainfall_response(lat: float, lon: float, start: str, end: str, parameters: dict) -> dict:
+    """Réponse de /rainfall (aussi servie par /dashboard), 500 sans données de pluie."""
+    if not parameters.get("PRECTOTCORR"):
         raise HTTPException(status_code=500, detail="Aucune donnée de précipitation disponible pour ces dates/coordonnées")
 
     return {
@@ -35,5 +64,6 @@ def get_rainfall(
         "end_date": end,
         "latitude": lat,
         "longitude": lon,
+        "cell": grid.cell_info(grid.snap(lat, lon)),
         "data": parameters["PRECTOTCORR"]
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,132 @@
+from urllib.parse import urlsplit
+import asyncio
+import os
+import time
+import httpx
+from dotenv import load_dotenv
+from api import metrics
+from api.upstream import resilience
+
+load_dotenv()
+
+HTTP2 = os.getenv("HTTP2", "1") == "1"
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "10"))
+# Per-host overrides, e.g. "power.larc.nasa.gov=8,eonet.gsfc.nasa.gov=4"
+HTTP_HOST_LIMITS = {
+    host.strip(): int(n)
+    for host, n in (item.split("=") for item in os.getenv("HTTP_HOST_LIMITS", "").split(",") if "=" in item)
+}
+
+client: httpx.AsyncClient = None
+_host_slots: dict[str, asyncio.Semaphore] = {}
+
+
+def _new_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=HTTP2,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        ),
+        timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+    )
+
+
+async def connect_http():
+    global client
+    client = _new_client()
+    print(f"✅ HTTP client ready (http2={HTTP2}, max_connections={HTTP_MAX_CONNECTIONS})")
+
+
+async def disconnect_http():
+    global client
+    if client is not None:
+        await client.aclose()
+        client = None
+    print("❌ HTTP client closed.")
+
+
+def _slots(host: str) -> asyncio.Semaphore:
+    if host not in _host_slots:
+        _host_slots[host] = asyncio.Semaphore(HTTP_HOST_LIMITS.get(host, HTTP_MAX_PER_HOST))
+    return _host_slots[host]
+
+
+async def _attempt(url: str, params: dict | None, timeout: float, host: str) -> tuple[httpx.Response, float]:
+    async with _slots(host):
+        started = time.perf_counter()
+        resp = await client.get(url, params=params, timeout=timeout)
+    return resp, time.perf_counter() - started
+
+
+async def _hedged(url: str, params: dict | None, timeout: float, h: resilience.Host) -> tuple[httpx.Response, float]:
+    """First good answer of the call and, past the host's p95, of one duplicate."""
+    first = asyncio.ensure_future(_attempt(url, params, timeout, h.name))
+    delay = h.hedge_delay()
+    if delay is None:
+        return await first
+
+    pending = {first}
+    try:
+        done, _ = await asyncio.wait(pending, timeout=delay)
+        if not done:
+            h.hedges += 1
+            pending.add(asyncio.ensure_future(_attempt(url, params, timeout, h.name)))
+        outcome = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                e = task.exception()
+                if e is None and not resilience.failed(response=task.result()[0]):
+                    if task is not first:
+                        h.hedge_wins += 1
+                    return task.result()
+                outcome = outcome or task
+        return outcome.result()  # both failed: the first failure is reported
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def get(url: str, *, params: dict | None = None, timeout: float | None = None) -> httpx.Response:
+    """
+    GET via the shared keep-alive client, at most HTTP_MAX_PER_HOST requests
+    in flight per upstream host, through the host's circuit breaker and with a
+    hedged duplicate for slow answers (see api.upstream.resilience).
+    Raises httpx.HTTPError on failure, resilience.CircuitOpenError without calling
+    while the host's circuit is open.
+    """
+    global client
+    if client is None:
+        # used outside the app lifespan (scripts)
+        client = _new_client()
+
+    h = resilience.host(urlsplit(url).hostname)
+    h.before()
+    probe = h.state == resilience.HALF_OPEN
+    started = time.perf_counter()
+    try:
+        async with metrics.upstream_wait():
+            resp, seconds = await _hedged(url, params, timeout or HTTP_TIMEOUT, h)
+    except httpx.HTTPError as e:
+        metrics.upstream_requests.observe(time.perf_counter() - started, host=h.name, status=type(e).__name__)
+        if resilience.failed(e):
+            h.failure()
+        raise
+    finally:
+        # a probe that ends without a verdict (cancelled, or an error failed() does not
+        # count) must not leave the host refusing every call
+        if probe:
+            h.probing = False
+    metrics.upstream_requests.observe(time.perf_counter() - started, host=h.name, status=resp.status_code)
+    metrics.upstream_bytes.inc(len(resp.content), host=h.name)
+    if resilience.failed(response=resp):
+        h.failure()
+    else:
+        h.success(seconds)
+    resp.raise_for_status()
+    return resp
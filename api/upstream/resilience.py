@@ -0,0 +1,129 @@
+"""
+Per-host upstream health: latency window, circuit breaker and hedging budget.
+
+- Circuit breaker: after BREAKER_FAILURES consecutive failures (transport errors,
+  timeouts, 429 and 5xx) the host is "open" and calls fail at once with
+  CircuitOpenError for BREAKER_COOLDOWN seconds. Then one probe call is let through
+  ("half-open"): success closes the circuit, failure opens it again.
+- Hedging: when a call has not answered after the host's recent p95 latency, a
+  duplicate is sent and the first good answer wins. Hedges are capped at
+  HEDGE_MAX_RATIO of the host's calls so a slow upstream is not doubled in load.
+"""
+from collections import deque
+import os
+import time
+import httpx
+from api import metrics
+
+BREAKER_FAILURES = int(os.getenv("UPSTREAM_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.getenv("UPSTREAM_BREAKER_COOLDOWN", "30"))
+HEDGE = os.getenv("UPSTREAM_HEDGE", "1") == "1"
+HEDGE_MIN_SAMPLES = int(os.getenv("UPSTREAM_HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MIN_DELAY = float(os.getenv("UPSTREAM_HEDGE_MIN_DELAY", "0.2"))
+HEDGE_MAX_RATIO = float(os.getenv("UPSTREAM_HEDGE_MAX_RATIO", "0.1"))
+# successful call latencies kept per host for the percentiles
+LATENCY_WINDOW = 200
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(httpx.HTTPError):
+    """The upstream host failed repeatedly; the call was not sent."""
+
+
+def failed(e: BaseException | None = None, response: httpx.Response | None = None) -> bool:
+    """Outcome that counts against the host (client errors other than 429 do not)."""
+    if response is not None:
+        return response.status_code == 429 or response.status_code >= 500
+    return isinstance(e, httpx.TransportError)
+
+
+class Host:
+    def __init__(self, name: str):
+        self.name = name
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.calls = 0
+        self.errors = 0
+        self.short_circuited = 0
+        self.opens = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def before(self):
+        """Raises CircuitOpenError if the call must not be sent."""
+        if self.state == OPEN and time.monotonic() - self.opened_at >= BREAKER_COOLDOWN:
+            self.state = HALF_OPEN
+        if self.state == OPEN or (self.state == HALF_OPEN and self.probing):
+            self.short_circuited += 1
+            raise CircuitOpenError(f"{self.name}: circuit open after {self.failures} failures")
+        if self.state == HALF_OPEN:
+            self.probing = True
+        self.calls += 1
+
+    def success(self, seconds: float):
+        self.latencies.append(seconds)
+        self.failures = 0
+        self.state = CLOSED
+        self.probing = False
+
+    def failure(self):
+        self.errors += 1
+        self.failures += 1
+        self.probing = False
+        if self.state == HALF_OPEN or self.failures >= BREAKER_FAILURES:
+            if self.state != OPEN:
+                self.opens += 1
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def percentile(self, q: float) -> float | None:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def hedge_delay(self) -> float | None:
+        """Seconds to wait before a duplicate call, or None if this call must not be hedged."""
+        if not HEDGE or self.state != CLOSED or len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        if self.hedges >= HEDGE_MAX_RATIO * self.calls:
+            return None
+        return max(self.percentile(0.95), HEDGE_MIN_DELAY)
+
+    def stats(self) -> dict:
+        p = {f"p{int(q * 100)}_ms": round(v * 1000, 1) if (v := self.percentile(q)) is not None else None
+             for q in (0.5, 0.95, 0.99)}
+        return {"state": self.state, "calls": self.calls, "errors": self.errors,
+                "short_circuited": self.short_circuited, "opens": self.opens,
+                "hedges": self.hedges, "hedge_wins": self.hedge_wins, **p}
+
+
+hosts: dict[str, Host] = {}
+
+
+def host(name: str) -> Host:
+    if name not in hosts:
+        hosts[name] = Host(name)
+    return hosts[name]
+
+
+def stats() -> dict:
+    return {name: h.stats() for name, h in hosts.items()}
+
+
+@metrics.collector
+def _metrics():
+    return [
+        ("upstream_circuit_open", "gauge", "1 while the host's circuit is open or half-open",
+         [({"host": n}, int(h.state != CLOSED)) for n, h in hosts.items()]),
+        ("upstream_short_circuited_total", "counter", "Calls refused by an open circuit",
+         [({"host": n}, h.short_circuited) for n, h in hosts.items()]),
+        ("upstream_hedges_total", "counter", "Hedged duplicate calls sent",
+         [({"host": n}, h.hedges) for n, h in hosts.items()]),
+        ("upstream_hedge_wins_total", "counter", "Hedged calls that answered first",
+         [({"host": n}, h.hedge_wins) for n, h in hosts.items()]),
+    ]
@@ -0,0 +1,47 @@
+import asyncio
+from api import metrics
+
+# name -> SingleFlight, for the status route
+registry: dict[str, "SingleFlight"] = {}
+
+
+class SingleFlight:
+    """
+    Collapses concurrent identical upstream calls: the first caller for a key
+    starts the call, later callers await the same task until it completes.
+    Results are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.coalesced = 0
+        self._inflight: dict[str, asyncio.Task] = {}
+        registry[name] = self
+
+    async def do(self, key: str, fn):
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            metrics.cache_events.inc(cache=f"singleflight_{self.name}", result="coalesced")
+        else:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        # shield: a caller that disconnects must not cancel the call for the others
+        async with metrics.upstream_wait():
+            return await asyncio.shield(task)
+
+    def _done(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # marks the exception as retrieved if nobody is left waiting
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "coalesced": self.coalesced, "inflight": len(self._inflight)}
+
+
+def stats() -> dict:
+    return {name: flight.stats() for name, flight in registry.items()}
@@ -0,0 +1,62 @@
+"""
+Compare deux résultats de bench/run.py (avant, après) scénario par scénario et niveau
+par niveau. Sort en code 1 si une latence ou la mémoire augmente, ou si le débit baisse,
+de plus de --threshold pour cent.
+
+    python -m bench.compare bench/results/3e01ca0.json bench/results/41610d0.json
+"""
+import argparse
+import json
+import sys
+
+# métrique -> sens de l'amélioration (+1 : plus haut est mieux)
+METRICS = {"rps": 1, "p50_ms": -1, "p95_ms": -1, "p99_ms": -1, "rss_peak_mb": -1}
+
+
+def _load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def _delta(before, after) -> float | None:
+    if before in (None, 0) or after is None:
+        return None
+    return (after - before) / before * 100
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("before")
+    ap.add_argument("after")
+    ap.add_argument("--threshold", type=float, default=10.0, help="Regression threshold, in percent")
+    args = ap.parse_args()
+
+    before, after = _load(args.before), _load(args.after)
+    print(f"{before['commit']} -> {after['commit']}")
+    if before["config"] != after["config"]:
+        print(f"⚠️ different configs: {before['config']} / {after['config']}")
+
+    regressions = 0
+    for name, levels in after["results"].items():
+        previous = {r["concurrency"]: r for r in before["results"].get(name, [])}
+        for r in levels:
+            old = previous.get(r["concurrency"])
+            if old is None:
+                continue
+            cells = []
+            for metric, sign in METRICS.items():
+                d = _delta(old[metric], r[metric])
+                worse = d is not None and d * sign < -args.threshold
+                regressions += worse
+                cells.append(f"{metric}={r[metric]} ({'n/a' if d is None else f'{d:+.1f}%'}){' ❌' if worse else ''}")
+            if r["errors"] > old["errors"]:
+                regressions += 1
+                cells.append(f"errors={old['errors']}->{r['errors']} ❌")
+            print(f"{name:<20} c={r['concurrency']:<4} " + "  ".join(cells))
+
+    print(f"{regressions} regression(s) above {args.threshold}%")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
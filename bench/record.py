@@ -0,0 +1,71 @@
+"""
+Enregistre de vraies réponses NASA POWER et EONET dans bench/fixtures, rejouées
+ensuite par bench/stub.py (seul script du banc qui appelle NASA).
+
+    python -m bench.record --years 21 --eonet-days 400            # points de bench.scenarios
+    python -m bench.record --point 45.5 -73.6 --point 48.85 2.35
+
+Une maille = un fichier power/<lat>_<lon>.json, au centre de la maille POWER (les
+coordonnées que l'API envoie réellement).
+"""
+from datetime import date, datetime, timedelta, timezone
+import argparse
+import asyncio
+import json
+import os
+from api.power import client as power
+from api.power.grid import snap
+from api.eonet import client as eonet
+from bench.scenarios import POINTS
+from bench.stub import FIXTURES, _cell_key
+
+
+async def record_power(lat: float, lon: float, years: int):
+    cell = snap(lat, lon)
+    today = date.today()
+    parameter, header = {}, {}
+    # un appel par année, comme l'API
+    for y in range(today.year - years, today.year + 1):
+        start, end = date(y, 1, 1), min(date(y, 12, 31), today)
+        block, header = await power.fetch_daily(cell[0], cell[1], power.PARAMS, start, end, timeout=120)
+        for p, values in block.items():
+            parameter.setdefault(p, {}).update(values)
+    os.makedirs(os.path.join(FIXTURES, "power"), exist_ok=True)
+    path = os.path.join(FIXTURES, "power", f"{_cell_key(*cell)}.json")
+    with open(path, "w") as f:
+        json.dump({"header": header, "parameter": parameter}, f)
+    print(f"✅ {path}")
+
+
+async def record_eonet(days: int):
+    today = datetime.now(timezone.utc).date()
+    events, seen = [], set()
+    # par tranches de 30 jours : une page EONET est limitée à eonet.LIMIT événements
+    for k in range(0, days, 30):
+        end, start = today - timedelta(days=k), today - timedelta(days=min(k + 29, days - 1))
+        for ev in await eonet.fetch_events(start.isoformat(), end.isoformat()):
+            if ev.get("id") not in seen:
+                seen.add(ev.get("id"))
+                events.append(ev)
+    os.makedirs(FIXTURES, exist_ok=True)
+    path = os.path.join(FIXTURES, "eonet.json")
+    with open(path, "w") as f:
+        json.dump({"events": events}, f)
+    print(f"✅ {path} ({len(events)} events)")
+
+
+async def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--point", nargs=2, type=float, action="append", metavar=("LAT", "LON"))
+    ap.add_argument("--years", type=int, default=21, help="Years of POWER history per cell")
+    ap.add_argument("--eonet-days", type=int, default=400)
+    args = ap.parse_args()
+
+    for lat, lon in args.point or POINTS:
+        await record_power(lat, lon, args.years)
+    if args.eonet_days:
+        await record_eonet(args.eonet_days)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,224 @@
+"""
+Banc d'essai hors ligne de l'API.
+
+Démarre bench/stub.py (POWER et EONET rejoués) et l'API (bench/serve_api.py, MongoDB en
+mémoire), puis, pour chaque scénario et chaque niveau de concurrence, envoie un nombre
+fixe de requêtes et mesure débit, p50/p95/p99, erreurs et mémoire (RSS) du processus API.
+
+Les requêtes sont tirées d'un générateur seedé et le store POWER part vide à chaque
+exécution : deux exécutions avec les mêmes options sont comparables (voir bench/compare.py).
+Le résultat est écrit dans bench/results/<commit>.json.
+
+    python -m bench.run                                   # tout, concurrence 1,8,32
+    python -m bench.run -s predict -s headlines -c 1,64 -n 500
+    python -m bench.run --latency-ms 200 --tail-rate 0.05 --tail-ms 3000 --error-rate 0.02
+"""
+from datetime import datetime, timezone
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+from bench.scenarios import SCENARIOS, setup
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS = os.path.join(ROOT, "bench", "results")
+RSS_INTERVAL = 0.1
+
+
+def _git(*args) -> str:
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def commit() -> str:
+    sha = _git("rev-parse", "--short", "HEAD") or "unknown"
+    return sha + ("-dirty" if _git("status", "--porcelain", "--untracked-files=no") else "")
+
+
+def rss_mb(pid: int) -> float | None:
+    """RSS courant du processus, en Mio (Linux uniquement)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def percentile(ordered: list[float], q: float) -> float | None:
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _spawn(module: str, args: list[str], env: dict) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, "-m", module, *args], cwd=ROOT, env=env)
+
+
+async def _wait_up(url: str, proc: subprocess.Popen, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"{url}: process exited with {proc.returncode}")
+            try:
+                await client.get(url, timeout=1)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url}: not up after {timeout}s")
+
+
+async def run_level(client: httpx.AsyncClient, scenario, state: dict, concurrency: int,
+                    requests: int, warmup: int, seed: int, pid: int) -> dict:
+    rng = random.Random(seed)
+    planned = [scenario(rng, state) for _ in range(warmup + requests)]
+
+    async def send(method, path, kwargs):
+        started = time.perf_counter()
+        try:
+            r = await client.request(method, path, **kwargs)
+            await r.aread()
+            status = r.status_code
+        except httpx.HTTPError:
+            status = 0
+        return time.perf_counter() - started, status
+
+    async def worker(queue, latencies, statuses):
+        while queue:
+            elapsed, status = await send(*queue.pop())
+            latencies.append(elapsed)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    # préchauffage (non mesuré)
+    queue = planned[:warmup][::-1]
+    await asyncio.gather(*(worker(queue, [], {}) for _ in range(concurrency)))
+
+    latencies, statuses, peak = [], {}, [rss_mb(pid) or 0.0]
+    done = asyncio.Event()
+
+    async def sample_rss():
+        while not done.is_set():
+            peak.append(rss_mb(pid) or 0.0)
+            await asyncio.sleep(RSS_INTERVAL)
+
+    sampler = asyncio.create_task(sample_rss())
+    queue = planned[warmup:][::-1]
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(queue, latencies, statuses) for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    done.set()
+    await sampler
+
+    ordered = sorted(latencies)
+    ms = lambda v: round(v * 1000, 2) if v is not None else None
+    errors = sum(n for s, n in statuses.items() if s == 0 or s >= 500)
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "status": {str(s): n for s, n in sorted(statuses.items())},
+        "rps": round(len(latencies) / wall, 2) if wall else None,
+        "p50_ms": ms(percentile(ordered, 0.50)),
+        "p95_ms": ms(percentile(ordered, 0.95)),
+        "p99_ms": ms(percentile(ordered, 0.99)),
+        "max_ms": ms(ordered[-1] if ordered else None),
+        "rss_peak_mb": round(max(peak), 1),
+        "rss_end_mb": round(rss_mb(pid) or 0.0, 1),
+    }
+
+
+def _row(name: str, r: dict) -> str:
+    return (f"{name:<20} c={r['concurrency']:<4} n={r['requests']:<5} err={r['errors']:<4} "
+            f"rps={r['rps']:>8} p50={r['p50_ms']:>8} p95={r['p95_ms']:>8} p99={r['p99_ms']:>8} "
+            f"rss={r['rss_peak_mb']:>7}MB")
+
+
+async def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("-s", "--scenario", action="append", choices=sorted(SCENARIOS), help="Default: all")
+    ap.add_argument("-c", "--concurrency", default="1,8,32", help="Comma-separated levels")
+    ap.add_argument("-n", "--requests", type=int, default=200, help="Measured requests per level")
+    ap.add_argument("--warmup", type=int, default=20, help="Unmeasured requests per level")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--api-port", type=int, default=8900)
+    ap.add_argument("--stub-port", type=int, default=8901)
+    ap.add_argument("--latency-ms", type=float, default=0)
+    ap.add_argument("--jitter-ms", type=float, default=0)
+    ap.add_argument("--tail-rate", type=float, default=0)
+    ap.add_argument("--tail-ms", type=float, default=0)
+    ap.add_argument("--error-rate", type=float, default=0)
+    ap.add_argument("-o", "--output", help="Default: bench/results/<commit>.json")
+    args = ap.parse_args()
+
+    names = args.scenario or list(SCENARIOS)
+    levels = [int(c) for c in args.concurrency.split(",")]
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    api_url = f"http://127.0.0.1:{args.api_port}"
+
+    env = {**os.environ, "PYTHONUNBUFFERED": "1"}
+    stub = _spawn("bench.stub", [
+        "--port", str(args.stub_port), "--seed", str(args.seed),
+        "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+        "--tail-rate", str(args.tail_rate), "--tail-ms", str(args.tail_ms),
+        "--error-rate", str(args.error_rate),
+    ], env)
+    with tempfile.TemporaryDirectory(prefix="bench-power-") as store_dir:
+        api = _spawn("bench.serve_api", ["--port", str(args.api_port)], {
+            **env,
+            "POWER_URL": f"{stub_url}/api/temporal/daily/point",
+            "EONET_URL": f"{stub_url}/api/v3/events",
+            "POWER_STORE_DIR": store_dir,
+        })
+        try:
+            await _wait_up(f"{stub_url}/stats", stub)
+            await _wait_up(f"{api_url}/", api)
+
+            limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+            async with httpx.AsyncClient(base_url=api_url, limits=limits, timeout=120) as client:
+                state = await setup(client, f"{int(time.time())}")
+                results = {}
+                for name in names:
+                    results[name] = []
+                    for level in levels:
+                        r = await run_level(client, SCENARIOS[name], state, level, args.requests,
+                                            args.warmup, args.seed, api.pid)
+                        results[name].append(r)
+                        print(_row(name, r), flush=True)
+                upstream = (await client.get(f"{stub_url}/stats")).json()
+        finally:
+            for proc in (api, stub):
+                proc.terminate()
+                try:
+                    proc.wait(10)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+
+    report = {
+        "commit": commit(),
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "config": {**{k: v for k, v in vars(args).items() if k not in ("output", "api_port", "stub_port")},
+                   "scenario": names, "concurrency": levels},
+        "upstream": upstream,
+        "results": results,
+    }
+    path = args.output or os.path.join(RESULTS, f"{report['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ {path}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,123 @@
+"""
+Scénarios du banc : une requête HTTP par route, paramètres tirés d'un générateur seedé
+(mêmes requêtes, dans le même ordre, à chaque exécution).
+
+Chaque scénario est une fonction (rng, state) -> (méthode, chemin, kwargs httpx).
+state contient les comptes créés par setup() pour les routes /auth/*.
+"""
+from datetime import datetime, timedelta, timezone
+import random
+
+# quelques villes, sur des mailles POWER distinctes
+POINTS = [
+    (45.50, -73.57),   # Montréal
+    (48.85, 2.35),     # Paris
+    (-33.87, 151.21),  # Sydney
+    (35.68, 139.69),   # Tokyo
+    (-1.29, 36.82),    # Nairobi
+]
+FUTURE_YEAR = 2030
+USERS = 20
+PASSWORD = "bench-password"
+
+
+def _point(rng: random.Random):
+    return rng.choice(POINTS)
+
+
+def _day(rng: random.Random):
+    return {"month": rng.randint(1, 12), "day": rng.randint(1, 28)}
+
+
+def predict(rng, state):
+    lat, lon = _point(rng)
+    return "GET", "/algo/daily/predict", {"params": {"lat": lat, "lon": lon, **_day(rng), "future_year": FUTURE_YEAR}}
+
+
+def predict_rain(rng, state):
+    lat, lon = _point(rng)
+    return "GET", "/algo/daily/predict_rain", {"params": {"lat": lat, "lon": lon, **_day(rng), "future_year": FUTURE_YEAR}}
+
+
+def predict_rain_hourly(rng, state):
+    lat, lon = _point(rng)
+    return "GET", "/algo/daily/predict_rain_hourly", {"params": {"lat": lat, "lon": lon, **_day(rng), "future_year": FUTURE_YEAR}}
+
+
+def analyse(rng, state):
+    lat, lon = _point(rng)
+    return "GET", "/algo/daily/analyse", {"params": {"lat": lat, "lon": lon, **_day(rng), "years": 5}}
+
+
+def range_predict(rng, state):
+    lat, lon = _point(rng)
+    month = rng.randint(1, 12)
+    return "GET", "/algo/range/predict", {"params": {
+        "lat": lat, "lon": lon, "start_md": f"{month:02d}01", "end_md": f"{month:02d}14", "future_year": FUTURE_YEAR}}
+
+
+def _year_range(rng):
+    year = rng.randint(2005, 2022)
+    return {"start": f"{year}0101", "end": f"{year}1231"}
+
+
+def merra2_daily(rng, state):
+    lat, lon = _point(rng)
+    return "GET", "/merra2/power/daily", {"params": {"lat": lat, "lon": lon, **_year_range(rng)}}
+
+
+def rainfall(rng, state):
+    lat, lon = _point(rng)
+    return "GET", "/weather/rainfall", {"params": {"lat": lat, "lon": lon, **_year_range(rng)}}
+
+
+def headlines(rng, state):
+    # jours relatifs : EONET ne sert que l'historique récent (fixtures comme données synthétiques)
+    day = datetime.now(timezone.utc).date() - timedelta(days=rng.randint(2, 60))
+    return "GET", "/disasters/headlines", {"params": {"date": day.isoformat(), "limit": 50}}
+
+
+def auth_register(rng, state):
+    state["registered"] += 1
+    name = f"bench-{state['run']}-new-{state['registered']}"
+    return "POST", "/auth/register", {"json": {"username": name, "email": f"{name}@example.com", "password": PASSWORD}}
+
+
+def auth_login(rng, state):
+    return "POST", "/auth/login", {"json": {"username": rng.choice(state["users"]), "password": PASSWORD}}
+
+
+def _auth(rng, state):
+    return {"Authorization": f"Bearer {rng.choice(state['tokens'])}"}
+
+
+def favorites_get(rng, state):
+    return "GET", "/auth/favorites", {"headers": _auth(rng, state)}
+
+
+def favorites_add(rng, state):
+    lat, lon = _point(rng)
+    # noms recyclés : une partie des ajouts tombe sur un favori existant, comme en vrai
+    return "POST", "/auth/favorites", {"headers": _auth(rng, state),
+                                      "json": {"name": f"place-{rng.randint(0, 50)}", "lat": lat, "lon": lon}}
+
+
+SCENARIOS = {f.__name__: f for f in (
+    predict, predict_rain, predict_rain_hourly, analyse, range_predict,
+    merra2_daily, rainfall, headlines,
+    auth_register, auth_login, favorites_get, favorites_add,
+)}
+
+
+async def setup(client, run: str) -> dict:
+    """Crée USERS comptes et leurs jetons (hors mesure)."""
+    state = {"run": run, "registered": 0, "users": [], "tokens": []}
+    for i in range(USERS):
+        name = f"bench-{run}-{i}"
+        r = await client.post("/auth/register", json={"username": name, "email": f"{name}@example.com", "password": PASSWORD})
+        r.raise_for_status()
+        r = await client.post("/auth/login", json={"username": name, "password": PASSWORD})
+        r.raise_for_status()
+        state["users"].append(name)
+        state["tokens"].append(r.json()["access_token"])
+    return state
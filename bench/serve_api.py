@@ -0,0 +1,46 @@
+"""
+Lance l'API pour le banc, isolée de l'environnement de production :
+- POWER_URL / EONET_URL pointent vers bench/stub.py (passés par bench/run.py),
+- store POWER dans un dossier temporaire neuf, prewarm coupé,
+- MongoDB remplacé par mongomock (en mémoire) sauf si BENCH_MONGO=real, auquel cas
+  MONGO_URI / MONGO_DB_NAME sont utilisés tels quels.
+
+    python -m bench.serve_api --port 8900
+"""
+import argparse
+import os
+import tempfile
+
+DEFAULTS = {
+    "PREWARM_ENABLED": "0",
+    # le stub ne parle que HTTP/1.1
+    "HTTP2": "0",
+    "SECRET_KEY": "bench-secret",
+    "ALGORITHM": "HS256",
+    "MONGO_DB_NAME": "weathermellon_bench",
+}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8900)
+    args = ap.parse_args()
+
+    for k, v in DEFAULTS.items():
+        os.environ.setdefault(k, v)
+    os.environ.setdefault("POWER_STORE_DIR", tempfile.mkdtemp(prefix="bench-power-"))
+
+    # avant l'import de l'API : .env ne doit pas rebrancher la vraie base
+    if os.getenv("BENCH_MONGO", "mock") == "mock":
+        from mongomock_motor import AsyncMongoMockClient
+        from api.db import session
+        session.AsyncIOMotorClient = AsyncMongoMockClient
+
+    import uvicorn
+    from api.main import app
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
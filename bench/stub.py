@@ -0,0 +1,235 @@
+"""
+Serveur local qui remplace NASA POWER et EONET pour les bancs d'essai.
+
+Rejoue les réponses enregistrées de bench/fixtures (voir bench/record.py) :
+- power/<maille>.json : {"header": ..., "parameter": {PARAM: {"YYYYMMDD": valeur}}},
+  découpé selon start/end/parameters de la requête,
+- eonet.json : {"events": [...]}, filtré sur start/end et tronqué à limit.
+Une maille sans enregistrement reçoit une série synthétique déterministe (saisonnière,
+-999 pour les derniers jours comme POWER), EONET sans enregistrement des événements
+synthétiques : le banc tourne aussi sans aucune fixture.
+
+Latence et erreurs injectées (options ou variables d'environnement STUB_*) : latence de
+base + gigue uniforme, une part de réponses très lentes (queue de latence) et une part
+d'erreurs (503 par défaut).
+
+    python -m bench.stub --port 8901 --latency-ms 150 --tail-rate 0.05 --tail-ms 3000 --error-rate 0.02
+"""
+from datetime import date, datetime, timedelta, timezone
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+POWER_PATH = "/api/temporal/daily/point"
+EONET_PATH = "/api/v3/events"
+FILL = -999.0
+# POWER publie avec quelques jours de retard
+POWER_LAG_DAYS = 3
+
+
+def _env(name: str, default: str) -> str:
+    return os.getenv(f"STUB_{name.upper()}", default)
+
+
+def _seed(*parts) -> int:
+    return int.from_bytes(hashlib.sha256(repr(parts).encode()).digest()[:8], "big")
+
+
+# --- POWER --------------------------------------------------------------------------------
+
+_recorded_power: dict[str, dict] = {}
+
+
+def _cell_key(lat: float, lon: float) -> str:
+    return f"{lat:.3f}_{lon:.3f}"
+
+
+def _recorded(lat: float, lon: float) -> dict | None:
+    key = _cell_key(lat, lon)
+    if key not in _recorded_power:
+        try:
+            with open(os.path.join(FIXTURES, "power", f"{key}.json")) as f:
+                _recorded_power[key] = json.load(f)
+        except FileNotFoundError:
+            _recorded_power[key] = None
+    return _recorded_power[key]
+
+
+def _synthetic(param: str, lat: float, lon: float, d: date) -> float:
+    doy = d.timetuple().tm_yday
+    season = math.sin(2 * math.pi * (doy - 110) / 365.25) * (1 if lat >= 0 else -1)
+    noise = random.Random(_seed(param, lat, lon, d.toordinal())).gauss(0, 1)
+    base = 25 - abs(lat) * 0.45
+    if param == "T2M":
+        return round(base + 12 * season + 2.5 * noise, 2)
+    if param == "T2M_MIN":
+        return round(base - 5 + 12 * season + 2.5 * noise, 2)
+    if param == "T2M_MAX":
+        return round(base + 5 + 12 * season + 2.5 * noise, 2)
+    if param == "RH2M":
+        return round(min(max(65 + 15 * noise, 5), 100), 2)
+    if param in ("U2M", "V2M"):
+        return round(3 * noise, 2)
+    if param == "PS":
+        return round(101.3 - 0.011 * max(lat, 0) + 0.4 * noise, 2)
+    if param == "PRECTOTCORR":
+        return round(max(noise, 0) ** 2 * 3, 2)
+    return round(noise, 2)
+
+
+def power_body(params: list[str], lat: float, lon: float, start: date, end: date) -> dict:
+    recorded = _recorded(lat, lon)
+    last = datetime.now(timezone.utc).date() - timedelta(days=POWER_LAG_DAYS)
+    out = {}
+    for p in params:
+        values = {}
+        d = start
+        series = (recorded or {}).get("parameter", {}).get(p)
+        while d <= end:
+            k = f"{d:%Y%m%d}"
+            if series is not None:
+                values[k] = series.get(k, FILL)
+            else:
+                values[k] = _synthetic(p, lat, lon, d) if d <= last else FILL
+            d += timedelta(days=1)
+        out[p] = values
+    header = (recorded or {}).get("header") or {
+        "title": "NASA/POWER Source Native Resolution Daily Data (stub)",
+        "api": {"version": "v2.5", "name": "POWER Daily API"},
+        "sources": ["MERRA2"],
+        "fill_value": FILL,
+    }
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [lon, lat, 0]},
+        "properties": {"parameter": out},
+        "header": {**header, "start": f"{start:%Y%m%d}", "end": f"{end:%Y%m%d}"},
+        "messages": [],
+    }
+
+
+# --- EONET --------------------------------------------------------------------------------
+
+_events: list[dict] | None = None
+
+
+def _synthetic_events(n: int = 600) -> list[dict]:
+    rng = random.Random(42)
+    today = datetime.now(timezone.utc).date()
+    cats = ["Wildfires", "Severe Storms", "Volcanoes", "Floods", "Sea and Lake Ice"]
+    events = []
+    for i in range(n):
+        d0 = today - timedelta(days=rng.randint(0, 400))
+        lat, lon = rng.uniform(-60, 70), rng.uniform(-180, 180)
+        geometry = []
+        for k in range(rng.randint(1, 5)):
+            d = d0 + timedelta(days=k)
+            lat, lon = lat + rng.uniform(-0.5, 0.5), lon + rng.uniform(-0.5, 0.5)
+            if rng.random() < 0.8:
+                geometry.append({"date": f"{d}T00:00:00Z", "type": "Point", "coordinates": [lon, lat]})
+            else:
+                ring = [[lon, lat], [lon + 1, lat], [lon + 1, lat + 1], [lon, lat + 1], [lon, lat]]
+                geometry.append({"date": f"{d}T12:00:00Z", "type": "Polygon", "coordinates": [ring]})
+        events.append({
+            "id": f"EONET_{10000 + i}",
+            "title": f"{rng.choice(['Wildfire', 'Storm', 'Eruption', 'Flood'])} {rng.randint(10**6, 10**7)}",
+            "categories": [{"id": "c", "title": rng.choice(cats)}],
+            "geometry": geometry,
+        })
+    return events
+
+
+def all_events() -> list[dict]:
+    global _events
+    if _events is None:
+        try:
+            with open(os.path.join(FIXTURES, "eonet.json")) as f:
+                _events = json.load(f)["events"]
+        except FileNotFoundError:
+            _events = _synthetic_events()
+    return _events
+
+
+def eonet_body(start: str, end: str, limit: int) -> dict:
+    found = [ev for ev in all_events() if any(start <= g.get("date", "")[:10] <= end for g in ev.get("geometry", []))]
+    return {"title": "EONET Events (stub)", "events": found[:limit]}
+
+
+# --- injection ----------------------------------------------------------------------------
+
+class Injection:
+    def __init__(self, latency_ms: float, jitter_ms: float, tail_rate: float, tail_ms: float,
+                 error_rate: float, error_status: int, seed: int):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.tail_rate, self.tail = tail_rate, tail_ms / 1000
+        self.error_rate, self.error_status = error_rate, error_status
+        self.rng = random.Random(seed)
+        self.served = {"requests": 0, "errors": 0, "tail": 0}
+
+    async def apply(self) -> JSONResponse | None:
+        self.served["requests"] += 1
+        delay = self.latency + self.rng.uniform(0, self.jitter)
+        if self.rng.random() < self.tail_rate:
+            self.served["tail"] += 1
+            delay += self.tail
+        await asyncio.sleep(delay)
+        if self.rng.random() < self.error_rate:
+            self.served["errors"] += 1
+            return JSONResponse({"detail": "injected error"}, status_code=self.error_status)
+        return None
+
+
+def build_app(injection: Injection) -> Starlette:
+    async def power(request):
+        if (error := await injection.apply()) is not None:
+            return error
+        q = request.query_params
+        start = datetime.strptime(q["start"], "%Y%m%d").date()
+        end = datetime.strptime(q["end"], "%Y%m%d").date()
+        return JSONResponse(power_body(q["parameters"].split(","), float(q["latitude"]), float(q["longitude"]), start, end))
+
+    async def eonet(request):
+        if (error := await injection.apply()) is not None:
+            return error
+        q = request.query_params
+        return JSONResponse(eonet_body(q["start"], q["end"], int(q.get("limit", 1000))))
+
+    async def stats(request):
+        return JSONResponse(injection.served)
+
+    return Starlette(routes=[
+        Route(POWER_PATH, power),
+        Route(EONET_PATH, eonet),
+        Route("/stats", stats),
+    ])
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default=_env("host", "127.0.0.1"))
+    ap.add_argument("--port", type=int, default=int(_env("port", "8901")))
+    ap.add_argument("--latency-ms", type=float, default=float(_env("latency_ms", "0")))
+    ap.add_argument("--jitter-ms", type=float, default=float(_env("jitter_ms", "0")))
+    ap.add_argument("--tail-rate", type=float, default=float(_env("tail_rate", "0")))
+    ap.add_argument("--tail-ms", type=float, default=float(_env("tail_ms", "0")))
+    ap.add_argument("--error-rate", type=float, default=float(_env("error_rate", "0")))
+    ap.add_argument("--error-status", type=int, default=int(_env("error_status", "503")))
+    ap.add_argument("--seed", type=int, default=int(_env("seed", "1")))
+    args = ap.parse_args()
+    injection = Injection(args.latency_ms, args.jitter_ms, args.tail_rate, args.tail_ms,
+                          args.error_rate, args.error_status, args.seed)
+    uvicorn.run(build_app(injection), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import os
+import tempfile
+
+# avant tout import de l'API : variables exigées à l'import, et jamais le vrai stockage
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("MONGO_DB_NAME", "weathermellon_test")
+os.environ.setdefault("PREWARM_ENABLED", "0")
+os.environ.setdefault("HTTP2", "0")
+os.environ["POWER_STORE_DIR"] = tempfile.mkdtemp(prefix="test-power-")
+
+from datetime import datetime
+import httpx
+import pytest
+from api.power import normals, planner, store as store_module
+from api.power.store import PowerStore
+from api.upstream import client as http, resilience
+from bench import stub
+
+
+@pytest.fixture
+def power_store(tmp_path, monkeypatch):
+    """Stockage POWER vide dans un dossier temporaire, utilisé par store, planner et normals."""
+    s = PowerStore(str(tmp_path / "power"))
+    for module in (store_module, planner, normals):
+        monkeypatch.setattr(module, "store", s)
+    monkeypatch.setattr(normals, "_open", {})
+    return s
+
+
+class Upstream:
+    """
+    NASA POWER et EONET simulés avec les séries synthétiques de bench/stub.py.
+    Les requêtes reçues sont gardées dans power / eonet ; fail(request) -> True répond 503.
+    """
+
+    def __init__(self):
+        self.power: list[httpx.Request] = []
+        self.eonet: list[httpx.Request] = []
+        self.fail = None
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        q = request.url.params
+        if request.url.path == stub.POWER_PATH:
+            self.power.append(request)
+        else:
+            self.eonet.append(request)
+        if self.fail is not None and self.fail(request):
+            return httpx.Response(503, json={"detail": "injected error"})
+        if request.url.path == stub.POWER_PATH:
+            start = datetime.strptime(q["start"], "%Y%m%d").date()
+            end = datetime.strptime(q["end"], "%Y%m%d").date()
+            return httpx.Response(200, json=stub.power_body(
+                q["parameters"].split(","), float(q["latitude"]), float(q["longitude"]), start, end))
+        return httpx.Response(200, json=stub.eonet_body(q["start"], q["end"], int(q.get("limit", 1000))))
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    up = Upstream()
+    monkeypatch.setattr(http, "_new_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(up.handler)))
+    monkeypatch.setattr(http, "client", None)
+    monkeypatch.setattr(http, "_host_slots", {})
+    monkeypatch.setattr(resilience, "hosts", {})
+    return up
+
+
+@pytest.fixture
+def api(power_store, upstream, monkeypatch):
+    """TestClient de l'application complète : amonts simulés, MongoDB en mémoire (mongomock)."""
+    from fastapi.testclient import TestClient
+    from mongomock_motor import AsyncMongoMockClient
+    from api.db import session
+    from api.eonet.store import events
+    from api.main import app
+
+    monkeypatch.setattr(session, "AsyncIOMotorClient", AsyncMongoMockClient)
+    events.__init__()
+    with TestClient(app) as client:
+        yield client
@@ -0,0 +1,13 @@
+from datetime import date, timedelta
+
+
+def block(params, start: date, end: date, value=lambda p, d: float(d.toordinal() % 97)):
+    """Bloc properties.parameter de POWER : { PARAM: { "YYYYMMDD": valeur } } de start à end."""
+    out = {}
+    for p in params:
+        d, values = start, {}
+        while d <= end:
+            values[f"{d:%Y%m%d}"] = value(p, d)
+            d += timedelta(days=1)
+        out[p] = values
+    return out
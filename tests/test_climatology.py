@@ -0,0 +1,69 @@
+from datetime import date
+import random
+import statistics
+import numpy as np
+import pytest
+from api.power import climatology
+
+
+def _old_stats(values: list[float]) -> dict:
+    """Ancien calcul en Python pur, référence de Series.stats."""
+    vals = [v for v in values if v == v]
+    if not vals:
+        return {"n": 0, "mean": None, "std": None, "min": None, "max": None}
+    return {"n": len(vals), "mean": sum(vals) / len(vals),
+            "std": statistics.pstdev(vals) if len(vals) > 1 else None,
+            "min": min(vals), "max": max(vals)}
+
+
+def _series(seed: int, years: int = 12) -> climatology.Series:
+    rng = random.Random(seed)
+    n = (date(2000 + years, 1, 1) - date(2000, 1, 1)).days
+    columns = {}
+    for p, scale in (("T2M", 15.0), ("PS", 100.0), ("PRECTOTCORR", 3.0)):
+        columns[p] = np.array([np.nan if rng.random() < 0.05 else rng.gauss(scale, scale / 5) for _ in range(n)])
+    return climatology.Series(date(2000, 1, 1), columns)
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("month,day,window", [(1, 1, 3), (7, 14, 0), (12, 31, 5), (2, 29, 2), (6, 1, 30)])
+def test_stats_matches_pure_python(seed, month, day, window):
+    series = _series(seed)
+    positions = series.window(month, day, range(2001, 2011), window)
+    got = series.stats(positions)
+    for p, col in series.columns.items():
+        ref = _old_stats(col[positions].tolist())
+        assert got[p]["std"] == pytest.approx(ref.pop("std"), rel=1e-12)
+        assert {k: v for k, v in got[p].items() if k != "std"} == ref
+
+
+def test_stats_ignores_missing_days():
+    series = climatology.Series(date(2000, 1, 1), {"T2M": np.array([1.0, np.nan, 3.0]), "PS": np.array([np.nan, 2.0, np.nan])})
+    got = series.stats(np.arange(3))
+    assert got["T2M"] == {"n": 2, "mean": 2.0, "std": 1.0, "min": 1.0, "max": 3.0}
+    # un seul jour : pas d'écart-type
+    assert got["PS"] == {"n": 1, "mean": 2.0, "std": None, "min": 2.0, "max": 2.0}
+    assert series.stats(np.arange(0))["T2M"] == {"n": 0, "mean": None, "std": None, "min": None, "max": None}
+
+
+def test_window_positions():
+    series = _series(0, years=3)
+    positions = series.window(3, 1, range(2000, 2003), 1)
+    assert [series.date(p) for p in positions] == [
+        date(2000, 2, 29), date(2000, 3, 1), date(2000, 3, 2),
+        date(2001, 2, 28), date(2001, 3, 1), date(2001, 3, 2),
+        date(2002, 2, 28), date(2002, 3, 1), date(2002, 3, 2)]
+    # 29 février : années bissextiles seulement
+    assert [series.date(p) for p in series.window(2, 29, range(2000, 2003), 0)] == [date(2000, 2, 29)]
+
+
+def test_sliding_stats_matches_stats():
+    series = _series(1)
+    targets = [(1, 1), (3, 15), (12, 31)]
+    years = range(2001, 2011)
+    for (m, d), got in zip(targets, series.sliding_stats(targets, years, 7)):
+        ref = series.stats(series.window(m, d, years, 7))
+        for p in series.columns:
+            assert got[p]["n"] == ref[p]["n"]
+            assert got[p]["mean"] == pytest.approx(ref[p]["mean"], rel=1e-9)
+            assert got[p]["std"] == pytest.approx(ref[p]["std"], rel=1e-6)
@@ -0,0 +1,72 @@
+from api.power import store as store_module
+from bench import stub
+
+MONTREAL = {"lat": 45.5, "lon": -73.6}
+
+
+def _spans(upstream) -> list[tuple[str, str]]:
+    return sorted((r.url.params["start"], r.url.params["end"]) for r in upstream.power)
+
+
+def test_long_range_fetched_by_year(api, upstream):
+    r = api.get("/merra2/power/daily", params={**MONTREAL, "start": "20150601", "end": "20180315"})
+    assert r.status_code == 200
+    body = r.json()
+    assert _spans(upstream) == [("20150601", "20151231"), ("20160101", "20161231"),
+                                ("20170101", "20171231"), ("20180101", "20180315")]
+    t2m = body["parameters"]["T2M"]
+    assert len(t2m) == 1019
+    assert min(t2m) == "20150601" and max(t2m) == "20180315"
+    assert "missing_ranges" not in body["metadata"]
+    assert r.headers["etag"]
+
+    # une partie déjà stockée : seules les années manquantes sont demandées
+    upstream.power.clear()
+    api.get("/merra2/power/daily", params={**MONTREAL, "start": "20170101", "end": "20190630"})
+    assert _spans(upstream) == [("20180316", "20181231"), ("20190101", "20190630")]
+
+
+def test_failed_years_are_listed_not_fatal(api, upstream, monkeypatch):
+    monkeypatch.setattr(store_module, "RETRY_ATTEMPTS", 1)
+    upstream.fail = lambda request: request.url.params["start"].startswith("2016")
+    r = api.get("/merra2/power/daily", params={**MONTREAL, "start": "20150601", "end": "20170131"})
+    assert r.status_code == 200
+    body = r.json()
+    assert [(m["start"], m["end"]) for m in body["metadata"]["missing_ranges"]] == [("20160101", "20161231")]
+    assert "20160615" not in body["parameters"]["T2M"]
+    assert "20150615" in body["parameters"]["T2M"] and "20170115" in body["parameters"]["T2M"]
+    assert r.headers["cache-control"] == "no-store"
+
+
+def test_all_years_failed_is_502(api, upstream, monkeypatch):
+    monkeypatch.setattr(store_module, "RETRY_ATTEMPTS", 1)
+    upstream.fail = lambda request: True
+    assert api.get("/merra2/power/daily", params={**MONTREAL, "start": "20150601", "end": "20170131"}).status_code == 502
+
+
+def test_transient_error_is_retried(api, upstream, monkeypatch):
+    monkeypatch.setattr(store_module, "RETRY_ATTEMPTS", 2)
+    failures = []
+
+    def once(request):
+        if request.url.path != stub.POWER_PATH:
+            return False
+        failures.append(request)
+        return len(failures) == 1
+
+    upstream.fail = once
+    r = api.get("/merra2/power/daily", params={**MONTREAL, "start": "20150601", "end": "20150630"})
+    assert r.status_code == 200
+    assert "missing_ranges" not in r.json()["metadata"]
+    assert len(upstream.power) == 2
+
+
+def test_rainfall_lists_failed_years(api, upstream, monkeypatch):
+    monkeypatch.setattr(store_module, "RETRY_ATTEMPTS", 1)
+    upstream.fail = lambda request: request.url.params["start"].startswith("2016")
+    r = api.get("/weather/rainfall", params={**MONTREAL, "start": "20150601", "end": "20170131"})
+    assert r.status_code == 200
+    body = r.json()
+    assert [(m["start"], m["end"]) for m in body["missing_ranges"]] == [("20160101", "20161231")]
+    assert set(body["data"]) >= {"20150601", "20170131"}
+    assert r.headers["cache-control"] == "no-store"
@@ -0,0 +1,38 @@
+from datetime import date, timedelta
+
+MONTREAL = {"lat": 45.5, "lon": -73.6}
+
+
+def test_past_day_is_observed_without_prediction(api, upstream):
+    r = api.get("/dashboard", params={**MONTREAL, "date": "20200714"})
+    assert r.status_code == 200
+    body = r.json()
+    assert body["prediction"] is None
+    assert set(body["daily"]["parameters"]["T2M"]) == {"20200714"}
+    assert body["daily"]["metadata"]["start"] == body["daily"]["metadata"]["end"] == "20200714"
+    assert body["rainfall"] is not None
+    # un seul jour demandé à POWER, pas l'historique de la prédiction
+    assert len(upstream.power) == 1
+    assert upstream.power[0].url.params["start"] == upstream.power[0].url.params["end"] == "20200714"
+
+
+def test_future_day_is_predicted(api, upstream):
+    d = date.today() + timedelta(days=10)
+    r = api.get("/dashboard", params={**MONTREAL, "date": f"{d:%Y%m%d}", "base_years": 2})
+    assert r.status_code == 200
+    body = r.json()
+    assert body["prediction"]["date_predite"] == d.isoformat()
+    assert body["prediction"]["T_moyenne"] is not None
+    assert body["daily"]["parameters"] == {p: {} for p in body["daily"]["parameters"]}
+    assert min(q.url.params["start"] for q in upstream.power) < f"{d.year - 1}0101"
+
+
+def test_dashboard_matches_daily_route(api):
+    dashboard = api.get("/dashboard", params={**MONTREAL, "date": "20200714"}).json()
+    daily = api.get("/merra2/power/daily", params={**MONTREAL, "start": "20200714", "end": "20200714"}).json()
+    assert dashboard["daily"]["parameters"] == daily["parameters"]
+
+
+def test_invalid_date(api):
+    assert api.get("/dashboard", params={**MONTREAL, "date": "20201340"}).status_code == 400
+    assert api.get("/dashboard", params={**MONTREAL, "date": "2020-07-14"}).status_code == 422
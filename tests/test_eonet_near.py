@@ -0,0 +1,76 @@
+from datetime import timedelta
+import time
+from api.eonet.index import GridIndex, distance_km
+from api.eonet.store import Headline, events, parse, utc_today
+from bench import stub
+
+
+def _refreshed(timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while events.refreshed_at is None:
+        assert time.monotonic() < deadline, "EONET store not refreshed"
+        time.sleep(0.01)
+
+
+def _records(day: str) -> list[Headline]:
+    return parse(stub.eonet_body(day, day, 1000)["events"]).get(day, [])
+
+
+def _brute(lat: float, lon: float, radius_km: float, days: int) -> list[tuple[str, float]]:
+    """Référence sans index : distance du jour le plus récent où l'événement est dans le rayon."""
+    latest = {}
+    for k in range(days):
+        for r in _records((utc_today() - timedelta(days=k)).isoformat()):
+            if r.bbox is not None and (d := distance_km(lat, lon, r.bbox)) <= radius_km:
+                latest.setdefault(r.id, d)
+    return sorted(((i, round(d, 1)) for i, d in latest.items()), key=lambda x: x[1])
+
+
+def _record(i: int, bbox) -> Headline:
+    return Headline(f"EV{i}", "2024-05-01", "Wildfires", "t", bbox[0], bbox[1], "t", bbox)
+
+
+def test_grid_index_matches_brute_force():
+    records = [r for k in range(30) for r in _records((utc_today() - timedelta(days=k)).isoformat())]
+    assert records
+    idx = GridIndex(records)
+    for lat, lon, radius in [(43.6, -79.4, 500), (-33.9, 151.2, 2000), (0, 179.5, 800), (88, 0, 300)]:
+        want = sorted((distance_km(lat, lon, r.bbox), r.id) for r in records
+                      if r.bbox is not None and distance_km(lat, lon, r.bbox) <= radius)
+        assert sorted((d, r.id) for d, r in idx.near(lat, lon, radius)) == want
+
+
+def test_grid_index_across_antimeridian_and_inside_box():
+    idx = GridIndex([_record(0, (10.0, 179.5, 10.0, 179.5)), _record(1, (-5.0, 20.0, 5.0, 30.0))])
+    assert [r.id for _, r in idx.near(10.0, -179.5, 200)] == ["EV0"]
+    [(d, r)] = idx.near(0.0, 25.0, 1)
+    assert (d, r.id) == (0.0, "EV1")
+
+
+def test_near_matches_brute_force(api):
+    _refreshed()
+    today = _records(utc_today().isoformat()) or _records((utc_today() - timedelta(days=1)).isoformat())
+    lat, lon = today[0].lat, today[0].lon
+    r = api.get("/disasters/near", params={"lat": lat, "lon": lon, "radius_km": 1500, "days": 3})
+    assert r.status_code == 200
+    found = r.json()["events"]
+    assert found[0]["distance_km"] == 0.0
+    assert [(e["id"], e["distance_km"]) for e in found] == _brute(lat, lon, 1500, 3)
+
+
+def test_near_batch_follows_input_order(api):
+    _refreshed()
+    points = [{"lat": 43.6, "lon": -79.4, "name": "Toronto"}, {"lat": -33.9, "lon": 151.2}, {"lat": 0, "lon": 179.5}]
+    r = api.post("/disasters/near/batch", json={"points": points, "radius_km": 3000, "days": 5, "limit": 10})
+    assert r.status_code == 200
+    results = r.json()["results"]
+    assert [(x["lat"], x["lon"], x["name"]) for x in results] == [(p["lat"], p["lon"], p.get("name")) for p in points]
+    for p, x in zip(points, results):
+        single = api.get("/disasters/near", params={"lat": p["lat"], "lon": p["lon"], "radius_km": 3000, "days": 5, "limit": 10})
+        assert x["events"] == single.json()["events"]
+
+
+def test_near_validation(api):
+    assert api.get("/disasters/near", params={"lat": 91, "lon": 0}).status_code == 422
+    assert api.get("/disasters/near", params={"lat": 0, "lon": 0, "radius_km": 0}).status_code == 422
+    assert api.post("/disasters/near/batch", json={"points": []}).status_code == 422
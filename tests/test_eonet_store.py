@@ -0,0 +1,89 @@
+from datetime import timedelta
+import asyncio
+import time
+from api.eonet import store as eonet_store
+from api.eonet.store import EventStore, events, parse, utc_today
+from bench import stub
+
+
+def _refreshed(timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while events.refreshed_at is None:
+        assert time.monotonic() < deadline, "EONET store not refreshed"
+        time.sleep(0.01)
+
+
+def _expected(day: str, limit: int = 50) -> list[str]:
+    return [r.text for r in parse(stub.eonet_body(day, day, 1000)["events"]).get(day, [])][:limit]
+
+
+def test_parse_formats_headlines():
+    days = parse([{
+        "id": "EONET_1", "title": "Wildfire 1234567 Near Town", "categories": [{"title": "Wildfires"}],
+        "geometry": [
+            {"date": "2024-05-01T00:00:00Z", "type": "Point", "coordinates": [-79.4, 43.6]},
+            {"date": "2024-05-01T12:00:00Z", "type": "Point", "coordinates": [-79.5, 43.7]},
+            {"date": "2024-05-02T00:00:00Z", "type": "Polygon", "coordinates": [[[0, 0], [2, 0], [2, 2], [0, 2]]]},
+        ],
+    }])
+    assert list(days) == ["2024-05-01", "2024-05-02"]
+    [first] = days["2024-05-01"]
+    assert first.text == "Wildfires — 'Wildfire Near Town' — 43.6°N, 79.4°W — 2024-05-01 (UTC)"
+    assert (first.lat, first.lon) == (43.6, -79.4)
+    [second] = days["2024-05-02"]
+    assert (second.lat, second.lon) == (1.0, 1.0)
+    assert second.bbox == (0, 0, 2, 2)
+
+
+def test_window_days_served_without_upstream_call(api, upstream):
+    _refreshed()
+    calls = len(upstream.eonet)
+    for k in range(eonet_store.WINDOW_DAYS):
+        day = (utc_today() - timedelta(days=k)).isoformat()
+        r = api.get("/disasters/headlines", params={"date": day, "limit": 5})
+        assert r.status_code == 200
+        assert r.json()["headlines"] == (_expected(day, 5) or [f"No notable activity detected for {day} (UTC)"])
+    assert len(upstream.eonet) == calls
+
+
+def test_older_day_fetched_once_then_kept(api, upstream):
+    _refreshed()
+    day = (utc_today() - timedelta(days=30)).isoformat()
+    calls = len(upstream.eonet)
+    first = api.get("/disasters/headlines", params={"date": day})
+    assert first.json()["headlines"] == (_expected(day) or [f"No notable activity detected for {day} (UTC)"])
+    assert len(upstream.eonet) == calls + 1
+    assert upstream.eonet[-1].url.params["start"] == upstream.eonet[-1].url.params["end"] == day
+    assert api.get("/disasters/headlines", params={"date": day}).json() == first.json()
+    assert len(upstream.eonet) == calls + 1
+    assert day in events.backfilled
+
+
+def test_headlines_errors(api, upstream):
+    _refreshed()
+    assert api.get("/disasters/headlines", params={"date": "2024-13-01"}).status_code == 400
+    upstream.fail = lambda request: True
+    assert api.get("/disasters/headlines", params={"date": "2020-01-01"}).status_code == 502
+
+
+def test_refresh_loop_survives_errors(monkeypatch):
+    store = EventStore()
+    calls = []
+
+    async def refresh():
+        calls.append(1)
+        if len(calls) == 1:
+            raise KeyError("geometry")
+
+    monkeypatch.setattr(store, "refresh", refresh)
+    monkeypatch.setattr(eonet_store, "REFRESH_SECONDS", 0)
+
+    async def run():
+        store.start()
+        while len(calls) < 3:
+            await asyncio.sleep(0)
+        await store.stop()
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+    assert store.refresh_errors == 1
+    assert store.stats()["refresh_errors"] == 1
@@ -0,0 +1,91 @@
+from datetime import date
+import asyncio
+import json
+from api.eonet.store import RESYNC, Change, EventStore, Headline
+from api.routes import gibs
+
+
+def _headline(i: int, day: str, title: str = "Fire") -> Headline:
+    return Headline(f"EV{i}", day, "Wildfires", title, 1.0, 2.0, title, (1.0, 2.0, 1.0, 2.0))
+
+
+def _events(chunk: bytes) -> list[tuple[str, dict]]:
+    out = []
+    for block in chunk.decode().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line and not line.startswith(":"))
+        if "event" in lines:
+            out.append((lines["event"], json.loads(lines["data"])))
+    return out
+
+
+def _stream(monkeypatch, today: list[date], keepalive: float = 0.01):
+    store = EventStore()
+    days = {"2024-05-01": [_headline(1, "2024-05-01")], "2024-05-02": [_headline(2, "2024-05-02")]}
+
+    async def get(day):
+        return days.get(day, [])
+
+    monkeypatch.setattr(store, "get", get)
+    monkeypatch.setattr(gibs, "events", store)
+    monkeypatch.setattr(gibs, "utc_today", lambda: today[0])
+    monkeypatch.setattr(gibs, "KEEPALIVE_SECONDS", keepalive)
+    return store
+
+
+def test_stream_snapshot_then_diffs_for_the_day(monkeypatch):
+    today = [date(2024, 5, 1)]
+    store = _stream(monkeypatch, today, keepalive=5)
+
+    async def run():
+        response = await gibs.disasters_stream(date=None, limit=50)
+        it = response.body_iterator
+        [(kind, snap)] = _events(await anext(it))
+        assert kind == "snapshot" and [e["id"] for e in snap["events"]] == ["EV1"]
+        store._publish([Change("2024-04-30", [_headline(9, "2024-04-30")], []),
+                        Change("2024-05-01", [_headline(1, "2024-05-01", "Fire, larger")], ["EV0"])])
+        [(kind, data)] = _events(await anext(it))
+        assert kind == "diff" and data["date"] == "2024-05-01" and data["removed"] == ["EV0"]
+        store._publish(RESYNC)
+        assert _events(await anext(it))[0][0] == "snapshot"
+        await it.aclose()
+        assert not store.subscribers
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+
+
+def test_stream_follows_day_change_without_refresh(monkeypatch):
+    today = [date(2024, 5, 1)]
+    _stream(monkeypatch, today)
+
+    async def run():
+        response = await gibs.disasters_stream(date=None, limit=50)
+        it = response.body_iterator
+        await anext(it)
+        assert await anext(it) == b": keepalive\n\n"
+        # aucun rechargement EONET : seul le réveil du keepalive voit le nouveau jour
+        today[0] = date(2024, 5, 2)
+        [(kind, snap)] = _events(await anext(it))
+        assert kind == "snapshot" and snap["date"] == "2024-05-02"
+        assert [e["id"] for e in snap["events"]] == ["EV2"]
+        await it.aclose()
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+
+
+def test_stream_fixed_date_ignores_day_change(monkeypatch):
+    today = [date(2024, 5, 1)]
+    _stream(monkeypatch, today)
+
+    async def run():
+        response = await gibs.disasters_stream(date="2024-05-01", limit=50)
+        it = response.body_iterator
+        await anext(it)
+        today[0] = date(2024, 5, 2)
+        assert await anext(it) == b": keepalive\n\n"
+        await it.aclose()
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+
+
+def test_stream_rejects_bad_date(api):
+    assert api.get("/disasters/stream", params={"date": "05/01/2024"}).status_code == 400
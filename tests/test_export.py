@@ -0,0 +1,94 @@
+from datetime import date
+import importlib.util
+import json
+import msgpack
+import numpy as np
+import pyarrow as pa
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+from api.power import export
+
+app = FastAPI()
+START = date(2000, 1, 1)
+COLUMNS = {"T2M": np.array([1.5, np.nan, 3.0])}
+
+
+@app.get("/series")
+async def series(request: Request):
+    fmt = export.negotiate(request)
+    payload = export.columns_json(START, COLUMNS) if fmt != export.JSON else {"T2M": [1.5, None, 3.0]}
+    return export.respond(fmt, payload, export.series_table(START, COLUMNS))
+
+
+client = TestClient(app)
+
+
+def _request(accept: str | None) -> Request:
+    headers = [(b"accept", accept.encode())] if accept is not None else []
+    return Request({"type": "http", "headers": headers})
+
+
+@pytest.mark.parametrize("accept,fmt", [
+    (None, export.JSON),
+    ("*/*", export.JSON),
+    ("text/html", export.JSON),
+    ("application/msgpack", export.MSGPACK),
+    ("application/x-msgpack", export.MSGPACK),
+    (f"{export.ARROW};q=0.5, {export.COLUMNAR}", export.COLUMNAR),
+    (f"{export.COLUMNAR};q=0, {export.ARROW}", export.ARROW),
+])
+def test_negotiate(accept, fmt):
+    assert export.negotiate(_request(accept)) == fmt
+
+
+@pytest.fixture
+def without(monkeypatch):
+    """Simule une installation sans les modules donnés."""
+    def hide(*modules):
+        find_spec = importlib.util.find_spec
+        monkeypatch.setattr(importlib.util, "find_spec", lambda name, *a: None if name in modules else find_spec(name, *a))
+    return hide
+
+
+def test_negotiate_406_without_optional_module(without):
+    without("msgpack", "pyarrow")
+    with pytest.raises(HTTPException) as e:
+        export.negotiate(_request(f"application/msgpack, {export.ARROW}"))
+    assert e.value.status_code == 406
+    # un autre format accepté reste possible
+    assert export.negotiate(_request("application/msgpack, application/json;q=0.1")) == export.JSON
+
+
+def test_route_406_and_fallback_without_msgpack(without):
+    without("msgpack")
+    assert client.get("/series", headers={"Accept": "application/msgpack"}).status_code == 406
+    r = client.get("/series", headers={"Accept": f"application/msgpack, {export.ARROW};q=0.5"})
+    assert r.status_code == 200
+    assert r.headers["content-type"] == export.ARROW
+
+
+def test_responses_in_each_format():
+    assert client.get("/series").json() == {"T2M": [1.5, None, 3.0]}
+
+    r = client.get("/series", headers={"Accept": export.COLUMNAR})
+    assert r.headers["content-type"] == export.COLUMNAR
+    assert json.loads(r.content) == export.columns_json(START, COLUMNS)
+
+    r = client.get("/series", headers={"Accept": "application/msgpack"})
+    assert msgpack.unpackb(r.content) == export.columns_json(START, COLUMNS)
+
+    r = client.get("/series", headers={"Accept": export.ARROW})
+    table = pa.ipc.open_stream(r.content).read_all()
+    assert table.column("T2M").to_pylist() == [1.5, None, 3.0]
+
+
+def test_columnar_passes_single_objects_through(api):
+    params = {"lat": 45.5, "lon": -73.6, "day": 14, "month": 7, "base_years": 2, "future_year": 2030}
+    plain = api.get("/algo/daily/predict", params=params)
+    columnar = api.get("/algo/daily/predict", params=params, headers={"Accept": export.COLUMNAR})
+    assert columnar.headers["content-type"] == export.COLUMNAR
+    # la seconde réponse peut venir du cube des normales (sommes préfixées)
+    assert set(columnar.json()) == set(plain.json())
+    for k, v in plain.json().items():
+        assert columnar.json()[k] == (pytest.approx(v, rel=1e-6) if isinstance(v, float) else v)
@@ -0,0 +1,44 @@
+from datetime import date, timedelta
+from api.power import grid
+
+
+def test_snap_to_cell_center():
+    assert grid.snap(45.5, -73.6) == (45.5, -73.75)
+    assert grid.snap(45.26, -73.44) == (45.5, -73.75)
+    assert grid.snap(-33.87, 151.21) == (-34.0, 151.25)
+
+
+def test_snap_same_cell_for_nearby_points():
+    assert grid.snap(48.85, 2.35) == grid.snap(48.9, 2.2) == grid.snap(48.76, 2.5)
+
+
+def test_snap_wraps_longitude_and_clamps_latitude():
+    assert grid.snap(0, 180) == grid.snap(0, -180) == (0.0, -180.0)
+    assert grid.snap(0, 179.9) == (0.0, -180.0)
+    assert grid.snap(0, 360 + 2.35) == grid.snap(0, 2.35)
+    assert grid.snap(95, 0) == (90.0, 0.0)
+    assert grid.snap(-95, 0) == (-90.0, 0.0)
+
+
+def test_cell_id_roundtrip():
+    cell = grid.snap(-33.87, 151.21)
+    assert grid.cell_id(cell) == "-034.000_+0151.250"
+    assert grid.parse_cell_id(grid.cell_id(cell)) == cell
+
+
+def test_normalize_params():
+    assert grid.normalize_params("t2m, PS,T2M") == ("PS", "T2M")
+    assert grid.normalize_params(["PS", "t2m", " "]) == ("PS", "T2M")
+
+
+def test_canonical_key_shared_by_equivalent_queries():
+    a = grid.canonical(45.5, -73.6, "T2M,PS", date(2000, 1, 1), date(2000, 12, 31))
+    b = grid.canonical(45.3, -73.5, ["ps", "t2m"], date(2000, 1, 1), date(2000, 12, 31))
+    assert a == b
+    assert a.key == b.key == "power:daily:+045.500_-0073.750:PS,T2M:20000101-20001231"
+
+
+def test_canonical_clamps_dates():
+    q = grid.canonical(0, 0, "T2M", date(1970, 1, 1), date.today() + timedelta(days=30))
+    assert q.start == grid.EPOCH
+    assert q.end == date.today()
@@ -0,0 +1,58 @@
+import asyncio
+import threading
+import pytest
+from api.routes.auth import utils
+
+
+@pytest.fixture
+def hash_stats(monkeypatch):
+    stats = {k: 0.0 if isinstance(v, float) else 0 for k, v in utils._hash_stats.items()}
+    monkeypatch.setattr(utils, "_hash_stats", stats)
+    return stats
+
+
+def test_hash_and_verify_off_the_loop(hash_stats):
+    async def run():
+        loop_thread = threading.get_ident()
+        hashed = await utils.hash_password("pw")
+        ran_in = await utils._in_hash_pool(threading.get_ident)
+        return hashed, await utils.verify_password("pw", hashed), await utils.verify_password("no", hashed), \
+            ran_in != loop_thread
+
+    hashed, ok, wrong, elsewhere = asyncio.run(run())
+    assert hashed.startswith("$2") and ok and not wrong and elsewhere
+    assert hash_stats["calls"] == 4 and hash_stats["pending"] == 0
+
+
+def test_overflow_rejected_with_503(hash_stats, monkeypatch):
+    monkeypatch.setattr(utils, "HASH_MAX_PENDING", 1)
+    release = threading.Event()
+
+    async def run():
+        first = asyncio.ensure_future(utils._in_hash_pool(release.wait))
+        while not hash_stats["pending"]:
+            await asyncio.sleep(0)
+        with pytest.raises(utils.HTTPException) as e:
+            await utils._in_hash_pool(lambda: None)
+        release.set()
+        await first
+        return e.value
+
+    error = asyncio.run(asyncio.wait_for(run(), 5))
+    assert error.status_code == 503 and error.headers == {"Retry-After": "1"}
+    assert hash_stats["rejected"] == 1 and hash_stats["pending"] == 0
+    assert utils.hash_stats()["max_pending"] == 1
+
+
+def test_register_and_login_busy(api, hash_stats, monkeypatch):
+    assert api.post("/auth/register", json={"username": "bob", "email": "bob@example.com", "password": "pw"}).status_code == 200
+    monkeypatch.setattr(utils, "HASH_MAX_PENDING", 0)
+    for path, body in [("/auth/register", {"username": "eve", "email": "eve@example.com", "password": "pw"}),
+                       ("/auth/login", {"username": "bob", "password": "pw"})]:
+        r = api.post(path, json=body)
+        assert r.status_code == 503
+        assert r.headers["retry-after"] == "1"
+    assert hash_stats["rejected"] == 2
+    monkeypatch.setattr(utils, "HASH_MAX_PENDING", 64)
+    assert api.post("/auth/login", json={"username": "bob", "password": "pw"}).status_code == 200
+    assert api.post("/auth/login", json={"username": "bob", "password": "no"}).status_code == 401
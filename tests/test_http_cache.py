@@ -0,0 +1,150 @@
+from datetime import date, datetime, timedelta
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from api import http_cache
+
+app = FastAPI()
+app.add_middleware(http_cache.HttpCacheMiddleware)
+calls = []
+
+
+@app.get("/merra2/power/daily")
+async def daily(request: Request, end: str, partial: bool = False):
+    calls.append(end)
+    if partial:
+        http_cache.no_store(request)
+    return {"end": end, "partial": partial}
+
+
+@app.get("/disasters/headlines")
+async def headlines(request: Request, date: str, partial: bool = False):
+    calls.append(date)
+    if partial:
+        http_cache.no_store(request)
+    return {"date": date}
+
+
+client = TestClient(app)
+OLD = "20000131"
+
+
+def test_settled_request_gets_etag_then_304_without_calling_route():
+    calls.clear()
+    r = client.get("/merra2/power/daily", params={"end": OLD})
+    assert r.status_code == 200
+    assert r.headers["cache-control"] == f"public, max-age={http_cache.MAX_AGE}"
+    etag = r.headers["etag"]
+
+    r2 = client.get("/merra2/power/daily", params={"end": OLD}, headers={"If-None-Match": etag})
+    assert r2.status_code == 304
+    assert r2.headers["etag"] == etag
+    assert calls == [OLD]
+
+
+def test_etag_depends_on_query_and_accept():
+    etag = client.get("/merra2/power/daily", params={"end": OLD}).headers["etag"]
+    assert client.get("/merra2/power/daily", params={"end": "20000201"}).headers["etag"] != etag
+    assert client.get("/merra2/power/daily", params={"end": OLD}, headers={"Accept": "text/csv"}).headers["etag"] != etag
+    r = client.get("/merra2/power/daily", params={"end": "20000201"}, headers={"If-None-Match": etag})
+    assert r.status_code == 200
+
+
+def test_settled_partial_response_is_not_stored():
+    r = client.get("/merra2/power/daily", params={"end": OLD, "partial": True})
+    assert r.status_code == 200
+    assert r.headers["cache-control"] == "no-store"
+    assert "etag" not in r.headers
+
+
+def test_recent_request_gets_body_etag_and_short_max_age():
+    day = date.today().isoformat()
+    calls.clear()
+    r = client.get("/disasters/headlines", params={"date": day})
+    assert r.status_code == 200
+    assert r.headers["cache-control"] == f"public, max-age={http_cache.SHORT_MAX_AGE}"
+    assert r.json() == {"date": day}
+
+    # le corps est recalculé, mais pas renvoyé s'il n'a pas changé
+    r2 = client.get("/disasters/headlines", params={"date": day}, headers={"If-None-Match": r.headers["etag"]})
+    assert r2.status_code == 304
+    assert calls == [day, day]
+
+
+def test_recent_partial_response_is_not_stored():
+    day = (date.today() - timedelta(days=1)).isoformat()
+    r = client.get("/disasters/headlines", params={"date": day, "partial": True})
+    assert r.status_code == 200
+    assert r.headers["cache-control"] == "no-store"
+    assert "etag" not in r.headers
+
+
+def test_uncacheable_requests_pass_through():
+    assert "etag" not in client.get("/disasters/headlines", params={"date": "not-a-date"}).headers
+    r = client.post("/merra2/power/daily", params={"end": OLD})
+    assert r.status_code == 405
+    assert "etag" not in r.headers
+
+
+@app.get("/dashboard")
+async def dashboard(date: str):
+    day = datetime.strptime(date, "%Y%m%d").date()
+    return {"date": date, "observed": day <= http_cache.date.today()}
+
+
+def _today(day: date):
+    class Today(date):
+        @classmethod
+        def today(cls):
+            return day
+    return Today
+
+
+def _max_age(response) -> int:
+    return int(response.headers["cache-control"].rsplit("max-age=", 1)[1])
+
+
+def test_dashboard_prediction_expires_before_the_day(monkeypatch):
+    d = date.today() + timedelta(days=5)
+    r = client.get("/dashboard", params={"date": f"{d:%Y%m%d}"})
+    assert r.json()["observed"] is False
+    assert 0 < _max_age(r) <= (datetime.combine(d, datetime.min.time()) - datetime.now()).total_seconds()
+    etag = r.headers["etag"]
+    assert client.get("/dashboard", params={"date": f"{d:%Y%m%d}"}, headers={"If-None-Match": etag}).status_code == 304
+
+    # le jour venu, puis une fois ce jour figé : réponse observée, l'ancien ETag ne vaut plus
+    for later in (d, d + timedelta(days=1), d + timedelta(days=90)):
+        monkeypatch.setattr(http_cache, "date", _today(later))
+        r2 = client.get("/dashboard", params={"date": f"{d:%Y%m%d}"}, headers={"If-None-Match": etag})
+        assert r2.status_code == 200
+        assert r2.json()["observed"] is True
+        assert r2.headers["etag"] != etag
+
+
+def test_dashboard_past_day_keeps_long_max_age():
+    r = client.get("/dashboard", params={"date": "20000131"})
+    assert r.json()["observed"] is True
+    assert r.headers["etag"]
+    assert r.headers["cache-control"].startswith("public")
+
+
+def test_etags_are_weak_and_compared_weakly():
+    r = client.get("/merra2/power/daily", params={"end": OLD})
+    etag = r.headers["etag"]
+    assert etag.startswith('W/"')
+    strong = etag.removeprefix("W/")
+    assert client.get("/merra2/power/daily", params={"end": OLD}, headers={"If-None-Match": strong}).status_code == 304
+    assert client.get("/merra2/power/daily", params={"end": OLD},
+                      headers={"If-None-Match": f'"other", {etag}'}).status_code == 304
+    assert client.get("/disasters/headlines", params={"date": date.today().isoformat()}).headers["etag"].startswith('W/"')
+
+
+def test_compressed_and_identity_bodies_share_the_weak_etag(api):
+    params = {"lat": 45.5, "lon": -73.6, "start": "20150101", "end": "20150331"}
+    gzipped = api.get("/merra2/power/daily", params=params, headers={"Accept-Encoding": "gzip"})
+    identity = api.get("/merra2/power/daily", params=params, headers={"Accept-Encoding": "identity"})
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in identity.headers
+    assert gzipped.headers["etag"] == identity.headers["etag"]
+    assert gzipped.headers["etag"].startswith('W/"')
+    r = api.get("/merra2/power/daily", params=params, headers={"If-None-Match": identity.headers["etag"]})
+    assert r.status_code == 304
@@ -0,0 +1,69 @@
+import re
+from api import metrics
+from api.power import client
+
+MONTREAL = {"lat": 45.5, "lon": -73.6}
+
+
+def _sample(text: str, name: str, **labels) -> float | None:
+    """Valeur de la ligne name{...} qui porte au moins ces étiquettes."""
+    for line in text.splitlines():
+        m = re.fullmatch(rf"{name}(\{{.*\}})? (\S+)", line)
+        if m and all(f'{k}="{v}"' in (m.group(1) or "") for k, v in labels.items()):
+            return float(m.group(2))
+    return None
+
+
+def test_histogram_renders_cumulative_buckets(monkeypatch):
+    monkeypatch.setattr(metrics, "_metrics", [])
+    h = metrics.Histogram("test_seconds", "aide", ("route",), buckets=(0.1, 1))
+    for v in (0.05, 0.5, 5):
+        h.observe(v, route='/a"b')
+    lines = h.render()
+    assert lines[:2] == ["# HELP test_seconds aide", "# TYPE test_seconds histogram"]
+    assert lines[2:] == [
+        'test_seconds_bucket{route="/a\\"b",le="0.1"} 1',
+        'test_seconds_bucket{route="/a\\"b",le="1"} 2',
+        'test_seconds_bucket{route="/a\\"b",le="+Inf"} 3',
+        'test_seconds_sum{route="/a\\"b"} 5.55',
+        'test_seconds_count{route="/a\\"b"} 3',
+    ]
+
+
+def test_counter_and_collector(monkeypatch):
+    monkeypatch.setattr(metrics, "_metrics", [])
+    monkeypatch.setattr(metrics, "_collectors", [])
+    c = metrics.Counter("test_total", "aide", ("cache",))
+    c.inc(cache="users")
+    c.inc(2, cache="users")
+    metrics.collector(lambda: [("test_size", "gauge", "taille", [({"cache": "users"}, 4), ({"cache": "x"}, None)])])
+    text = metrics.render()
+    assert _sample(text, "test_total", cache="users") == 3
+    assert _sample(text, "test_size", cache="users") == 4
+    assert 'test_size{cache="x"}' not in text
+
+
+def test_metrics_after_requests(api):
+    # compteurs du processus : on compare avant et après
+    labels = {"route": "/dashboard", "method": "GET", "status": 200}
+    before = _sample(api.get("/metrics").text, "http_request_duration_seconds_count", **labels) or 0
+    assert api.get("/dashboard", params={**MONTREAL, "date": "20200714"}).status_code == 200
+    text = api.get("/metrics").text
+    assert _sample(text, "http_request_duration_seconds_count", **labels) == before + 1
+    assert _sample(text, "upstream_request_duration_seconds_count", host=client.POWER_HOST, status=200) >= 1
+    assert _sample(text, "upstream_response_bytes_total", host=client.POWER_HOST) > 0
+    assert _sample(text, "upstream_json_parse_seconds_count", host=client.POWER_HOST) >= 1
+    assert _sample(text, "upstream_circuit_open", host=client.POWER_HOST) == 0
+    assert _sample(text, "password_hash_pending") == 0
+    assert "# TYPE event_loop_lag_seconds histogram" in text
+
+
+def test_server_timing_splits_upstream_time(api):
+    r = api.get("/dashboard", params={**MONTREAL, "date": "20200715"})
+    parts = dict(p.split(";dur=") for p in r.headers["server-timing"].split(", "))
+    assert list(parts) == ["upstream", "compute", "serialize", "total"]
+    upstream, compute, serialize, total = (float(v) for v in parts.values())
+    assert upstream > 0
+    assert upstream + compute + serialize <= total + 0.3
+    cached = api.get("/dashboard", params={**MONTREAL, "date": "20200715"})
+    assert cached.headers["server-timing"].startswith("upstream;dur=0.0,")
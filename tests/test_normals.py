@@ -0,0 +1,109 @@
+from datetime import date
+import pytest
+from api.power import climatology, normals
+from api.power.grid import EPOCH
+from tests.power_data import block
+
+CELL = (45.5, -73.75)
+PARAMS = ["PS", "T2M"]
+LAST = date(2020, 12, 31)
+
+
+def _value(p, d):
+    k = d.toordinal()
+    if k % 17 == 0:
+        return None
+    return (k * 7919 % 1000) / 10 + (100 if p == "PS" else 0)
+
+
+@pytest.fixture
+def cube(power_store):
+    power_store.write(CELL, block(PARAMS, EPOCH, LAST, _value), {}, EPOCH, LAST)
+    assert normals.build(CELL)["params"] == PARAMS
+    return power_store
+
+
+def _engine(power_store, month, day, years, window):
+    series = climatology.Series(EPOCH, power_store.read(CELL, PARAMS, EPOCH, LAST))
+    return series.stats(series.window(month, day, years, window), PARAMS)
+
+
+def _assert_same(got, ref):
+    assert got is not None
+    for p in PARAMS:
+        assert got[p]["n"] == ref[p]["n"]
+        assert got[p]["mean"] == pytest.approx(ref[p]["mean"], rel=1e-9)
+        assert got[p]["std"] == pytest.approx(ref[p]["std"], rel=1e-6)
+    assert got["wind"] == {"mean": None}
+
+
+@pytest.mark.parametrize("month,day,years,window", [
+    (7, 14, range(1991, 2021), 3),
+    (3, 1, range(2000, 2010), 0),
+    (10, 5, range(1985, 1986), 30),
+    (1, 1, range(1981, 1990), 5),     # fenêtre avant 1981 : rien à compter
+    (12, 31, range(2000, 2010), 3),   # fenêtre sur janvier de l'année suivante
+    (1, 2, range(2001, 2011), 10),    # fenêtre sur décembre de l'année précédente
+])
+def test_lookup_matches_engine(cube, month, day, years, window):
+    _assert_same(normals.lookup(CELL, PARAMS, month, day, years, window), _engine(cube, month, day, years, window))
+
+
+def test_lookup_subset_of_params(cube):
+    got = normals.lookup(CELL, ["T2M"], 5, 5, range(1991, 2021), 3)
+    assert set(got) == {"T2M", "wind"}
+    assert got["T2M"]["n"] == _engine(cube, 5, 5, range(1991, 2021), 3)["T2M"]["n"]
+    assert normals.lookup(CELL, ["WS2M"], 5, 5, range(1991, 2021), 3) is None
+
+
+def test_lookup_falls_back_on_feb29(cube):
+    assert normals.lookup(CELL, PARAMS, 2, 29, range(1991, 2021), 0) is None
+    # fenêtre qui contient le 29 février
+    assert normals.lookup(CELL, PARAMS, 2, 27, range(1991, 2021), 3) is None
+    assert normals.lookup(CELL, PARAMS, 3, 3, range(1991, 2021), 3) is None
+    assert normals.lookup(CELL, PARAMS, 2, 20, range(1991, 2021), 3) is not None
+
+
+def test_lookup_falls_back_on_dec31_past_last_year(cube):
+    # le début de janvier 2021 n'est pas dans le cube
+    assert normals.lookup(CELL, PARAMS, 12, 31, range(2010, 2021), 3) is None
+    assert normals.lookup(CELL, PARAMS, 12, 31, range(2010, 2021), 0) is not None
+    assert normals.lookup(CELL, PARAMS, 12, 31, range(2010, 2020), 3) is not None
+
+
+def test_lookup_falls_back_outside_cube(cube):
+    assert normals.lookup(CELL, PARAMS, 6, 1, range(2015, 2025), 3) is None
+    assert normals.lookup(CELL, PARAMS, 6, 1, range(2000, 2000), 3) is None
+    assert normals.lookup(CELL, PARAMS, 6, 1, range(2000, 2010), normals.MAX_WINDOW_DAYS + 1) is None
+
+
+def test_cube_goes_stale_on_new_writes(cube):
+    assert not normals.stale(CELL)
+    cube.write(CELL, block(PARAMS, date(2021, 1, 1), date(2021, 1, 31), _value), {}, date(2021, 1, 1), date(2021, 1, 31))
+    assert normals.stale(CELL)
+    assert normals.lookup(CELL, PARAMS, 7, 14, range(1991, 2021), 3) is None
+    normals.build(CELL)
+    assert not normals.stale(CELL)
+
+
+def test_no_cube(power_store):
+    assert normals.stale(CELL)
+    assert normals.lookup(CELL, PARAMS, 7, 14, range(1991, 2021), 3) is None
+    assert normals.build(CELL) is None
+
+
+def test_predict_route_served_from_cube(api, upstream, power_store):
+    params = {"lat": 45.5, "lon": -73.6, "day": 14, "month": 7, "base_years": 3, "future_year": 2030}
+    first = api.get("/algo/daily/predict", params=params)
+    assert first.status_code == 200
+    calls = len(upstream.power)
+    assert calls >= 1
+
+    normals.build(CELL)
+    # fenêtre incluse dans les jours déjà stockés : le cube répond seul
+    second = api.get("/algo/daily/predict", params={**params, "day": 15, "window_days": 2})
+    assert second.status_code == 200
+    assert len(upstream.power) == calls
+    again = api.get("/algo/daily/predict", params=params).json()
+    assert again["T_moyenne"] == pytest.approx(first.json()["T_moyenne"], rel=1e-9)
+    assert again["T2M_std"] == pytest.approx(first.json()["T2M_std"], rel=1e-6)
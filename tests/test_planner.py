@@ -0,0 +1,82 @@
+from datetime import date, timedelta
+from api.power import planner, store as store_module
+from tests.power_data import block
+
+CELL = (45.5, -73.75)
+
+
+def test_merge_dates_within_gap():
+    dates = [date(2000, 1, 10), date(2000, 1, 1), date(2000, 1, 20), date(2000, 1, 1)]
+    assert planner.merge_dates(dates, max_gap=10) == [(date(2000, 1, 1), date(2000, 1, 20))]
+
+
+def test_merge_dates_splits_on_large_gaps():
+    dates = [date(2000, 1, 1), date(2000, 1, 5), date(2000, 3, 1), date(2005, 7, 14)]
+    assert planner.merge_dates(dates, max_gap=30) == [
+        (date(2000, 1, 1), date(2000, 1, 5)), (date(2000, 3, 1), date(2000, 3, 1)), (date(2005, 7, 14), date(2005, 7, 14))]
+    assert planner.merge_dates([]) == []
+
+
+def test_split_span():
+    start, end = date(2000, 1, 1), date(2000, 1, 25)
+    chunks = planner.split_span(start, end, max_span=10)
+    assert chunks == [(date(2000, 1, 1), date(2000, 1, 10)), (date(2000, 1, 11), date(2000, 1, 20)),
+                      (date(2000, 1, 21), date(2000, 1, 25))]
+    assert planner.split_span(start, start, max_span=10) == [(start, start)]
+    assert planner.split_span(end, start) == []
+
+
+def test_plan_skips_stored_days(power_store):
+    power_store.write(CELL, block(["T2M"], date(2000, 1, 1), date(2000, 12, 31)), {}, date(2000, 1, 1), date(2000, 12, 31))
+    dates = [date(2000, 1, 5), date(2000, 6, 1), date(2001, 2, 1), date(2001, 2, 3), date(2010, 7, 1)]
+    assert planner.plan(CELL, ["T2M"], dates) == [
+        (date(2001, 1, 1), date(2001, 2, 3)), (date(2010, 7, 1), date(2010, 7, 1))]
+
+
+def test_plan_splits_long_ranges(power_store):
+    start = date(1990, 1, 1)
+    dates = [start + timedelta(days=i) for i in range(0, 4000, 300)]
+    calls = planner.plan(CELL, ["T2M"], dates)
+    assert len(calls) == 2
+    assert calls[0] == (start, start + timedelta(days=planner.MAX_SPAN_DAYS - 1))
+    assert calls[1] == (calls[0][1] + timedelta(days=1), dates[-1])
+
+
+def test_analyse_route_fetches_merged_ranges(api, upstream):
+    params = {"lat": 45.5, "lon": -73.6, "day": 14, "month": 7, "years": 5}
+    r = api.get("/algo/daily/analyse", params=params)
+    assert r.status_code == 200
+    body = r.json()
+    assert body["historique_annees"] == 5
+    assert body["cell"]["lat"] == 45.5
+    assert "missing_ranges" not in body
+    # J et J-1 sur 5 ans : un seul intervalle (écarts < MAX_GAP_DAYS), pas 10 appels d'un jour
+    assert len(upstream.power) == 1
+
+    # tout est dans le stockage : aucun nouvel appel
+    assert api.get("/algo/daily/analyse", params=params).json() == body
+    assert len(upstream.power) == 1
+
+
+def test_analyse_route_reports_failed_ranges(api, upstream, monkeypatch):
+    monkeypatch.setattr(store_module, "RETRY_ATTEMPTS", 1)
+    params = {"lat": 45.5, "lon": -73.6, "day": 14, "month": 7}
+    # les 2 dernières années sont stockées, les 3 précédentes échouent
+    assert api.get("/algo/daily/analyse", params={**params, "years": 2}).status_code == 200
+    upstream.fail = lambda request: True
+    r = api.get("/algo/daily/analyse", params={**params, "years": 5})
+    assert r.status_code == 200
+    body = r.json()
+    year = date.today().year
+    assert body["historique_annees"] == 2
+    assert body["annees_manquantes"] == [year - 5, year - 4, year - 3]
+    assert [(m["start"], m["end"]) for m in body["missing_ranges"]] == [(f"{year - 5}0713", f"{year - 2}0712")]
+    assert r.headers["cache-control"] == "no-store"
+    assert "etag" not in r.headers
+
+
+def test_analyse_route_502_when_every_range_fails(api, upstream, monkeypatch):
+    monkeypatch.setattr(store_module, "RETRY_ATTEMPTS", 1)
+    upstream.fail = lambda request: True
+    r = api.get("/algo/daily/analyse", params={"lat": 45.5, "lon": -73.6, "day": 14, "month": 7, "years": 3})
+    assert r.status_code == 502
@@ -0,0 +1,61 @@
+import pytest
+from api.power import store as store_module
+from api.routes import algo
+
+MONTREAL = {"lat": 45.5, "lon": -73.6}
+NEARBY = {"lat": 45.4, "lon": -73.7}  # même maille
+SYDNEY = {"lat": -33.87, "lon": 151.21}
+
+
+def _cells(upstream) -> set[tuple[str, str]]:
+    return {(r.url.params["latitude"], r.url.params["longitude"]) for r in upstream.power}
+
+
+def test_batch_matches_single_predictions_in_order(api, upstream):
+    items = [{**SYDNEY, "day": 1, "month": 3}, {**MONTREAL, "day": 14, "month": 7}, {**NEARBY, "day": 15, "month": 7}]
+    r = api.post("/algo/daily/predict/batch", json={"items": items, "base_years": 3, "future_year": 2030})
+    assert r.status_code == 200
+    results = r.json()["results"]
+    assert [x["ok"] for x in results] == [True, True, True]
+    assert [x["date_predite"] for x in results] == ["2030-03-01", "2030-07-14", "2030-07-15"]
+    assert results[1]["cell"] == results[2]["cell"] != results[0]["cell"]
+    # une maille = un chargement d'historique, quel que soit le nombre de points
+    assert len(_cells(upstream)) == 2
+
+    single = api.get("/algo/daily/predict", params={**MONTREAL, "day": 14, "month": 7, "base_years": 3, "future_year": 2030})
+    expected = single.json()
+    assert set(results[1]) == {"ok", *expected}
+    for k, v in expected.items():
+        # la seconde réponse peut venir du cube des normales (sommes préfixées)
+        assert results[1][k] == (pytest.approx(v, rel=1e-6) if isinstance(v, float) else v)
+
+
+def test_batch_errors_stay_with_their_item(api, upstream, monkeypatch):
+    monkeypatch.setattr(store_module, "RETRY_ATTEMPTS", 1)
+    upstream.fail = lambda request: request.url.params["latitude"] == "-34.0"
+    items = [{**MONTREAL, "day": 14, "month": 7}, {**SYDNEY, "day": 14, "month": 7}, {**MONTREAL, "day": 29, "month": 2}]
+    # aucune année bissextile dans la base : pas de 29 février
+    r = api.post("/algo/daily/predict/batch", json={"items": items, "base_years": 1, "future_year": 2030})
+    assert r.status_code == 200
+    ok, failed, no_day = r.json()["results"]
+    assert ok["ok"] is True
+    assert failed["ok"] is False and failed["status"] == 502
+    assert no_day == {"ok": False, "status": 404, "detail": "Pas de données disponibles pour ce point/date"}
+
+
+def test_batch_validation(api):
+    assert api.post("/algo/daily/predict/batch", json={"items": [], "future_year": 2030}).status_code == 422
+    too_many = [{**MONTREAL, "day": 1, "month": 1}] * (algo.BATCH_MAX_ITEMS + 1)
+    assert api.post("/algo/daily/predict/batch", json={"items": too_many, "future_year": 2030}).status_code == 422
+    bad_month = [{**MONTREAL, "day": 1, "month": 13}]
+    assert api.post("/algo/daily/predict/batch", json={"items": bad_month, "future_year": 2030}).status_code == 422
+
+
+def test_batch_columnar(api):
+    items = [{**MONTREAL, "day": 14, "month": 7}, {**MONTREAL, "day": 15, "month": 7}]
+    r = api.post("/algo/daily/predict/batch", json={"items": items, "base_years": 2, "future_year": 2030},
+                 headers={"Accept": "application/vnd.weathermellon.columnar+json"})
+    assert r.status_code == 200
+    columns = r.json()["results"]
+    assert columns["ok"] == [True, True]
+    assert columns["date_predite"] == ["2030-07-14", "2030-07-15"]
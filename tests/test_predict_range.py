@@ -0,0 +1,51 @@
+import pytest
+
+MONTREAL = {"lat": 45.5, "lon": -73.6}
+
+
+def _range(api, start_md, end_md, **extra):
+    return api.get("/algo/range/predict", params={**MONTREAL, "start_md": start_md, "end_md": end_md,
+                                                 "base_years": 3, "future_year": 2030, **extra})
+
+
+def test_range_matches_daily_predictions(api):
+    r = _range(api, "0710", "0716")
+    assert r.status_code == 200
+    body = r.json()
+    assert (body["start"], body["end"]) == ("2030-07-10", "2030-07-16")
+    assert [d["date_predite"] for d in body["days"]] == [f"2030-07-{k}" for k in range(10, 17)]
+    assert all(d["ok"] for d in body["days"])
+
+    for d in body["days"][::3]:
+        day = int(d["date_predite"][-2:])
+        single = api.get("/algo/daily/predict", params={**MONTREAL, "day": day, "month": 7, "base_years": 3,
+                                                       "future_year": 2030}).json()
+        for k in ("T_moyenne", "Tmin_ajustee", "Tmax_ajustee", "T2M_std", "humidite_moyenne", "pression_moy_kPa"):
+            assert d[k] == pytest.approx(single[k], rel=1e-6)
+        assert d["periode_utilisee"] == single["periode_utilisee"]
+
+
+def test_range_crosses_new_year(api):
+    body = _range(api, "1230", "0102").json()
+    assert [d["date_predite"] for d in body["days"]] == ["2030-12-30", "2030-12-31", "2031-01-01", "2031-01-02"]
+    assert body["end"] == "2031-01-02"
+
+
+def test_range_feb29_only_in_leap_years(api):
+    # 2032 bissextile, 2030 non
+    assert _range(api, "0228", "0301", future_year=2032).json()["days"][1]["date_predite"] == "2032-02-29"
+    assert _range(api, "0229", "0301").status_code == 400
+
+
+def test_range_rejects_bad_days(api):
+    assert _range(api, "1301", "0101").status_code == 400
+    assert _range(api, "07-10", "0716").status_code == 400
+
+
+def test_range_columnar(api):
+    days = _range(api, "0710", "0712").json()["days"]
+    params = {**MONTREAL, "start_md": "0710", "end_md": "0712", "base_years": 3, "future_year": 2030}
+    columns = api.get("/algo/range/predict", params=params,
+                      headers={"Accept": "application/vnd.weathermellon.columnar+json"}).json()["days"]
+    assert columns["date_predite"] == [d["date_predite"] for d in days]
+    assert columns["T_moyenne"] == pytest.approx([d["T_moyenne"] for d in days])
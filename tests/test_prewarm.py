@@ -0,0 +1,80 @@
+from datetime import datetime, timezone
+import asyncio
+import pytest
+from api.power import grid, prewarm, store as store_module
+from api.power.prewarm import Prewarmer, history_span
+from api.power.store import year_chunks
+from bench import stub
+
+CELL = grid.snap(45.5, -73.6)
+
+
+@pytest.fixture
+def warm_setup(power_store, upstream, monkeypatch):
+    monkeypatch.setattr(prewarm, "BASE_YEARS", 2)
+    monkeypatch.setattr(prewarm, "DAYS_AHEAD", 2)
+    monkeypatch.setattr(store_module, "RETRY_ATTEMPTS", 2)
+    today = datetime.now(timezone.utc).date()
+    start, end = history_span(today)
+    needed = sum(len(year_chunks(a, b)) for a, b in power_store.missing(CELL, prewarm.PARAMS, start, end))
+    return today, needed
+
+
+def _warm(p: Prewarmer, today) -> bool:
+    return asyncio.run(p.warm(CELL, today))
+
+
+def test_warm_charges_calls_and_fills_cube(warm_setup, upstream):
+    today, needed = warm_setup
+    p = Prewarmer()
+    assert _warm(p, today)
+    assert len(upstream.power) == needed
+    assert p.upstream_requests == needed
+    assert p.tokens == pytest.approx(prewarm.REQUESTS_PER_HOUR - needed, abs=0.1)
+    assert p.cube_days == prewarm.DAYS_AHEAD
+
+    # déjà en stock : ni appel ni débit
+    assert _warm(p, today)
+    assert len(upstream.power) == needed and p.upstream_requests == needed
+
+
+def test_warm_charges_retries(warm_setup, upstream):
+    today, needed = warm_setup
+    failures = [1]
+
+    def fail(request):
+        if request.url.path == stub.POWER_PATH and failures:
+            return failures.pop()
+
+    upstream.fail = fail
+    p = Prewarmer()
+    assert _warm(p, today)
+    assert len(upstream.power) == needed + 1
+    assert p.upstream_requests == needed + 1
+    assert p.tokens == pytest.approx(prewarm.REQUESTS_PER_HOUR - needed - 1, abs=0.1)
+
+
+def test_warm_charges_calls_of_a_failed_warm(warm_setup, upstream):
+    today, _ = warm_setup
+    upstream.fail = lambda request: request.url.path == stub.POWER_PATH
+    p = Prewarmer()
+    with pytest.raises(Exception):
+        _warm(p, today)
+    assert p.upstream_requests == len(upstream.power) > 0
+
+
+def test_warm_deferred_when_budget_short(warm_setup, upstream):
+    today, needed = warm_setup
+    p = Prewarmer()
+    p.tokens = needed - 1
+    assert not _warm(p, today)
+    assert upstream.power == [] and p.upstream_requests == 0
+
+
+def test_oversized_cell_waits_for_full_bucket(warm_setup, upstream, monkeypatch):
+    today, needed = warm_setup
+    monkeypatch.setattr(prewarm, "REQUESTS_PER_HOUR", needed - 1)
+    p = Prewarmer()
+    assert _warm(p, today)
+    assert p.tokens < 0
+    assert p.stats()["budget_left"] == 0
@@ -0,0 +1,66 @@
+from collections import deque
+import re
+import pytest
+from api import profiling
+
+TOKEN = "admin-token"
+PREDICT = {"lat": 45.5, "lon": -73.6, "day": 14, "month": 7, "base_years": 3, "future_year": 2030}
+ASK = {"X-Profile": "1", "X-Profile-Token": TOKEN}
+ADMIN = {"X-Profile-Token": TOKEN}
+
+
+@pytest.fixture
+def profiled_api(request, monkeypatch, tmp_path):
+    """Application démarrée avec le jeton admin (le profilage s'installe au démarrage)."""
+    monkeypatch.setattr(profiling, "ADMIN_TOKEN", TOKEN)
+    monkeypatch.setattr(profiling, "INTERVAL", 0.001)
+    monkeypatch.setattr(profiling, "DIR", str(tmp_path / "profiles"))
+    monkeypatch.setattr(profiling, "recent", deque(maxlen=profiling.KEEP))
+    return request.getfixturevalue("api")
+
+
+def test_disabled_without_token(api):
+    assert not profiling.enabled()
+    r = api.get("/algo/daily/predict", params=PREDICT, headers=ASK)
+    assert r.status_code == 200
+    assert "x-profile-id" not in r.headers
+    assert api.get("/profiles", headers=ADMIN).status_code == 404
+
+
+def test_profiled_request_listed_and_folded(profiled_api, tmp_path):
+    r = profiled_api.get("/algo/daily/predict", params=PREDICT, headers=ASK)
+    assert r.status_code == 200
+    profile_id = r.headers["x-profile-id"]
+
+    listing = profiled_api.get("/profiles", headers=ADMIN).json()
+    [summary] = listing["profiles"]
+    assert summary["id"] == profile_id
+    assert (summary["path"], summary["trigger"], summary["status"]) == ("/algo/daily/predict", "header", 200)
+    assert summary["samples"] == summary["cpu_samples"] + summary["await_samples"]
+
+    folded = profiled_api.get(f"/profiles/{profile_id}", headers=ADMIN)
+    assert folded.status_code == 200
+    lines = folded.text.splitlines()
+    assert all(re.fullmatch(r"\S.* \d+", line) for line in lines)
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == summary["samples"]
+    assert (tmp_path / "profiles" / f"{profile_id}.folded").read_text() == folded.text
+
+    # relu sur disque une fois sorti de la mémoire
+    profiling.recent.clear()
+    assert profiled_api.get(f"/profiles/{profile_id}", headers=ADMIN).text == folded.text
+
+
+def test_only_asked_algo_requests_profiled(profiled_api):
+    assert "x-profile-id" not in profiled_api.get("/algo/daily/predict", params=PREDICT).headers
+    bad = {**ASK, "X-Profile-Token": "wrong"}
+    assert "x-profile-id" not in profiled_api.get("/algo/daily/predict", params=PREDICT, headers=bad).headers
+    assert "x-profile-id" not in profiled_api.get("/disasters/near", params={"lat": 0, "lon": 0}, headers=ASK).headers
+    assert profiled_api.get("/profiles", headers=ADMIN).json()["profiles"] == []
+
+
+def test_profiles_require_admin_token(profiled_api):
+    assert profiled_api.get("/profiles").status_code == 403
+    assert profiled_api.get("/profiles", headers={"X-Profile-Token": "wrong"}).status_code == 403
+    assert profiled_api.get("/profiles/0123456789ab").status_code == 403
+    assert profiled_api.get("/profiles/0123456789ab", headers=ADMIN).status_code == 404
+    assert profiled_api.get("/profiles/not-an-id", headers=ADMIN).status_code == 422
@@ -0,0 +1,150 @@
+import asyncio
+import httpx
+import pytest
+from api.upstream import client as http, resilience
+from api.upstream.resilience import CLOSED, HALF_OPEN, OPEN, CircuitOpenError, Host
+
+
+def _open(host: Host):
+    for _ in range(resilience.BREAKER_FAILURES):
+        host.before()
+        host.failure()
+
+
+def test_breaker_opens_after_consecutive_failures():
+    host = Host("test")
+    for _ in range(resilience.BREAKER_FAILURES - 1):
+        host.before()
+        host.failure()
+    assert host.state == CLOSED
+    host.before()
+    host.failure()
+    assert host.state == OPEN
+    assert host.opens == 1
+
+    with pytest.raises(CircuitOpenError):
+        host.before()
+    assert host.short_circuited == 1
+    assert host.calls == resilience.BREAKER_FAILURES
+
+
+def test_success_resets_failure_count():
+    host = Host("test")
+    for _ in range(resilience.BREAKER_FAILURES - 1):
+        host.before()
+        host.failure()
+    host.before()
+    host.success(0.1)
+    host.before()
+    host.failure()
+    assert host.state == CLOSED
+    assert host.failures == 1
+
+
+def test_half_open_probe_closes_on_success(monkeypatch):
+    host = Host("test")
+    _open(host)
+    monkeypatch.setattr(resilience, "BREAKER_COOLDOWN", 0)
+
+    host.before()
+    assert host.state == HALF_OPEN
+    # une seule sonde à la fois
+    with pytest.raises(CircuitOpenError):
+        host.before()
+    host.success(0.1)
+    assert host.state == CLOSED
+    host.before()
+
+
+def test_half_open_probe_reopens_on_failure(monkeypatch):
+    host = Host("test")
+    _open(host)
+    monkeypatch.setattr(resilience, "BREAKER_COOLDOWN", 0)
+
+    host.before()
+    host.failure()
+    assert host.state == OPEN
+    assert host.opens == 2
+    monkeypatch.setattr(resilience, "BREAKER_COOLDOWN", 3600)
+    with pytest.raises(CircuitOpenError):
+        host.before()
+
+
+def test_failed_classification():
+    request = httpx.Request("GET", "https://example.org")
+    assert resilience.failed(response=httpx.Response(503, request=request))
+    assert resilience.failed(response=httpx.Response(429, request=request))
+    assert not resilience.failed(response=httpx.Response(404, request=request))
+    assert resilience.failed(httpx.ConnectTimeout("timeout"))
+    assert not resilience.failed(ValueError())
+
+
+def test_hedge_delay_needs_samples_and_budget(monkeypatch):
+    monkeypatch.setattr(resilience, "HEDGE", True)
+    host = Host("test")
+    for _ in range(resilience.HEDGE_MIN_SAMPLES - 1):
+        host.before()
+        host.success(1.0)
+    assert host.hedge_delay() is None
+    host.before()
+    host.success(1.0)
+    assert host.hedge_delay() == 1.0
+    host.hedges = int(resilience.HEDGE_MAX_RATIO * host.calls) + 1
+    assert host.hedge_delay() is None
+
+
+URL = "https://upstream.test/events"
+PARAMS = {"start": "2024-05-01", "end": "2024-05-01"}
+
+
+def _open_via_get(upstream) -> Host:
+    upstream.fail = lambda request: True
+    for _ in range(resilience.BREAKER_FAILURES):
+        with pytest.raises(httpx.HTTPStatusError):
+            asyncio.run(http.get(URL, params=PARAMS))
+    host = resilience.host("upstream.test")
+    assert host.state == OPEN
+    return host
+
+
+def test_open_circuit_short_circuits_get(upstream):
+    _open_via_get(upstream)
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(http.get(URL, params=PARAMS))
+    assert len(upstream.eonet) == resilience.BREAKER_FAILURES
+
+
+@pytest.mark.parametrize("error", [httpx.TooManyRedirects, httpx.DecodingError])
+def test_probe_ended_by_unclassified_error_releases_host(upstream, monkeypatch, error):
+    host = _open_via_get(upstream)
+    monkeypatch.setattr(resilience, "BREAKER_COOLDOWN", 0)
+
+    def fail(request):
+        raise error("unexpected", request=request)
+
+    upstream.fail = fail
+    with pytest.raises(error):
+        asyncio.run(http.get(URL, params=PARAMS))
+    assert host.state == HALF_OPEN and not host.probing
+
+    upstream.fail = None
+    assert asyncio.run(http.get(URL, params=PARAMS)).status_code == 200
+    assert host.state == CLOSED
+
+
+def test_cancelled_probe_releases_host(upstream, monkeypatch):
+    host = _open_via_get(upstream)
+    monkeypatch.setattr(resilience, "BREAKER_COOLDOWN", 0)
+    upstream.fail = None
+
+    async def run():
+        task = asyncio.ensure_future(http.get(URL, params=PARAMS))
+        await asyncio.sleep(0)
+        assert host.probing
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert not host.probing
+    assert asyncio.run(http.get(URL, params=PARAMS)).status_code == 200
@@ -0,0 +1,69 @@
+import asyncio
+import pytest
+from api.upstream.singleflight import SingleFlight
+
+
+def test_concurrent_calls_are_coalesced():
+    flight = SingleFlight("test_coalesce")
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"value": 42}
+
+    async def run():
+        return await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert calls == [1]
+    assert results == [{"value": 42}] * 5
+    assert flight.stats() == {"calls": 1, "coalesced": 4, "inflight": 0}
+
+    # une fois terminé, un nouvel appel repart en amont
+    asyncio.run(run())
+    assert calls == [1, 1]
+
+
+def test_distinct_keys_are_not_coalesced():
+    flight = SingleFlight("test_keys")
+
+    async def run():
+        return await asyncio.gather(flight.do("a", lambda: asyncio.sleep(0, "a")), flight.do("b", lambda: asyncio.sleep(0, "b")))
+
+    assert asyncio.run(run()) == ["a", "b"]
+    assert flight.stats()["calls"] == 2
+
+
+def test_error_is_shared_by_all_callers():
+    flight = SingleFlight("test_error")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream")
+
+    async def run():
+        return await asyncio.gather(*(flight.do("key", fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert [type(e) for e in results] == [ValueError] * 3
+    assert flight.stats() == {"calls": 1, "coalesced": 2, "inflight": 0}
+
+
+def test_cancelled_caller_does_not_cancel_others():
+    flight = SingleFlight("test_cancel")
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def run():
+        first = asyncio.create_task(flight.do("key", fetch))
+        second = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "done"
@@ -0,0 +1,132 @@
+from datetime import date, timedelta
+import asyncio
+import os
+import time
+import numpy as np
+from api.power import store as store_module
+from api.power.store import _gaps, _merge, day_index, index_date, missing_now
+from tests.power_data import block
+
+CELL = (45.5, -73.75)
+
+
+def test_merge_ranges():
+    assert _merge([[5, 9], [0, 2], [3, 4], [20, 25], [22, 30]]) == [[0, 9], [20, 30]]
+    assert _merge([]) == []
+
+
+def test_gaps():
+    covered = [[10, 19], [30, 39]]
+    assert _gaps(covered, 0, 50) == [[0, 9], [20, 29], [40, 50]]
+    assert _gaps(covered, 12, 35) == [[20, 29]]
+    assert _gaps(covered, 12, 18) == []
+    assert _gaps([], 5, 7) == [[5, 7]]
+
+
+def test_day_index_roundtrip():
+    assert day_index(date(1981, 1, 1)) == 0
+    assert index_date(day_index(date(2004, 2, 29))) == date(2004, 2, 29)
+
+
+def test_write_covers_settled_days_only(power_store):
+    end = date.today() - timedelta(days=1)
+    start = end - timedelta(days=store_module.SETTLED_DAYS + 9)
+    power_store.write(CELL, block(["T2M"], start, end), {}, start, end)
+
+    settled = date.today() - timedelta(days=store_module.SETTLED_DAYS)
+    assert power_store.coverage(CELL) == {"T2M": [[day_index(start), day_index(settled)]]}
+    assert power_store.missing(CELL, ["T2M"], start, end) == [(settled + timedelta(days=1), end)]
+    assert sorted(power_store.fetched_at(CELL, ["T2M"])) == list(range(day_index(settled) + 1, day_index(end) + 1))
+
+
+def test_missing_merges_gaps_of_all_params(power_store):
+    power_store.write(CELL, block(["T2M"], date(2000, 1, 1), date(2000, 12, 31)), {}, date(2000, 1, 1), date(2000, 12, 31))
+    power_store.write(CELL, block(["PS"], date(2000, 3, 1), date(2001, 6, 30)), {}, date(2000, 3, 1), date(2001, 6, 30))
+
+    assert power_store.missing(CELL, ["T2M"], date(2000, 6, 1), date(2000, 6, 30)) == []
+    assert power_store.missing(CELL, ["PS", "T2M"], date(2000, 1, 1), date(2001, 12, 31)) == [
+        (date(2000, 1, 1), date(2000, 2, 29)), (date(2001, 1, 1), date(2001, 12, 31))]
+    assert power_store.missing(CELL, ["WS2M"], date(2000, 1, 1), date(2000, 1, 31)) == [(date(2000, 1, 1), date(2000, 1, 31))]
+
+
+def test_read_returns_nan_for_unknown_days(power_store):
+    values = block(["T2M"], date(2000, 1, 1), date(2000, 1, 3), value=lambda p, d: float(d.day))
+    values["T2M"]["20000102"] = None
+    power_store.write(CELL, values, {}, date(2000, 1, 1), date(2000, 1, 3))
+
+    col = power_store.read(CELL, ["T2M"], date(1999, 12, 31), date(2000, 1, 5))["T2M"]
+    np.testing.assert_array_equal(col, [np.nan, 1.0, np.nan, 3.0, np.nan, np.nan])
+
+
+def test_write_leaves_no_temporary_file(power_store):
+    power_store.write(CELL, block(["T2M"], date(2000, 1, 1), date(2000, 1, 31)), {"a": 1}, date(2000, 1, 1), date(2000, 1, 31))
+    assert not [f for f in os.listdir(os.path.dirname(power_store.path(CELL, "x"))) if f.endswith(".tmp")]
+
+
+def _recent(power_store, days: int = 10) -> tuple[date, date]:
+    end = date.today() - timedelta(days=1)
+    start = end - timedelta(days=days - 1)
+    power_store.write(CELL, block(["T2M"], start, end), {}, start, end)
+    return start, end
+
+
+def _revalidations(monkeypatch) -> list:
+    calls = []
+
+    async def revalidate(cell, params, start, end):
+        calls.append((start, end))
+
+    monkeypatch.setattr(store_module, "_revalidate", revalidate)
+    return calls
+
+
+def test_missing_now_serves_fresh_provisional_days(power_store, monkeypatch):
+    calls = _revalidations(monkeypatch)
+    start, end = _recent(power_store)
+
+    async def run():
+        return missing_now(CELL, ["T2M"], start, end)
+
+    assert asyncio.run(run()) == []
+    assert calls == []
+
+
+def test_missing_now_revalidates_stale_days_in_background(power_store, monkeypatch):
+    calls = _revalidations(monkeypatch)
+    start, end = _recent(power_store)
+    monkeypatch.setattr(store_module, "FRESH_SECONDS", 0)
+
+    async def run():
+        out = missing_now(CELL, ["T2M"], start, end)
+        await asyncio.sleep(0)
+        return out
+
+    assert asyncio.run(run()) == []
+    assert calls == [(start, end)]
+
+
+def test_missing_now_fetches_expired_and_unknown_days(power_store, monkeypatch):
+    calls = _revalidations(monkeypatch)
+    start, end = _recent(power_store)
+    before = start - timedelta(days=5)
+
+    async def run(first):
+        return missing_now(CELL, ["T2M"], first, end)
+
+    # jours antérieurs au premier jour provisoire, jamais téléchargés
+    assert asyncio.run(run(before)) == [(before, start - timedelta(days=1))]
+    # jours provisoires trop anciens pour être servis
+    monkeypatch.setattr(store_module, "MAX_STALE_SECONDS", 0)
+    assert asyncio.run(run(start)) == [(start, end)]
+    assert calls == []
+
+
+def test_missing_now_requires_all_params(power_store, monkeypatch):
+    _revalidations(monkeypatch)
+    start, end = _recent(power_store)
+
+    async def run():
+        return missing_now(CELL, ["PS", "T2M"], start, end)
+
+    assert asyncio.run(run()) == [(start, end)]
+    assert time.time() - max(power_store.fetched_at(CELL, ["T2M"]).values()) < 60
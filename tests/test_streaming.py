@@ -0,0 +1,52 @@
+import json
+from api.power import store as store_module
+
+MONTREAL = {"lat": 45.5, "lon": -73.6}
+PARAMS = ["PRECTOTCORR", "PS", "RH2M", "T2M", "T2M_MAX", "T2M_MIN", "U2M", "V2M"]
+
+
+def test_ndjson_stream_matches_json_response(api):
+    params = {**MONTREAL, "start": "20151230", "end": "20170102"}
+    r = api.get("/merra2/power/daily", params={**params, "stream": "ndjson"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert len(rows) == 370
+    assert rows[0]["date"] == "20151230" and rows[-1]["date"] == "20170102"
+    assert list(rows[0]) == ["date", *PARAMS]
+
+    full = api.get("/merra2/power/daily", params=params).json()["parameters"]
+    assert {row["date"]: row["T2M"] for row in rows} == full["T2M"]
+
+
+def test_csv_stream(api):
+    r = api.get("/weather/rainfall", params={**MONTREAL, "start": "20150101", "end": "20150105", "stream": "csv"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/csv")
+    lines = r.text.splitlines()
+    assert lines[0] == "date,PRECTOTCORR"
+    assert [line.split(",")[0] for line in lines[1:]] == [f"2015010{k}" for k in range(1, 6)]
+    assert "etag" not in r.headers
+
+
+def test_failed_year_streams_empty_rows(api, upstream, monkeypatch):
+    monkeypatch.setattr(store_module, "RETRY_ATTEMPTS", 1)
+    upstream.fail = lambda request: request.url.params["start"].startswith("2016")
+    r = api.get("/weather/rainfall", params={**MONTREAL, "start": "20151231", "end": "20170101", "stream": "csv"})
+    assert r.status_code == 200
+    rows = dict(line.split(",") for line in r.text.splitlines()[1:])
+    assert len(rows) == 368
+    assert rows["20160615"] == ""
+    assert rows["20151231"] != "" and rows["20170101"] != ""
+
+
+def test_failed_first_year_is_an_error_status(api, upstream, monkeypatch):
+    monkeypatch.setattr(store_module, "RETRY_ATTEMPTS", 1)
+    upstream.fail = lambda request: request.url.params["start"].startswith("2015")
+    r = api.get("/merra2/power/daily", params={**MONTREAL, "start": "20150601", "end": "20160131", "stream": "ndjson"})
+    assert r.status_code == 502
+
+
+def test_invalid_stream_format(api):
+    assert api.get("/merra2/power/daily", params={**MONTREAL, "start": "20150101", "end": "20150105",
+                                                  "stream": "xml"}).status_code == 422
@@ -0,0 +1,89 @@
+import time
+import pytest
+from api.cache import TTLCache
+from api.db import session
+from api.routes.auth import dependencies
+from bson import ObjectId
+
+
+@pytest.fixture
+def users(monkeypatch):
+    cache = TTLCache("users", 100, 60)
+    monkeypatch.setattr(dependencies, "users", cache)
+    return cache
+
+
+def _login(api, username: str = "alice") -> tuple[dict, str]:
+    r = api.post("/auth/register", json={"username": username, "email": f"{username}@example.com", "password": "pw"})
+    assert r.status_code == 200
+    token = api.post("/auth/login", json={"username": username, "password": "pw"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}, r.json()["user_id"]
+
+
+def test_ttl_cache_expiry_lru_and_generation(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = TTLCache("t", 2, 10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # "b" est le moins récemment utilisé
+    assert cache.get("b") is None and cache.get("a") == 1
+    now[0] += 11
+    assert cache.get("a") is None
+    generation = cache.generation
+    cache.invalidate("c")
+    cache.set("c", 4, generation=generation)  # lu avant l'invalidation : ignoré
+    assert cache.get("c") is None
+
+
+def test_user_served_from_cache(api, users):
+    headers, _ = _login(api)
+    assert api.get("/auth/favorites", headers=headers).json() == []
+    misses = users.misses
+    for _ in range(3):
+        assert api.get("/auth/favorites", headers=headers).status_code == 200
+    assert users.misses == misses
+    assert users.hits >= 3
+
+
+def test_cached_user_never_holds_password(api, users):
+    headers, user_id = _login(api)
+    api.get("/auth/favorites", headers=headers)
+    loaded, doc = users.get(user_id)
+    assert "hashed_password" not in doc and "hashed_password" not in loaded
+    assert {"username", "email", "favorites"} <= loaded
+
+
+def test_favorite_write_invalidates_cached_user(api, users):
+    headers, _ = _login(api)
+    assert api.get("/auth/favorites", headers=headers).json() == []
+    favorite = {"name": "Home", "lat": 45.5, "lon": -73.6}
+    assert api.post("/auth/favorites", json=favorite, headers=headers).json()["status"] == "ok"
+    assert api.get("/auth/favorites", headers=headers).json() == [favorite]
+
+
+def test_write_outside_the_routes_waits_for_ttl(api, users):
+    headers, user_id = _login(api)
+    assert api.get("/auth/favorites", headers=headers).json() == []
+
+    async def push():
+        await session.db["users"].update_one({"_id": ObjectId(user_id)}, {"$push": {"favorites": {"name": "X"}}})
+
+    api.portal.call(push)
+    assert api.get("/auth/favorites", headers=headers).json() == []
+    dependencies.invalidate_user(user_id)
+    assert api.get("/auth/favorites", headers=headers).json() == [{"name": "X"}]
+
+
+def test_deleted_user_is_rejected(api, users):
+    headers, user_id = _login(api)
+    assert api.get("/auth/favorites", headers=headers).status_code == 200
+
+    async def delete():
+        await session.db["users"].delete_one({"_id": ObjectId(user_id)})
+
+    api.portal.call(delete)
+    dependencies.invalidate_user(user_id)
+    assert api.get("/auth/favorites", headers=headers).status_code == 401
+    assert api.get("/auth/favorites", headers={"Authorization": "Bearer nope"}).status_code == 401
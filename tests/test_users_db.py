@@ -0,0 +1,71 @@
+import asyncio
+from api.db import session
+from api.routes.auth import utils
+from api.routes.auth.favorites import add_favorite
+
+ALICE = {"username": "alice", "email": "alice@example.com", "password": "pw"}
+
+
+def _headers(api, user: dict = ALICE) -> dict:
+    assert api.post("/auth/register", json=user).status_code == 200
+    token = api.post("/auth/login", json={"username": user["username"], "password": user["password"]}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_username_index_created(api):
+    indexes = api.portal.call(session.db["users"].index_information)
+    assert indexes["username_unique"]["unique"] is True
+    assert indexes["username_unique"]["key"] == [("username", 1)]
+
+
+def test_duplicate_username_rejected(api):
+    assert api.post("/auth/register", json=ALICE).status_code == 200
+    r = api.post("/auth/register", json={**ALICE, "email": "other@example.com"})
+    assert r.status_code == 400
+
+
+def test_concurrent_registration_settled_by_index(api, monkeypatch):
+    hash_password = utils.hash_password
+
+    async def racing_hash(password):
+        # une autre inscription du même nom aboutit entre la vérification et l'insertion
+        await session.db["users"].insert_one({"username": "alice", "email": "x@example.com", "hashed_password": "x"})
+        return await hash_password(password)
+
+    monkeypatch.setattr(utils, "hash_password", racing_hash)
+    r = api.post("/auth/register", json=ALICE)
+    assert (r.status_code, r.json()["detail"]) == (400, "Username already exists")
+    assert api.portal.call(session.db["users"].count_documents, {"username": "alice"}) == 1
+
+
+def test_favorite_names_unique_per_user(api):
+    alice = _headers(api)
+    bob = _headers(api, {"username": "bob", "email": "bob@example.com", "password": "pw"})
+    home = {"name": "Home", "lat": 45.5, "lon": -73.6}
+    assert api.post("/auth/favorites", json=home, headers=alice).json()["status"] == "ok"
+    assert api.post("/auth/favorites", json={**home, "lat": 0}, headers=alice).json() == {"status": "exists"}
+    assert api.post("/auth/favorites", json=home, headers=bob).json()["status"] == "ok"
+    assert api.get("/auth/favorites", headers=alice).json() == [home]
+
+
+def test_concurrent_favorite_adds_keep_one(api):
+    alice = _headers(api)
+    user = api.portal.call(session.db["users"].find_one, {"username": "alice"})
+
+    async def race():
+        return await asyncio.gather(*(add_favorite({"name": "Home", "lat": 1, "lon": k}, user) for k in range(5)))
+
+    statuses = sorted(r["status"] for r in api.portal.call(race))
+    assert statuses == ["exists"] * 4 + ["ok"]
+    assert len(api.get("/auth/favorites", headers=alice).json()) == 1
+
+
+def test_index_failure_does_not_stop_startup(api, capsys):
+    async def duplicate_then_index():
+        users = session.db["users"]
+        await users.drop_indexes()
+        await users.insert_many([{"username": "dup"}, {"username": "dup"}])
+        await session.ensure_indexes()
+
+    api.portal.call(duplicate_then_index)
+    assert "index users.username not created" in capsys.readouterr().out